@@ -4,6 +4,7 @@ import boto3
 import botocore
 
 from src.helper import Helper
+from src.inventory import Inventory
 
 
 class AirflowCleanup:
@@ -51,22 +52,37 @@ class AirflowCleanup:
                 return False
 
             for resource in resources:
-                try:
-                    resource_details = self.client_airflow.get_environment(
-                        Name=resource
-                    ).get("Environment")
-                except:
-                    self.logging.error(
-                        f"Could not get Airflow Environment's '{resource}' details."
+                resource_date = None
+                resource_action = None
+
+                if Helper.not_allowlisted(resource, resource_allowlist):
+                    # environments that were still within their TTL during the previous
+                    # run can be rechecked without describing them again
+                    resource_date = Inventory.get_resource_date(
+                        self.region,
+                        "Airflow",
+                        "Environment",
+                        resource,
+                        resource_maximum_age,
                     )
-                    self.logging.error(sys.exc_info()[1])
-                    resource_action = "ERROR"
-                else:
-                    resource_date = resource_details.get("CreatedAt")
-                    resource_age = Helper.get_day_delta(resource_date).days
-                    resource_action = None
 
-                    if Helper.not_allowlisted(resource, resource_allowlist):
+                    if resource_date is None:
+                        try:
+                            resource_date = (
+                                self.client_airflow.get_environment(Name=resource)
+                                .get("Environment")
+                                .get("CreatedAt")
+                            )
+                        except:
+                            self.logging.error(
+                                f"Could not get Airflow Environment's '{resource}' details."
+                            )
+                            self.logging.error(sys.exc_info()[1])
+                            resource_action = "ERROR"
+
+                    if resource_action is None:
+                        resource_age = Helper.get_day_delta(resource_date).days
+
                         if resource_age > resource_maximum_age:
                             try:
                                 if not self.is_dry_run:
@@ -91,12 +107,12 @@ class AirflowCleanup:
                                 "(less than TTL setting) and has not been deleted."
                             )
                             resource_action = "SKIP - TTL"
-                    else:
-                        self.logging.debug(
-                            f"Airflow Environment '{resource}' has been allowlisted and has not "
-                            "been deleted."
-                        )
-                        resource_action = "SKIP - ALLOWLIST"
+                else:
+                    self.logging.debug(
+                        f"Airflow Environment '{resource}' has been allowlisted and has not "
+                        "been deleted."
+                    )
+                    resource_action = "SKIP - ALLOWLIST"
 
                 Helper.record_execution_log_action(
                     self.execution_log,
@@ -105,6 +121,7 @@ class AirflowCleanup:
                     "Environment",
                     resource,
                     resource_action,
+                    resource_date,
                 )
 
             self.logging.debug("Finished cleanup of Airflow Environments.")
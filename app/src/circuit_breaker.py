@@ -0,0 +1,206 @@
+import threading
+
+import boto3
+
+from src.helper import Helper
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling AWS while a service's circuit is open."""
+
+
+class Circuit:
+    """Tracks consecutive errors of the same class for one service and region."""
+
+    def __init__(self, service, region):
+        self.service = service
+        self.region = region
+        self.error = None
+        self.errors = 0
+        self.is_open = False
+        self.skipped = 0
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker keyed by service and region. Once calls to a
+    service in a region fail with the same class of error a number of times
+    in a row, the circuit opens and every further call to that service in
+    that region fails immediately with a CircuitOpenError instead of going
+    through the network and botocore's retries. A single summarising entry
+    is recorded in the execution log for each open circuit.
+
+    Only errors that point at the service as a whole (invalid credentials,
+    disabled endpoints, connection failures and server side errors) are
+    counted, errors caused by an individual resource such as a dependency
+    violation never open a circuit. Access denied and unauthorised
+    operation errors are not counted either as they are commonly caused by
+    a single resource's policy (e.g., an S3 Bucket policy or a Service
+    Control Policy protecting a Role).
+
+    Clients used to read and write the application's own state and
+    execution log are exempt from the circuit breaker.
+    """
+
+    error_codes = (
+        "AuthFailure",
+        "InternalError",
+        "InternalFailure",
+        "InternalServerError",
+        "InvalidClientTokenId",
+        "OptInRequired",
+        "ServiceUnavailable",
+        "ServiceUnavailableException",
+        "SubscriptionRequiredException",
+        "UnrecognizedClientException",
+    )
+
+    _circuits = {}
+    _lock = threading.Lock()
+    _logging = None
+    _threshold = None
+
+    @classmethod
+    def setup(cls, logging, settings):
+        with cls._lock:
+            cls._circuits = {}
+            cls._logging = logging
+            cls._threshold = Helper.get_setting(
+                settings, "general.circuit_breaker.threshold", 5
+            )
+
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+
+        # checked before any other handler so that open circuits are never rate limited
+        boto3.DEFAULT_SESSION.events.register_first(
+            "before-call",
+            cls.before_call,
+            unique_id="auto-cleanup-circuit-breaker-before-call",
+        )
+        boto3.DEFAULT_SESSION.events.register(
+            "after-call",
+            cls.after_call,
+            unique_id="auto-cleanup-circuit-breaker-after-call",
+        )
+        boto3.DEFAULT_SESSION.events.register(
+            "after-call-error",
+            cls.after_call_error,
+            unique_id="auto-cleanup-circuit-breaker-after-call-error",
+        )
+
+    @classmethod
+    def exempt(cls, client):
+        """Removes the circuit breaker from the client, returns the client."""
+        client.meta.events.unregister(
+            "before-call", unique_id="auto-cleanup-circuit-breaker-before-call"
+        )
+        client.meta.events.unregister(
+            "after-call", unique_id="auto-cleanup-circuit-breaker-after-call"
+        )
+        client.meta.events.unregister(
+            "after-call-error",
+            unique_id="auto-cleanup-circuit-breaker-after-call-error",
+        )
+
+        return client
+
+    @classmethod
+    def get_circuit(cls, service, region):
+        with cls._lock:
+            if (service, region) not in cls._circuits:
+                cls._circuits[(service, region)] = Circuit(service, region)
+
+            return cls._circuits[(service, region)]
+
+    @classmethod
+    def record(cls, service, region, error):
+        """Counts a call outcome, error is None for successful calls."""
+        circuit = cls.get_circuit(service, region)
+
+        with cls._lock:
+            if circuit.is_open:
+                return
+            elif error is None:
+                circuit.error = None
+                circuit.errors = 0
+                return
+            elif error == circuit.error:
+                circuit.errors += 1
+            else:
+                circuit.error = error
+                circuit.errors = 1
+
+            if cls._threshold and circuit.errors >= cls._threshold:
+                circuit.is_open = True
+            else:
+                return
+
+        cls._logging.warning(
+            f"Circuit for {service} in region '{region}' has opened after {circuit.errors} "
+            f"consecutive '{error}' errors. Remaining {service} calls in this region will be skipped."
+        )
+
+    @classmethod
+    def before_call(cls, model, context, **kwargs):
+        circuit = cls.get_circuit(
+            model.service_model.service_id, context.get("client_region")
+        )
+
+        if circuit.is_open:
+            with cls._lock:
+                circuit.skipped += 1
+
+            raise CircuitOpenError(
+                f"Skipped {model.name} as the circuit for {circuit.service} in region "
+                f"'{circuit.region}' is open after repeated '{circuit.error}' errors."
+            )
+
+    @classmethod
+    def after_call(cls, http_response, parsed, model, context, **kwargs):
+        error = None
+
+        if http_response.status_code >= 300:
+            error_code = parsed.get("Error", {}).get("Code")
+
+            if error_code in cls.error_codes or http_response.status_code >= 500:
+                error = error_code or str(http_response.status_code)
+            else:
+                # errors caused by the resource itself leave the circuit as is
+                return
+
+        cls.record(model.service_model.service_id, context.get("client_region"), error)
+
+    @classmethod
+    def after_call_error(cls, exception, context, event_name, **kwargs):
+        # the service model is not passed along with errors raised before a response
+        # was received, the service is matched through its hyphenised ID instead
+        service_id = event_name.split(".")[1]
+
+        for service, region in list(cls._circuits):
+            if service.hyphenize() == service_id and region == context.get(
+                "client_region"
+            ):
+                cls.record(service, region, type(exception).__name__)
+
+    @classmethod
+    def record_execution_log(cls, execution_log):
+        """Records a single entry for each circuit that has opened during the run."""
+        for circuit in sorted(
+            cls._circuits.values(),
+            key=lambda circuit: (circuit.region, circuit.service),
+        ):
+            if circuit.is_open:
+                Helper.record_execution_log_action(
+                    execution_log,
+                    circuit.region,
+                    circuit.service,
+                    "Circuit",
+                    circuit.error,
+                    "SKIP - CIRCUIT OPEN",
+                )
+
+                cls._logging.warning(
+                    f"{circuit.skipped} {circuit.service} calls in region '{circuit.region}' "
+                    "were skipped by an open circuit."
+                )
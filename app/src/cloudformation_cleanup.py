@@ -1,9 +1,15 @@
+import concurrent.futures
+import functools
 import sys
 import threading
 
 import boto3
 
+from src.cloudformation_stack_index import CloudFormationStackIndex
+from src.concurrency import WorkerPool
 from src.helper import Helper
+from src.stack_ownership import StackOwnership
+from src.waiter import Waiter
 
 
 class CloudFormationCleanup:
@@ -15,10 +21,44 @@ class CloudFormationCleanup:
         self.region = region
 
         self._client_cloudformation = None
+        self.stack_index = CloudFormationStackIndex([])
+        self._stack_statuses = {}
+        self._allowlist_lock = threading.Lock()
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
+        self.is_prefiltering = Helper.get_setting(
+            self.settings, "general.prefilter", True
+        )
 
         self.resource_translations = {"ManagedPolicy": "Policy"}
 
+        # every Stack status except DELETE_COMPLETE, which is only listed by ListStacks.
+        # Stacks are not prefiltered by status as the resources of every Stack that
+        # is kept, in whichever state, are allowlisted
+        self.stack_statuses = [
+            "CREATE_COMPLETE",
+            "CREATE_FAILED",
+            "CREATE_IN_PROGRESS",
+            "DELETE_FAILED",
+            "DELETE_IN_PROGRESS",
+            "IMPORT_COMPLETE",
+            "IMPORT_IN_PROGRESS",
+            "IMPORT_ROLLBACK_COMPLETE",
+            "IMPORT_ROLLBACK_FAILED",
+            "IMPORT_ROLLBACK_IN_PROGRESS",
+            "REVIEW_IN_PROGRESS",
+            "ROLLBACK_COMPLETE",
+            "ROLLBACK_FAILED",
+            "ROLLBACK_IN_PROGRESS",
+            "UPDATE_COMPLETE",
+            "UPDATE_COMPLETE_CLEANUP_IN_PROGRESS",
+            "UPDATE_FAILED",
+            "UPDATE_IN_PROGRESS",
+            "UPDATE_ROLLBACK_COMPLETE",
+            "UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS",
+            "UPDATE_ROLLBACK_FAILED",
+            "UPDATE_ROLLBACK_IN_PROGRESS",
+        ]
+
     @property
     def client_cloudformation(self):
         if not self._client_cloudformation:
@@ -27,31 +67,16 @@ class CloudFormationCleanup:
             )
         return self._client_cloudformation
 
-    def get_stack_name(self, stack_id):
-        if stack_id:
-            try:
-                paginator = self.client_cloudformation.get_paginator("describe_stacks")
-                resources = (
-                    paginator.paginate(StackName=stack_id)
-                    .build_full_result()
-                    .get("Stacks")
-                )
-            except:
-                self.logging.error(
-                    f"Could not describe CloudFormation Stack '{stack_id}'."
-                )
-                self.logging.error(sys.exc_info()[1])
-            else:
-                for resource in resources:
-                    return resource["StackName"]
-
-        return None
-
     def run(self):
         self.stacks()
 
-    def stacks(self):
-        """Deletes CloudFormation Stacks."""
+    def stacks(self, resource_ids=None):
+        """
+        Deletes CloudFormation Stacks. Only root Stacks are deleted, their
+        nested Stacks are deleted along with them. Root Stacks are cleaned
+        up in parallel and their deletion is tracked by the waiter, so that
+        the other services can start while the Stacks are being deleted.
+        """
         self.logging.debug("Started cleanup of CloudFormation Stacks.")
 
         is_cleaning_enabled = Helper.get_setting(
@@ -63,226 +88,380 @@ class CloudFormationCleanup:
         resource_allowlist = Helper.get_allowlist(
             self.allowlist, "cloudformation.stack"
         )
-        semaphore = threading.Semaphore(value=1)
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_cloudformation.get_paginator("describe_stacks")
-                resources = paginator.paginate().build_full_result().get("Stacks")
+                if self.is_prefiltering:
+                    # Stack summaries of every Stack that has not been deleted
+                    paginator = self.client_cloudformation.get_paginator("list_stacks")
+                    resources = (
+                        paginator.paginate(StackStatusFilter=self.stack_statuses)
+                        .build_full_result()
+                        .get("StackSummaries")
+                    )
+                else:
+                    paginator = self.client_cloudformation.get_paginator(
+                        "describe_stacks"
+                    )
+                    resources = paginator.paginate().build_full_result().get("Stacks")
             except:
                 self.logging.error("Could not list all CloudFormation Stacks.")
                 self.logging.error(sys.exc_info()[1])
                 return False
 
-            # threads list
-            threads = []
-
-            for resource in resources:
-                threads.append(
-                    threading.Thread(
-                        target=self.delete_stack,
-                        args=(
-                            semaphore,
-                            resource,
-                            resource_allowlist,
-                            resource_maximum_age,
-                        ),
+            # parent and root Stacks are resolved from the same listing and
+            # nested Stacks are grouped under their root Stack
+            self.stack_index = CloudFormationStackIndex(resources)
+            stacks = {resource.get("StackId"): resource for resource in resources}
+
+            root_stack_ids = self.stack_index.root_stacks
+
+            # scheduled checks only consider the Stacks that are due, nested
+            # Stacks are deleted along with their root Stack
+            if resource_ids is not None:
+                root_stack_ids = [
+                    stack_id
+                    for stack_id in root_stack_ids
+                    if stacks.get(stack_id).get("StackName") in resource_ids
+                ]
+
+            pool = WorkerPool("cloudformation")
+
+            for stack_id in root_stack_ids:
+                nested_stack_ids = self.stack_index.get_nested_stacks(stack_id)
+                resource_actions = {}
+
+                for resource_stack_id in [stack_id] + nested_stack_ids:
+                    resource_actions[resource_stack_id] = concurrent.futures.Future()
+
+                    Helper.record_execution_log_action(
+                        self.execution_log,
+                        self.region,
+                        "CloudFormation",
+                        "Stack",
+                        stacks.get(resource_stack_id).get("StackName"),
+                        resource_actions.get(resource_stack_id),
                     )
-                )
 
-            # start all threads
-            for thread in threads:
-                thread.start()
+                pool.submit(
+                    self.root_stack,
+                    stacks.get(stack_id),
+                    [
+                        stacks.get(nested_stack_id)
+                        for nested_stack_id in nested_stack_ids
+                    ],
+                    resource_allowlist,
+                    resource_maximum_age,
+                ).add_done_callback(
+                    functools.partial(self.resolve_actions, resource_actions)
+                )
 
-            # make sure that all threads have finished
-            for thread in threads:
-                thread.join()
+            pool.wait()
 
             self.logging.debug("Finished cleanup of CloudFormation Stacks.")
+            return True
         else:
             self.logging.info("Skipping cleanup of CloudFormation Stacks.")
             return True
 
-    def delete_stack(
-        self, semaphore, resource, resource_allowlist, resource_maximum_age
-    ):
-        semaphore.acquire()
+    def resolve_actions(self, resource_actions, future):
+        """Sets each Stack's resource action once known, following the waiter's futures."""
+        try:
+            actions = future.result()
+        except:
+            self.logging.error("Could not clean up a CloudFormation Stack.")
+            self.logging.error(sys.exc_info()[1])
+            actions = {}
+
+        for stack_id, resource_action in resource_actions.items():
+            action = actions.get(stack_id, "ERROR")
+
+            if isinstance(action, concurrent.futures.Future):
+                # nested Stacks share their root Stack's waiter future
+                action.add_done_callback(
+                    lambda waiter_action, resource_action=resource_action: resource_action.set_result(
+                        waiter_action.result()
+                    )
+                )
+            else:
+                resource_action.set_result(action)
 
+    def root_stack(
+        self, resource, nested_resources, resource_allowlist, resource_maximum_age
+    ):
+        """
+        Deletes a root Stack along with its nested Stacks, which are kept if
+        any of them has been allowlisted. Returns the resource action of
+        each Stack by its ID.
+        """
         resource_id = resource.get("StackName")
         resource_date = resource.get("LastUpdatedTime", resource.get("CreationTime"))
         resource_status = resource.get("StackStatus")
-        resource_protection = True  # resource.get("EnableTerminationProtection")
-        resource_parent_stack_id = self.get_stack_name(resource.get("ParentId"))
-        resource_root_stack_id = self.get_stack_name(resource.get("RootId"))
         resource_age = Helper.get_day_delta(resource_date).days
         resource_action = None
 
-        if (
-            Helper.not_allowlisted(resource_id, resource_allowlist)
-            and resource_parent_stack_id not in resource_allowlist
-            and resource_root_stack_id not in resource_allowlist
-        ):
-            if resource_age > resource_maximum_age:
-                if resource_status not in (
-                    "DELETE_PENDING",
-                    "DELETE_IN_PROGRESS",
-                    "DELETE_COMPLETE",
-                ):
-                    # form a list of resources that cannot be delete
-                    retain_resources = []
-                    if resource_status in ("DELETE_FAILED"):
-                        try:
-                            paginator = self.client_cloudformation.get_paginator(
-                                "list_stack_resources"
-                            )
-                            stack_resources = (
-                                paginator.paginate(StackName=resource_id)
-                                .build_full_result()
-                                .get("StackResourceSummaries")
-                            )
-                        except:
-                            self.logging.error(
-                                f"Could not retrieve a list of Stack Resources for CloudFormation Stack '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            for stack_resource in stack_resources:
-                                if stack_resource.get("ResourceStatus") in (
-                                    "DELETE_FAILED"
-                                ) and stack_resource.get("ResourceType") in (
-                                    "AWS::S3::Bucket"
-                                ):
-                                    retain_resources.append(
-                                        stack_resource.get("LogicalResourceId")
-                                    )
-
-                    # remove termination protection
-                    if resource_protection and resource_root_stack_id is None:
-                        try:
-                            if not self.is_dry_run:
-                                self.client_cloudformation.update_termination_protection(
-                                    EnableTerminationProtection=False,
-                                    StackName=resource_id,
-                                )
-                        except:
-                            self.logging.error(
-                                f"Could not disable Termination Protection for CloudFormation Stack '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.debug(
-                                f"Termination Protection for CloudFormation Stack '{resource_id}' disabled."
-                            )
-
-                    try:
-                        if not self.is_dry_run:
-                            self.client_cloudformation.delete_stack(
-                                StackName=resource_id,
-                                RetainResources=retain_resources,
-                            )
-                    except:
-                        self.logging.error(
-                            f"Could not delete CloudFormation Stack '{resource_id}'. "
-                            "Manual deletion by an administrator might be necessary."
-                        )
-                        self.logging.error(sys.exc_info()[1])
-                        resource_action = "ERROR"
-                    else:
-                        self.logging.info(
-                            f"CloudFormation Stack '{resource_id}' was last modified {resource_age} days ago "
-                            "and has started being deleted. Check progress manually."
-                        )
-                        resource_action = "DELETE - NOT CONFIRMED"
+        allowlisted_resources = [
+            stack
+            for stack in [resource] + nested_resources
+            if not Helper.not_allowlisted(stack.get("StackName"), resource_allowlist)
+        ]
+
+        if allowlisted_resources:
+            for allowlisted_resource in allowlisted_resources:
+                if allowlisted_resource is resource:
+                    self.logging.debug(
+                        f"CloudFormation Stack '{resource_id}' has been allowlisted and has not "
+                        "been deleted."
+                    )
+                else:
+                    self.logging.debug(
+                        f"""CloudFormation Stack's '{resource_id}' nested CloudFormation Stack '{allowlisted_resource.get("StackName")}' """
+                        "has been allowlisted and has not been deleted."
+                    )
+
+            resource_action = "SKIP - ALLOWLIST"
+        elif resource_age <= resource_maximum_age:
+            self.logging.debug(
+                f"CloudFormation Stack '{resource_id}' was last modified {resource_age} days ago "
+                "(less than TTL setting) and has not been deleted."
+            )
+            resource_action = "SKIP - TTL"
+        elif resource_status in ("DELETE_PENDING", "DELETE_IN_PROGRESS"):
+            self.logging.debug(
+                f"CloudFormation Stack '{resource_id}' is already being deleted."
+            )
+
+            for stack in [resource] + nested_resources:
+                self.own_stack_resources(stack.get("StackName"))
+
+            if not self.is_dry_run:
+                resource_action = self.wait_stack(resource, resource_age)
+        else:
+            # the other cleanups skip the resources the Stacks are deleting
+            for stack in [resource] + nested_resources:
+                self.own_stack_resources(stack.get("StackName"))
+
+            resource_action = self.delete_stack(resource, resource_age)
+
+        resource_actions = {}
+
+        for stack in [resource] + nested_resources:
+            # Stacks that are not deleted have their resources allowlisted
+            if resource_action in ("SKIP - ALLOWLIST", "SKIP - TTL"):
+                if self.allowlist_stack_resources(stack.get("StackName")):
+                    resource_actions[stack.get("StackId")] = resource_action
+                else:
+                    resource_actions[stack.get("StackId")] = "ERROR"
             else:
-                self.logging.debug(
-                    f"CloudFormation Stack '{resource_id}' was last modified {resource_age} days ago "
-                    "(less than TTL setting) and has not been deleted."
+                resource_actions[stack.get("StackId")] = resource_action
+
+        return resource_actions
+
+    def delete_stack(self, resource, resource_age):
+        """Starts deleting a root Stack and waits for its deletion through the waiter."""
+        resource_id = resource.get("StackName")
+        resource_status = resource.get("StackStatus")
+        resource_protection = True  # resource.get("EnableTerminationProtection")
+        resource_action = None
+
+        # form a list of resources that cannot be delete
+        retain_resources = []
+        if resource_status in ("DELETE_FAILED"):
+            try:
+                paginator = self.client_cloudformation.get_paginator(
+                    "list_stack_resources"
                 )
-                resource_action = "SKIP - TTL"
-        else:
-            if resource_id in resource_allowlist:
-                self.logging.debug(
-                    f"CloudFormation Stack '{resource_id}' has been allowlisted and has not "
-                    "been deleted."
+                stack_resources = (
+                    paginator.paginate(StackName=resource_id)
+                    .build_full_result()
+                    .get("StackResourceSummaries")
                 )
-            elif resource_parent_stack_id in resource_allowlist:
-                self.logging.debug(
-                    f"CloudFormation Stack's '{resource_id}' parent CloudFormation Stack '{resource_parent_stack_id}' "
-                    "has been allowlisted and has not been deleted."
+            except:
+                self.logging.error(
+                    f"Could not retrieve a list of Stack Resources for CloudFormation Stack '{resource_id}'."
                 )
-            elif resource_root_stack_id in resource_allowlist:
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
+                for stack_resource in stack_resources:
+                    if stack_resource.get("ResourceStatus") in (
+                        "DELETE_FAILED"
+                    ) and stack_resource.get("ResourceType") in ("AWS::S3::Bucket"):
+                        retain_resources.append(stack_resource.get("LogicalResourceId"))
+
+        # remove termination protection
+        if resource_protection:
+            try:
+                if not self.is_dry_run:
+                    self.client_cloudformation.update_termination_protection(
+                        EnableTerminationProtection=False,
+                        StackName=resource_id,
+                    )
+            except:
+                self.logging.error(
+                    f"Could not disable Termination Protection for CloudFormation Stack '{resource_id}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
                 self.logging.debug(
-                    f"CloudFormation Stack's '{resource_id}' root CloudFormation Stack '{resource_root_stack_id}' "
-                    "has been allowlisted and has not been deleted."
+                    f"Termination Protection for CloudFormation Stack '{resource_id}' disabled."
                 )
 
-            resource_action = "SKIP - ALLOWLIST"
+        try:
+            if not self.is_dry_run:
+                self.client_cloudformation.delete_stack(
+                    StackName=resource_id,
+                    RetainResources=retain_resources,
+                )
+        except:
+            self.logging.error(
+                f"Could not delete CloudFormation Stack '{resource_id}'. "
+                "Manual deletion by an administrator might be necessary."
+            )
+            self.logging.error(sys.exc_info()[1])
+            resource_action = "ERROR"
+        else:
+            self.logging.info(
+                f"CloudFormation Stack '{resource_id}' was last modified {resource_age} days ago "
+                "and has started being deleted."
+            )
+
+            if self.is_dry_run:
+                resource_action = "DELETE - NOT CONFIRMED"
+            else:
+                resource_action = self.wait_stack(resource, resource_age)
+
+        return resource_action
+
+    def wait_stack(self, resource, resource_age):
+        """Returns a future of the Stack's resource action, resolved once its deletion has finished."""
+        return Waiter.wait(
+            self.poll_stacks,
+            resource.get("StackId"),
+            functools.partial(
+                self.stack_deleted,
+                resource.get("StackId"),
+                resource.get("StackName"),
+                resource_age,
+            ),
+            "DELETE - NOT CONFIRMED",
+        )
+
+    def poll_stacks(self, stack_ids):
+        """
+        Returns the Stacks whose deletion has finished, using a single
+        listing of the Stacks that have not been deleted for all of them.
+        """
+        paginator = self.client_cloudformation.get_paginator("list_stacks")
+        statuses = {
+            stack.get("StackId"): stack.get("StackStatus")
+            for stack in paginator.paginate(StackStatusFilter=self.stack_statuses)
+            .build_full_result()
+            .get("StackSummaries")
+        }
+
+        for stack_id in stack_ids:
+            status = statuses.get(stack_id, "DELETE_COMPLETE")
+
+            if status in ("DELETE_COMPLETE", "DELETE_FAILED"):
+                self._stack_statuses[stack_id] = status
+                yield stack_id
+
+    def stack_deleted(self, stack_id, resource_id, resource_age):
+        if self._stack_statuses.get(stack_id) == "DELETE_FAILED":
+            self.logging.error(
+                f"Could not delete CloudFormation Stack '{resource_id}'. "
+                "Manual deletion by an administrator might be necessary."
+            )
+            return "ERROR"
+
+        self.logging.info(
+            f"CloudFormation Stack '{resource_id}' was last modified {resource_age} days ago "
+            "and has been deleted."
+        )
+        return "DELETE"
+
+    def own_stack_resources(self, resource_id):
+        """Records the resources of a Stack that is being deleted within the ownership index."""
+        try:
+            paginator = self.client_cloudformation.get_paginator("list_stack_resources")
+            stack_resources = (
+                paginator.paginate(StackName=resource_id)
+                .build_full_result()
+                .get("StackResourceSummaries")
+            )
+        except:
+            self.logging.error(
+                f"Could not retrieve a list of Stack Resources for CloudFormation Stack '{resource_id}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return False
+
+        for stack_resource in stack_resources:
+            if stack_resource.get("PhysicalResourceId") not in (None, ""):
+                StackOwnership.add(
+                    self.region,
+                    stack_resource.get("ResourceType"),
+                    stack_resource.get("PhysicalResourceId"),
+                    resource_id,
+                )
+
+        return True
+
+    def allowlist_stack_resources(self, resource_id):
+        """
+        For CloudFormation Stacks that are not deleted, add all physical
+        resources into the Allowlist dictionary to prevent the need to
+        allowlist each and every resource.
+        """
+        try:
+            resource_details = self.client_cloudformation.describe_stack_resources(
+                StackName=resource_id
+            ).get("StackResources")
+        except:
+            self.logging.error(
+                f"Could not Describe Stack Resources for CloudFormation Stack '{resource_id}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return False
+
+        for stack_resource in resource_details:
+            resource_child_logical_id = stack_resource.get("LogicalResourceId")
+            resource_child_physical_id = stack_resource.get("PhysicalResourceId")
+            resource_type = stack_resource.get("ResourceType")
 
-        # For CloudFormation Stacks that are not deleted, add all physical
-        # resources into the Allowlist dictionary to prevent the need to allowlist
-        # each and every resource
-        if resource_action in ("SKIP - ALLOWLIST", "SKIP - TTL"):
             try:
-                resource_details = self.client_cloudformation.describe_stack_resources(
-                    StackName=resource_id
-                ).get("StackResources")
+                _, service, resource = resource_type.split("::")
             except:
-                self.logging.error(
-                    f"Could not Describe Stack Resources for CloudFormation Stack '{resource_id}'."
+                self.logging.debug(
+                    f"CloudFormation Stack '{resource_id}' resource '{resource_type}' "
+                    "does not conform to the standard 'service-provider::service-name::data-type-name' and cannot be allowlisted."
                 )
-                self.logging.error(sys.exc_info()[1])
-                resource_action = "ERROR"
             else:
-                for stack_resource in resource_details:
-                    resource_child_logical_id = stack_resource.get("LogicalResourceId")
-                    resource_child_physical_id = stack_resource.get(
-                        "PhysicalResourceId"
-                    )
-                    resource_type = stack_resource.get("ResourceType")
-
-                    try:
-                        _, service, resource = resource_type.split("::")
-                    except:
-                        self.logging.debug(
-                            f"CloudFormation Stack '{resource_id}' resource '{resource_type}' "
-                            "does not conform to the standard 'service-provider::service-name::data-type-name' and cannot be allowlisted."
+                if resource_child_physical_id not in (None, ""):
+                    # Some resources are coming through as full ARNs instead of just
+                    # resource ID. Strip the ARN to just the resource ID.
+                    if "/" in resource_child_physical_id:
+                        resource_child_physical_id = resource_child_physical_id.split(
+                            "/"
+                        )[1]
+
+                    if resource in self.resource_translations:
+                        resource = self.resource_translations[resource]
+
+                    with self._allowlist_lock:
+                        self.allowlist[service.lower()][resource.lower()].add(
+                            resource_child_physical_id
                         )
-                    else:
-                        if resource_child_physical_id not in (None, ""):
-                            # Some resources are coming through as full ARNs instead of just
-                            # resource ID. Strip the ARN to just the resource ID.
-                            if "/" in resource_child_physical_id:
-                                resource_child_physical_id = (
-                                    resource_child_physical_id.split("/")[1]
-                                )
-
-                            if resource in self.resource_translations:
-                                resource = self.resource_translations[resource]
-
-                            self.allowlist[service.lower()][resource.lower()].add(
-                                resource_child_physical_id
-                            )
-
-                            self.logging.debug(
-                                f"{service} {resource} '{resource_child_physical_id}' has been added to the allowlist."
-                            )
-                        else:
-                            self.logging.debug(
-                                f"CloudFormation Stack '{resource_id}' resource '{resource_child_logical_id}' "
-                                "does not have a PhysicalResourceId and cannot be allowlisted."
-                            )
-
-        Helper.record_execution_log_action(
-            self.execution_log,
-            self.region,
-            "CloudFormation",
-            "Stack",
-            resource_id,
-            resource_action,
-        )
 
-        semaphore.release()
+                    self.logging.debug(
+                        f"{service} {resource} '{resource_child_physical_id}' has been added to the allowlist."
+                    )
+                else:
+                    self.logging.debug(
+                        f"CloudFormation Stack '{resource_id}' resource '{resource_child_logical_id}' "
+                        "does not have a PhysicalResourceId and cannot be allowlisted."
+                    )
 
         return True
@@ -0,0 +1,48 @@
+class CloudFormationStackIndex:
+    """
+    Run-scoped index of the CloudFormation Stack hierarchy within a region,
+    built from the Stacks listed by the cleanup: the parent of each Stack and
+    the nested Stacks beneath it.
+
+    Root and nested Stacks are resolved from memory instead of describing
+    each nested Stack's parent.
+    """
+
+    def __init__(self, stacks):
+        self._parents = {}
+        self._children = {}
+
+        for stack in stacks:
+            self._parents[stack.get("StackId")] = stack.get("ParentId")
+
+            if stack.get("ParentId") is not None:
+                self._children.setdefault(stack.get("ParentId"), []).append(
+                    stack.get("StackId")
+                )
+
+    def get_children(self, stack_id):
+        """Returns the IDs of the Stacks nested directly within the Stack."""
+        return self._children.get(stack_id, [])
+
+    def get_nested_stacks(self, stack_id):
+        """Returns the IDs of every Stack nested beneath the Stack, parents first."""
+        nested_stacks = []
+
+        for child_id in self.get_children(stack_id):
+            nested_stacks.append(child_id)
+            nested_stacks.extend(self.get_nested_stacks(child_id))
+
+        return nested_stacks
+
+    def is_root(self, stack_id):
+        """
+        Returns whether the Stack is at the top of its hierarchy, i.e., it is
+        not nested or its parent Stack has not been listed (e.g., it is
+        already being deleted along with its parent).
+        """
+        return self._parents.get(stack_id) not in self._parents
+
+    @property
+    def root_stacks(self):
+        """Returns the IDs of every Stack at the top of its hierarchy."""
+        return [stack_id for stack_id in self._parents if self.is_root(stack_id)]
@@ -3,7 +3,9 @@ import datetime
 
 import boto3
 
+from src.concurrency import WorkerPool
 from src.helper import Helper
+from src.stack_ownership import StackOwnership
 
 
 class CloudWatchCleanup:
@@ -26,7 +28,7 @@ class CloudWatchCleanup:
     def run(self):
         self.log_groups()
 
-    def log_groups(self):
+    def log_groups(self, resource_ids=None):
         """Deletes CloudWatch Log Groups."""
         self.logging.debug("Started cleanup of CloudWatch Log Groups.")
 
@@ -49,6 +51,17 @@ class CloudWatchCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("logGroupName") in resource_ids
+                ]
+
+            # deletions are taken in parallel while the remaining Log Groups are checked
+            pool = WorkerPool("logs")
+
             for resource in resources:
                 resource_id = resource.get("logGroupName")
                 resource_date = datetime.datetime.fromtimestamp(
@@ -58,24 +71,19 @@ class CloudWatchCleanup:
                 resource_action = None
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    if resource_age > resource_maximum_age:
-                        try:
-                            if not self.is_dry_run:
-                                self.client_logs.delete_log_group(
-                                    logGroupName=resource_id
-                                )
-                        except:
-                            self.logging.error(
-                                f"Could not delete CloudWatch Log Group '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.info(
-                                f"CloudWatch Log Group '{resource_id}' was created {resource_age} days ago "
-                                "and has been deleted."
-                            )
-                            resource_action = "DELETE"
+                    resource_stack = StackOwnership.get_stack(
+                        self.region, "AWS::Logs::LogGroup", resource_id
+                    )
+
+                    if resource_stack is not None:
+                        self.logging.debug(
+                            f"CloudWatch Log Group '{resource_id}' is being deleted by CloudFormation Stack '{resource_stack}'."
+                        )
+                        resource_action = "SKIP - STACK"
+                    elif resource_age > resource_maximum_age:
+                        resource_action = pool.submit(
+                            self.delete_log_group, resource_id, resource_age
+                        )
                     else:
                         self.logging.debug(
                             f"CloudWatch Log Group '{resource_id}' was created {resource_age} days ago (less than TTL setting) and has not been deleted."
@@ -94,10 +102,30 @@ class CloudWatchCleanup:
                     "Log Group",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of CloudWatch Log Groups.")
             return True
         else:
             self.logging.info("Skipping cleanup of CloudWatch Log Groups.")
             return True
+
+    def delete_log_group(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_logs.delete_log_group(logGroupName=resource_id)
+        except:
+            self.logging.error(
+                f"Could not delete CloudWatch Log Group '{resource_id}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"CloudWatch Log Group '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
@@ -0,0 +1,188 @@
+import concurrent.futures
+import threading
+import time
+
+import boto3
+
+from src.helper import Helper
+
+
+class ConcurrencyController:
+    """
+    Semaphore whose limit is adjusted using additive increase/multiplicative
+    decrease (AIMD). The limit grows by one worker after a full window of
+    successful calls and is halved when a call is throttled. Decreases are
+    spaced by a cooldown so that a burst of throttled calls made by workers
+    that were already in flight only cuts the limit once.
+    """
+
+    def __init__(self, name, initial, minimum=1, maximum=None, cooldown=1):
+        self.name = name
+        self.minimum = max(1, int(minimum))
+        self.maximum = int(maximum or initial)
+        self.limit = min(max(int(initial), self.minimum), self.maximum)
+        self.peak = self.limit
+        self.cooldown = cooldown
+
+        self.active = 0
+        self.successes = 0
+        self.throttles = 0
+        self.decreased = None
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def record_success(self):
+        with self.condition:
+            self.successes += 1
+
+            if self.successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self.peak = max(self.peak, self.limit)
+                self.successes = 0
+                self.condition.notify_all()
+
+    def record_throttle(self):
+        with self.condition:
+            self.throttles += 1
+            self.successes = 0
+
+            now = time.monotonic()
+            if self.decreased is None or now - self.decreased >= self.cooldown:
+                self.limit = max(self.minimum, self.limit // 2)
+                self.decreased = now
+
+
+class Concurrency:
+    """
+    Process-wide registry of concurrency controllers, one per AWS service.
+    Cleanup classes that work through their resources in parallel acquire a
+    worker from their service's controller instead of a fixed semaphore.
+
+    Every API call attempt made by a client created from the default boto3
+    session is reported to the controller of the call's service through the
+    botocore 'needs-retry' event, including attempts that botocore retries
+    itself. The initial and maximum number of workers for each service are
+    configured in the 'general.concurrency' setting.
+    """
+
+    throttling_error_codes = (
+        "BandwidthLimitExceeded",
+        "EC2ThrottledException",
+        "PriorRequestNotComplete",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "RequestThrottled",
+        "RequestThrottledException",
+        "SlowDown",
+        "ThrottledException",
+        "Throttling",
+        "ThrottlingException",
+        "TooManyRequestsException",
+    )
+
+    _controllers = {}
+    _lock = threading.Lock()
+    _settings = {}
+
+    @classmethod
+    def setup(cls, settings):
+        with cls._lock:
+            cls._controllers = {}
+            cls._settings = Helper.get_setting(settings, "general.concurrency", {})
+
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+
+        boto3.DEFAULT_SESSION.events.register_first(
+            "needs-retry", cls.needs_retry, unique_id="auto-cleanup-concurrency"
+        )
+
+    @classmethod
+    def get(cls, service, initial=1):
+        """Returns the service's controller, creating it on first use."""
+        with cls._lock:
+            if service not in cls._controllers:
+                service_settings = cls._settings.get(service, {})
+                initial = service_settings.get("initial", initial)
+
+                cls._controllers[service] = ConcurrencyController(
+                    service,
+                    initial,
+                    service_settings.get("minimum", 1),
+                    service_settings.get("maximum", initial),
+                )
+
+            return cls._controllers[service]
+
+    @classmethod
+    def needs_retry(cls, response=None, operation=None, **kwargs):
+        if response is None or operation is None:
+            return None
+
+        controller = cls._controllers.get(operation.service_model.service_name)
+
+        if controller is not None:
+            http_response, parsed = response
+
+            if parsed.get("Error", {}).get("Code") in cls.throttling_error_codes:
+                controller.record_throttle()
+            elif http_response.status_code < 300:
+                controller.record_success()
+
+        # never influence botocore's own retry decision
+        return None
+
+    @classmethod
+    def report(cls, logging):
+        """Logs the limit each service's controller has settled on."""
+        for service, controller in sorted(cls._controllers.items()):
+            logging.info(
+                f"Concurrency for '{service}' settled at {controller.limit} workers "
+                f"(peak of {controller.peak}, {controller.throttles} throttled calls)."
+            )
+
+
+class WorkerPool:
+    """
+    Bounded pool of workers used by cleanup classes to act on their
+    resources in parallel. The number of busy workers is governed by the
+    service's concurrency controller, so the pool backs off when the
+    service throttles its calls, while every call still passes through the
+    process-wide rate limiter.
+
+    Without a 'general.concurrency' setting for the service, the pool runs
+    a single worker and actions are taken one after another.
+    """
+
+    def __init__(self, service):
+        self.controller = Concurrency.get(service)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.controller.maximum,
+            thread_name_prefix=f"auto-cleanup-{service}",
+        )
+
+    def run(self, function, *args):
+        self.controller.acquire()
+
+        try:
+            return function(*args)
+        finally:
+            self.controller.release()
+
+    def submit(self, function, *args):
+        """Schedules an action and returns a future of its resource action."""
+        return self.executor.submit(self.run, function, *args)
+
+    def wait(self):
+        """Waits for all scheduled actions and their callbacks to complete."""
+        self.executor.shutdown(wait=True)
@@ -2,7 +2,10 @@ import sys
 
 import boto3
 
+from src.concurrency import WorkerPool
 from src.helper import Helper
+from src.inventory import Inventory
+from src.stack_ownership import StackOwnership
 
 
 class DynamoDBCleanup:
@@ -25,7 +28,7 @@ class DynamoDBCleanup:
     def run(self):
         self.tables()
 
-    def tables(self):
+    def tables(self, resource_ids=None):
         """Deletes DynamoDB Tables."""
         self.logging.debug("Started cleanup of DynamoDB Tables.")
 
@@ -46,53 +49,73 @@ class DynamoDBCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource for resource in resources if resource in resource_ids
+                ]
+
+            # deletions are taken in parallel while the remaining Tables are checked
+            pool = WorkerPool("dynamodb")
+
             for resource in resources:
-                try:
-                    resource_details = self.client_dynamodb.describe_table(
-                        TableName=resource
-                    ).get("Table")
-                except:
-                    self.logging.error(
-                        f"Could not get DynamoDB Table's '{resource}' details."
+                resource_date = None
+                resource_action = None
+
+                if Helper.not_allowlisted(resource, resource_allowlist):
+                    resource_stack = StackOwnership.get_stack(
+                        self.region, "AWS::DynamoDB::Table", resource
                     )
-                    self.logging.error(sys.exc_info()[1])
-                    resource_action = "ERROR"
-                else:
-                    resource_date = resource_details.get("CreationDateTime")
-                    resource_age = Helper.get_day_delta(resource_date).days
-                    resource_action = None
 
-                    if Helper.not_allowlisted(resource, resource_allowlist):
+                    if resource_stack is not None:
+                        self.logging.debug(
+                            f"DynamoDB Table '{resource}' is being deleted by CloudFormation Stack '{resource_stack}'."
+                        )
+                        resource_action = "SKIP - STACK"
+                    else:
+                        # tables that were still within their TTL during the previous
+                        # run can be rechecked without describing them again
+                        resource_date = Inventory.get_resource_date(
+                            self.region,
+                            "DynamoDB",
+                            "Table",
+                            resource,
+                            resource_maximum_age,
+                        )
+
+                    if resource_action is None and resource_date is None:
+                        try:
+                            resource_date = (
+                                self.client_dynamodb.describe_table(TableName=resource)
+                                .get("Table")
+                                .get("CreationDateTime")
+                            )
+                        except:
+                            self.logging.error(
+                                f"Could not get DynamoDB Table's '{resource}' details."
+                            )
+                            self.logging.error(sys.exc_info()[1])
+                            resource_action = "ERROR"
+
+                    if resource_action is None:
+                        resource_age = Helper.get_day_delta(resource_date).days
+
                         if resource_age > resource_maximum_age:
-                            try:
-                                if not self.is_dry_run:
-                                    self.client_dynamodb.delete_table(
-                                        TableName=resource
-                                    )
-                            except:
-                                self.logging.error(
-                                    f"Could not delete DynamoDB Table '{resource}'."
-                                )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
-                            else:
-                                self.logging.info(
-                                    f"DynamoDB Table '{resource}' was created {resource_age} days ago "
-                                    "and has been deleted."
-                                )
-                                resource_action = "DELETE"
+                            resource_action = pool.submit(
+                                self.delete_table, resource, resource_age
+                            )
                         else:
                             self.logging.debug(
                                 f"DynamoDB Table '{resource}' was created {resource_age} days ago "
                                 "(less than TTL setting) and has not been deleted."
                             )
                             resource_action = "SKIP - TTL"
-                    else:
-                        self.logging.debug(
-                            f"DynamoDB Table '{resource}' has been allowlisted and has not "
-                            "been deleted."
-                        )
-                        resource_action = "SKIP - ALLOWLIST"
+                else:
+                    self.logging.debug(
+                        f"DynamoDB Table '{resource}' has been allowlisted and has not "
+                        "been deleted."
+                    )
+                    resource_action = "SKIP - ALLOWLIST"
 
                 Helper.record_execution_log_action(
                     self.execution_log,
@@ -101,10 +124,28 @@ class DynamoDBCleanup:
                     "Table",
                     resource,
                     resource_action,
+                    resource_date,
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of DynamoDB Tables.")
             return True
         else:
             self.logging.info("Skipping cleanup of DynamoDB Tables.")
             return True
+
+    def delete_table(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_dynamodb.delete_table(TableName=resource_id)
+        except:
+            self.logging.error(f"Could not delete DynamoDB Table '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"DynamoDB Table '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
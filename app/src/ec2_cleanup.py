@@ -1,8 +1,15 @@
+import concurrent.futures
+import functools
 import sys
 
 import boto3
+import botocore
 
+from src.concurrency import WorkerPool
+from src.ec2_reference_index import EC2ReferenceIndex
 from src.helper import Helper
+from src.stack_ownership import StackOwnership
+from src.waiter import Waiter
 
 
 class EC2Cleanup:
@@ -15,8 +22,17 @@ class EC2Cleanup:
 
         self._client_ec2 = None
         self._client_sts = None
+        self._reference_index = None
         self._resource_ec2 = None
+
+        # Instances stopped within this run and the actions of those terminated once stopped
+        self._stopping_instances = {}
+        self._terminated_instances = {}
+
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
+        self.is_prefiltering = Helper.get_setting(
+            self.settings, "general.prefilter", True
+        )
 
     @property
     def client_sts(self):
@@ -34,6 +50,14 @@ class EC2Cleanup:
             self._client_ec2 = boto3.client("ec2", region_name=self.region)
         return self._client_ec2
 
+    @property
+    def reference_index(self):
+        if not self._reference_index:
+            self._reference_index = EC2ReferenceIndex(
+                self.client_ec2, self.is_prefiltering
+            )
+        return self._reference_index
+
     @property
     def resource_ec2(self):
         if not self._resource_ec2:
@@ -60,35 +84,27 @@ class EC2Cleanup:
 
         if is_cleaning_enabled:
             try:
-                resources = self.client_ec2.describe_addresses().get("Addresses")
+                resources = self.reference_index.addresses
             except:
                 self.logging.error("Could not list all EC2 Addresses.")
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # releases are taken in parallel while the remaining Addresses are checked
+            pool = WorkerPool("ec2")
+
             for resource in resources:
                 resource_id = resource.get("AllocationId")
                 resource_action = None
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    if resource.get("AssociationId") is None:
-                        try:
-                            if not self.is_dry_run:
-                                self.client_ec2.release_address(
-                                    AllocationId=resource_id
-                                )
-                        except:
-                            self.logging.error(
-                                f"Could not release EC2 Address '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.info(
-                                f"EC2 Address '{resource.get('PublicIp')}' is not associated with an EC2 instance and has "
-                                "been released."
-                            )
-                            resource_action = "DELETE"
+                    if (
+                        self.reference_index.get_address_association(resource_id)
+                        is None
+                    ):
+                        resource_action = pool.submit(
+                            self.release_address, resource_id, resource.get("PublicIp")
+                        )
                     else:
                         self.logging.debug(
                             f"EC2 Address '{resource_id}' is associated with an EC2 instance and has not "
@@ -111,6 +127,8 @@ class EC2Cleanup:
                     resource_action,
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of EC2 Addresses.")
             return True
         else:
@@ -131,11 +149,7 @@ class EC2Cleanup:
 
         if is_cleaning_enabled:
             try:
-                resources = self.client_ec2.describe_images(
-                    Owners=[
-                        "self",
-                    ]
-                ).get("Images")
+                resources = self.reference_index.images
             except:
                 self.logging.error("Could not list all EC2 Images.")
                 self.logging.error(sys.exc_info()[1])
@@ -153,6 +167,7 @@ class EC2Cleanup:
                         try:
                             if not self.is_dry_run:
                                 self.client_ec2.deregister_image(ImageId=resource_id)
+                                self.reference_index.remove_image(resource_id)
                         except:
                             self.logging.error(
                                 f"Could not deregister EC2 Image '{resource_id}'."
@@ -193,11 +208,12 @@ class EC2Cleanup:
             self.logging.info("Skipping cleanup of EC2 Images.")
             return True
 
-    def instances(self):
+    def instances(self, resource_ids=None):
         """
-        Stops running Instances and terminates stopped instances.
-        If Instance has termination protection enabled, the protection will
-        be first disabled and then the Instance will be terminated.
+        Stops running Instances and terminates stopped Instances, including
+        those stopped within the same run. If an Instance has termination
+        protection enabled, the protection will be first disabled and then
+        the Instance will be terminated.
         """
         self.logging.debug("Started cleanup of EC2 Instances.")
 
@@ -220,6 +236,24 @@ class EC2Cleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                reservations = [
+                    {
+                        "Instances": [
+                            resource
+                            for resource in reservation.get("Instances")
+                            if resource.get("InstanceId") in resource_ids
+                        ]
+                    }
+                    for reservation in reservations
+                ]
+
+            # expired Instances are stopped and terminated in batches once all
+            # Instances have been checked, their actions are filled in afterwards
+            running_instances = {}
+            stopped_instances = {}
+
             for reservation in reservations:
                 for resource in reservation.get("Instances"):
                     resource_id = resource.get("InstanceId")
@@ -231,80 +265,17 @@ class EC2Cleanup:
                     if Helper.not_allowlisted(resource_id, resource_allowlist):
                         if resource_age > resource_maximum_age:
                             if resource_state == "running":
-                                try:
-                                    if not self.is_dry_run:
-                                        self.client_ec2.stop_instances(
-                                            InstanceIds=[resource_id]
-                                        )
-                                except:
-                                    self.logging.error(
-                                        f"Could not stop EC2 Instance '{resource_id}'."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    self.logging.info(
-                                        f"EC2 Instance '{resource_id}' in a 'running' state was last "
-                                        f"launched {resource_age} days ago and has been stopped."
-                                    )
-                                    resource_action = "STOP"
+                                resource_action = concurrent.futures.Future()
+                                running_instances[resource_id] = (
+                                    resource_action,
+                                    resource_age,
+                                )
                             elif resource_state == "stopped":
-                                # disable termination protection before terminating the instance
-                                try:
-                                    resource_protection = (
-                                        self.client_ec2.describe_instance_attribute(
-                                            Attribute="disableApiTermination",
-                                            InstanceId=resource_id,
-                                        )
-                                        .get("DisableApiTermination")
-                                        .get("Value")
-                                    )
-                                except:
-                                    self.logging.error(
-                                        f"Could not get if protection for EC2 Instance '{resource_id}' is on."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    if resource_protection:
-                                        try:
-                                            if not self.is_dry_run:
-                                                self.client_ec2.modify_instance_attribute(
-                                                    DisableApiTermination={
-                                                        "Value": False
-                                                    },
-                                                    InstanceId=resource_id,
-                                                )
-                                        except:
-                                            self.logging.error(
-                                                f"Could not remove termination protection from EC2 Instance '{resource_id}'."
-                                            )
-                                            self.logging.error(sys.exc_info()[1])
-                                            resource_action = "ERROR"
-                                        else:
-                                            self.logging.debug(
-                                                f"EC2 Instance '{resource_id}' had termination protection "
-                                                "turned on and now has been turned off."
-                                            )
-
-                                    if resource_action != "ERROR":
-                                        try:
-                                            if not self.is_dry_run:
-                                                self.client_ec2.terminate_instances(
-                                                    InstanceIds=[resource_id]
-                                                )
-                                        except:
-                                            self.logging.error(
-                                                f"Could not delete Instance EC2 '{resource_id}'."
-                                            )
-                                            self.logging.error(sys.exc_info()[1])
-                                            resource_action = "ERROR"
-                                        else:
-                                            self.logging.info(
-                                                f"EC2 Instance '{resource_id}' in a 'stopped' state was last "
-                                                f"launched {resource_age} days ago and has been terminated."
-                                            )
-                                            resource_action = "DELETE"
+                                resource_action = concurrent.futures.Future()
+                                stopped_instances[resource_id] = (
+                                    resource_action,
+                                    resource_age,
+                                )
                         else:
                             self.logging.debug(
                                 f"EC2 Instance '{resource_id}' was created {resource_age} days ago "
@@ -326,12 +297,201 @@ class EC2Cleanup:
                         resource_action,
                     )
 
+            stopped_instances.update(self.stop_instances(running_instances))
+            self.terminate_instances(stopped_instances)
+
             self.logging.debug("Finished cleanup of EC2 Instances.")
             return True
         else:
             self.logging.info("Skipping cleanup of EC2 Instances.")
             return True
 
+    def stop_instances(self, instances):
+        """
+        Stops running Instances in chunks. Stopping Instances are handed to
+        the Waiter and are terminated in chunks in the background as they
+        stop, Instances that do not stop before the run ends are left for
+        the next run. Returns the Instances that can be terminated straight away,
+        which is every stopped Instance during a DRY RUN.
+        """
+        stopped_instances = {}
+
+        for chunk in Helper.chunks(list(instances), 100):
+            try:
+                if not self.is_dry_run:
+                    self.client_ec2.stop_instances(InstanceIds=chunk)
+            except:
+                self.logging.error(f"Could not stop EC2 Instances {chunk}.")
+                self.logging.error(sys.exc_info()[1])
+
+                for resource_id in chunk:
+                    instances.get(resource_id)[0].set_result("ERROR")
+            else:
+                for resource_id in chunk:
+                    resource_action, resource_age = instances.get(resource_id)
+
+                    self.logging.info(
+                        f"EC2 Instance '{resource_id}' in a 'running' state was last "
+                        f"launched {resource_age} days ago and has been stopped."
+                    )
+
+                    if self.is_dry_run:
+                        stopped_instances[resource_id] = instances.get(resource_id)
+                    else:
+                        self._stopping_instances[resource_id] = resource_age
+
+                        Waiter.wait(
+                            self.poll_instances,
+                            resource_id,
+                            functools.partial(
+                                self._terminated_instances.pop, resource_id
+                            ),
+                            "STOP",
+                        ).add_done_callback(
+                            lambda waiter_action, resource_action=resource_action: resource_action.set_result(
+                                waiter_action.result()
+                            )
+                        )
+
+        return stopped_instances
+
+    def poll_instances(self, resource_ids):
+        """
+        Terminates the Instances that have stopped in chunks and returns
+        their IDs, their actions are kept until the Waiter collects them.
+        """
+        stopped_instances = []
+
+        for chunk in Helper.chunks(resource_ids, 100):
+            paginator = self.client_ec2.get_paginator("describe_instances")
+            reservations = (
+                paginator.paginate(InstanceIds=chunk)
+                .build_full_result()
+                .get("Reservations")
+            )
+
+            stopped_instances.extend(
+                resource.get("InstanceId")
+                for reservation in reservations
+                for resource in reservation.get("Instances")
+                if resource.get("State").get("Name") == "stopped"
+            )
+
+        instances = {
+            resource_id: (
+                concurrent.futures.Future(),
+                self._stopping_instances.pop(resource_id),
+            )
+            for resource_id in stopped_instances
+        }
+        self.terminate_instances(instances)
+
+        for resource_id, (resource_action, _) in instances.items():
+            self._terminated_instances[resource_id] = resource_action.result()
+
+        return stopped_instances
+
+    def terminate_instances(self, instances):
+        """
+        Terminates stopped Instances in chunks. TerminateInstances accepts
+        Instances in any state, but rejects the whole call if one of them
+        cannot be terminated (e.g., due to termination protection) or does
+        not exist, in which case the chunk's Instances are terminated one by
+        one. Any other error is recorded against the chunk's Instances.
+        """
+        for chunk in Helper.chunks(list(instances), 100):
+            try:
+                if not self.is_dry_run:
+                    self.client_ec2.terminate_instances(InstanceIds=chunk)
+            except botocore.exceptions.ClientError as error:
+                if (
+                    error.response.get("Error", {})
+                    .get("Code", "")
+                    .startswith(("OperationNotPermitted", "InvalidInstanceID"))
+                ):
+                    self.logging.debug(
+                        f"Could not terminate EC2 Instances {chunk} together, "
+                        "terminating them one by one."
+                    )
+
+                    for resource_id in chunk:
+                        resource_action, resource_age = instances.get(resource_id)
+                        resource_action.set_result(
+                            self.terminate_instance(resource_id, resource_age)
+                        )
+                else:
+                    self.logging.error(f"Could not terminate EC2 Instances {chunk}.")
+                    self.logging.error(sys.exc_info()[1])
+
+                    for resource_id in chunk:
+                        instances.get(resource_id)[0].set_result("ERROR")
+            except:
+                self.logging.error(f"Could not terminate EC2 Instances {chunk}.")
+                self.logging.error(sys.exc_info()[1])
+
+                for resource_id in chunk:
+                    instances.get(resource_id)[0].set_result("ERROR")
+            else:
+                for resource_id in chunk:
+                    resource_action, resource_age = instances.get(resource_id)
+
+                    self.logging.info(
+                        f"EC2 Instance '{resource_id}' was last launched {resource_age} days ago "
+                        "and has been terminated."
+                    )
+                    resource_action.set_result("DELETE")
+
+    def terminate_instance(self, resource_id, resource_age):
+        """Terminates an Instance after disabling its termination protection."""
+        try:
+            resource_protection = (
+                self.client_ec2.describe_instance_attribute(
+                    Attribute="disableApiTermination",
+                    InstanceId=resource_id,
+                )
+                .get("DisableApiTermination")
+                .get("Value")
+            )
+        except:
+            self.logging.error(
+                f"Could not get if protection for EC2 Instance '{resource_id}' is on."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+
+        if resource_protection:
+            try:
+                if not self.is_dry_run:
+                    self.client_ec2.modify_instance_attribute(
+                        DisableApiTermination={"Value": False},
+                        InstanceId=resource_id,
+                    )
+            except:
+                self.logging.error(
+                    f"Could not remove termination protection from EC2 Instance '{resource_id}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                return "ERROR"
+            else:
+                self.logging.debug(
+                    f"EC2 Instance '{resource_id}' had termination protection "
+                    "turned on and now has been turned off."
+                )
+
+        try:
+            if not self.is_dry_run:
+                self.client_ec2.terminate_instances(InstanceIds=[resource_id])
+        except:
+            self.logging.error(f"Could not delete Instance EC2 '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EC2 Instance '{resource_id}' was last launched {resource_age} days ago "
+                "and has been terminated."
+            )
+            return "DELETE"
+
     def nat_gateways(self):
         """Deletes NAT Gateways."""
         self.logging.debug("Started cleanup of EC2 NAT Gateways.")
@@ -414,7 +574,10 @@ class EC2Cleanup:
             return True
 
     def security_groups(self):
-        """Deletes Security Groups not attached to an EC2 Instance."""
+        """
+        Deletes Security Groups that are neither used by a Network Interface
+        nor referenced within the rules of another Security Group.
+        """
         self.logging.debug("Started cleanup of EC2 Security Groups.")
 
         is_cleaning_enabled = Helper.get_setting(
@@ -424,8 +587,10 @@ class EC2Cleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_ec2.get_paginator("describe_security_groups")
-                resources = paginator.paginate().build_full_result()["SecurityGroups"]
+                resources = self.reference_index.security_groups
+
+                # usage is worked out up front so that only unused Security Groups are deleted
+                self.reference_index.network_interfaces
             except:
                 self.logging.error("Could not retrieve all unused Security Groups.")
                 self.logging.error(sys.exc_info()[1])
@@ -433,10 +598,40 @@ class EC2Cleanup:
 
             for resource in resources:
                 resource_id = resource.get("GroupId")
+                resource_stack = StackOwnership.get_stack(
+                    self.region, "AWS::EC2::SecurityGroup", resource_id
+                )
                 resource_action = None
 
                 if resource.get("GroupName") != "default":
-                    if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    if not Helper.not_allowlisted(resource_id, resource_allowlist):
+                        self.logging.debug(
+                            f"EC2 Security Group '{resource_id}' has been allowlisted and has not been deleted."
+                        )
+                        resource_action = "SKIP - ALLOWLIST"
+                    elif resource_stack is not None:
+                        self.logging.debug(
+                            f"EC2 Security Group '{resource_id}' is being deleted by CloudFormation Stack '{resource_stack}'."
+                        )
+                        resource_action = "SKIP - STACK"
+                    elif self.reference_index.get_security_group_interfaces(
+                        resource_id
+                    ):
+                        self.logging.debug(
+                            f"EC2 Security Group '{resource_id}' has a network association "
+                            "and cannot been deleted without deleting the association first."
+                        )
+                        resource_action = "SKIP - IN USE"
+                    elif self.reference_index.get_security_group_references(
+                        resource_id
+                    ):
+                        self.logging.debug(
+                            f"EC2 Security Group '{resource_id}' is referenced by EC2 Security Groups "
+                            f"{sorted(self.reference_index.get_security_group_references(resource_id))} "
+                            "and cannot been deleted without deleting the references first."
+                        )
+                        resource_action = "SKIP - IN USE"
+                    else:
                         try:
                             if not self.is_dry_run:
                                 self.client_ec2.delete_security_group(
@@ -461,11 +656,6 @@ class EC2Cleanup:
                                 "been deleted."
                             )
                             resource_action = "DELETE"
-                    else:
-                        self.logging.debug(
-                            f"EC2 Security Group '{resource_id}' has been allowlisted and has not been deleted."
-                        )
-                        resource_action = "SKIP - ALLOWLIST"
 
                     Helper.record_execution_log_action(
                         self.execution_log,
@@ -482,7 +672,7 @@ class EC2Cleanup:
             self.logging.info("Skipping cleanup of EC2 Security Groups.")
             return True
 
-    def snapshots(self):
+    def snapshots(self, resource_ids=None):
         """Deletes Snapshots not attached to EBS volumes."""
         self.logging.debug("Started cleanup of EC2 Snapshots.")
 
@@ -511,56 +701,39 @@ class EC2Cleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("SnapshotId") in resource_ids
+                ]
+
+            # deletions are taken in parallel while the remaining Snapshots are checked
+            pool = WorkerPool("ec2")
+
             for resource in resources:
                 resource_id = resource.get("SnapshotId")
                 resource_date = resource.get("StartTime")
                 resource_action = None
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    snapshots_in_use = []
                     try:
-                        images = self.client_ec2.describe_images(
-                            Owners=[
-                                "self",
-                            ]
-                        ).get("Images")
+                        resource_images = self.reference_index.get_snapshot_images(
+                            resource_id
+                        )
                     except:
                         self.logging.error("Could not retrieve EC2 Images.")
                         self.logging.error(sys.exc_info()[1])
                         resource_action = "ERROR"
                     else:
-                        for image in images:
-                            block_device_mappings = image.get("BlockDeviceMappings")
-
-                            for block_device_mapping in block_device_mappings:
-                                if "Ebs" in block_device_mapping:
-                                    snapshots_in_use.append(
-                                        block_device_mapping.get("Ebs").get(
-                                            "SnapshotId"
-                                        )
-                                    )
-
-                        if resource_id not in snapshots_in_use:
+                        if not resource_images:
                             resource_age = Helper.get_day_delta(resource_date).days
 
                             if resource_age > resource_maximum_age:
-                                try:
-                                    if not self.is_dry_run:
-                                        self.client_ec2.delete_snapshot(
-                                            SnapshotId=resource_id
-                                        )
-                                except:
-                                    self.logging.error(
-                                        f"Could not delete EC2 Snapshot '{resource_id}'."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    self.logging.info(
-                                        f"EC2 Snapshot '{resource_id}' was created {resource_age} days ago "
-                                        "and has been deleted."
-                                    )
-                                    resource_action = "DELETE"
+                                resource_action = pool.submit(
+                                    self.delete_snapshot, resource_id, resource_age
+                                )
                             else:
                                 self.logging.debug(
                                     f"EC2 Snapshot '{resource_id} was created {resource_age} days ago "
@@ -586,15 +759,18 @@ class EC2Cleanup:
                     "Snapshot",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of EC2 Snapshots.")
             return True
         else:
             self.logging.info("Skipping cleanup of EC2 Snapshots.")
             return True
 
-    def volumes(self):
+    def volumes(self, resource_ids=None):
         """Deletes Volumes not attached to an EC2 Instance."""
         self.logging.debug("Started cleanup of EC2 Volumes.")
 
@@ -608,38 +784,36 @@ class EC2Cleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_ec2.get_paginator("describe_volumes")
-                resources = paginator.paginate().build_full_result().get("Volumes")
+                resources = self.reference_index.volumes
             except:
                 self.logging.error("Could not list all EC2 Volumes.")
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("VolumeId") in resource_ids
+                ]
+
+            # deletions are taken in parallel while the remaining Volumes are checked
+            pool = WorkerPool("ec2")
+
             for resource in resources:
                 resource_id = resource.get("VolumeId")
                 resource_date = resource.get("CreateTime")
                 resource_action = None
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    if resource.get("Attachments") == []:
+                    if self.reference_index.get_volume_instance(resource_id) is None:
                         resource_age = Helper.get_day_delta(resource_date).days
 
                         if resource_age > resource_maximum_age:
-                            try:
-                                if not self.is_dry_run:
-                                    self.client_ec2.delete_volume(VolumeId=resource_id)
-                            except:
-                                self.logging.error(
-                                    f"Could not delete EC2 Volume '{resource_id}'."
-                                )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
-                            else:
-                                self.logging.info(
-                                    f"EC2 Volume '{resource_id}' was created {resource_age} days ago "
-                                    "and has been deleted."
-                                )
-                                resource_action = "DELETE"
+                            resource_action = pool.submit(
+                                self.delete_volume, resource_id, resource_age
+                            )
                         else:
                             self.logging.debug(
                                 f"EC2 Volume '{resource_id}' was created {resource_age} days ago "
@@ -665,14 +839,62 @@ class EC2Cleanup:
                     "Volume",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
+            pool.wait()
+
             self.logging.debug("Started cleanup of EC2 Volumes.")
             return True
         else:
             self.logging.info("Skipping cleanup of EC2 Volumes.")
             return True
 
+    def release_address(self, resource_id, resource_public_ip):
+        try:
+            if not self.is_dry_run:
+                self.client_ec2.release_address(AllocationId=resource_id)
+        except:
+            self.logging.error(f"Could not release EC2 Address '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EC2 Address '{resource_public_ip}' is not associated with an EC2 instance and has "
+                "been released."
+            )
+            return "DELETE"
+
+    def delete_snapshot(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_ec2.delete_snapshot(SnapshotId=resource_id)
+        except:
+            self.logging.error(f"Could not delete EC2 Snapshot '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EC2 Snapshot '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
+
+    def delete_volume(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_ec2.delete_volume(VolumeId=resource_id)
+        except:
+            self.logging.error(f"Could not delete EC2 Volume '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EC2 Volume '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
+
     def __get_ec2_launch_time(self, resource):
         for network_interface in resource.get("NetworkInterfaces"):
             if network_interface.get("Attachment").get("DeviceIndex") == 0:
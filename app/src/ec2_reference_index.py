@@ -0,0 +1,174 @@
+import threading
+
+
+class EC2ReferenceIndex:
+    """
+    Run-scoped index of the references between EC2 resources within a
+    region: the Snapshots used by each Image, the Instance each Volume is
+    attached to, the Network Interfaces using each Security Group, the
+    Security Groups referencing each Security Group within their rules and
+    the association of each Address.
+
+    Each part of the index is built from a single listing the first time it
+    is consulted and is then shared by every cleanup that needs it, instead
+    of each cleanup (or each resource) listing the same resources again.
+    Listing errors are raised to the consulting cleanup.
+
+    When prefiltering, only Volumes that are available are listed as
+    attached Volumes are never deleted.
+    """
+
+    def __init__(self, client_ec2, is_prefiltering=False):
+        self.client_ec2 = client_ec2
+        self.is_prefiltering = is_prefiltering
+
+        self._addresses = None
+        self._images = None
+        self._network_interfaces = None
+        self._security_groups = None
+        self._volumes = None
+
+        self._address_associations = {}
+        self._snapshot_images = {}
+        self._security_group_interfaces = {}
+        self._security_group_references = {}
+        self._volume_instances = {}
+
+        self._lock = threading.RLock()
+
+    @property
+    def addresses(self):
+        with self._lock:
+            if self._addresses is None:
+                addresses = self.client_ec2.describe_addresses().get("Addresses")
+
+                self._address_associations = {
+                    address.get("AllocationId"): address.get("AssociationId")
+                    for address in addresses
+                    if address.get("AssociationId") is not None
+                }
+                self._addresses = addresses
+
+            return self._addresses
+
+    @property
+    def images(self):
+        with self._lock:
+            if self._images is None:
+                images = self.client_ec2.describe_images(
+                    Owners=[
+                        "self",
+                    ]
+                ).get("Images")
+
+                self._snapshot_images = {}
+                for image in images:
+                    for block_device_mapping in image.get("BlockDeviceMappings", []):
+                        if "Ebs" in block_device_mapping:
+                            self._snapshot_images.setdefault(
+                                block_device_mapping.get("Ebs").get("SnapshotId"),
+                                set(),
+                            ).add(image.get("ImageId"))
+                self._images = images
+
+            return self._images
+
+    @property
+    def network_interfaces(self):
+        with self._lock:
+            if self._network_interfaces is None:
+                paginator = self.client_ec2.get_paginator("describe_network_interfaces")
+                network_interfaces = (
+                    paginator.paginate().build_full_result().get("NetworkInterfaces")
+                )
+
+                self._security_group_interfaces = {}
+                for network_interface in network_interfaces:
+                    for group in network_interface.get("Groups", []):
+                        self._security_group_interfaces.setdefault(
+                            group.get("GroupId"), set()
+                        ).add(network_interface.get("NetworkInterfaceId"))
+                self._network_interfaces = network_interfaces
+
+            return self._network_interfaces
+
+    @property
+    def security_groups(self):
+        with self._lock:
+            if self._security_groups is None:
+                paginator = self.client_ec2.get_paginator("describe_security_groups")
+                security_groups = (
+                    paginator.paginate().build_full_result().get("SecurityGroups")
+                )
+
+                self._security_group_references = {}
+                for security_group in security_groups:
+                    for permission in security_group.get(
+                        "IpPermissions", []
+                    ) + security_group.get("IpPermissionsEgress", []):
+                        for pair in permission.get("UserIdGroupPairs", []):
+                            # a rule referencing its own Security Group does not prevent its deletion
+                            if pair.get("GroupId") != security_group.get("GroupId"):
+                                self._security_group_references.setdefault(
+                                    pair.get("GroupId"), set()
+                                ).add(security_group.get("GroupId"))
+                self._security_groups = security_groups
+
+            return self._security_groups
+
+    @property
+    def volumes(self):
+        with self._lock:
+            if self._volumes is None:
+                paginator = self.client_ec2.get_paginator("describe_volumes")
+                volumes = (
+                    paginator.paginate(
+                        Filters=(
+                            [{"Name": "status", "Values": ["available"]}]
+                            if self.is_prefiltering
+                            else []
+                        )
+                    )
+                    .build_full_result()
+                    .get("Volumes")
+                )
+
+                self._volume_instances = {
+                    volume.get("VolumeId"): attachment.get("InstanceId")
+                    for volume in volumes
+                    for attachment in volume.get("Attachments", [])
+                }
+                self._volumes = volumes
+
+            return self._volumes
+
+    def get_address_association(self, allocation_id):
+        """Returns the Address' association ID or None if it is not associated."""
+        self.addresses  # builds this part of the index on first use
+        return self._address_associations.get(allocation_id)
+
+    def get_snapshot_images(self, snapshot_id):
+        """Returns the IDs of the Images using the Snapshot."""
+        self.images  # builds this part of the index on first use
+        return self._snapshot_images.get(snapshot_id, set())
+
+    def get_security_group_interfaces(self, group_id):
+        """Returns the IDs of the Network Interfaces using the Security Group."""
+        self.network_interfaces  # builds this part of the index on first use
+        return self._security_group_interfaces.get(group_id, set())
+
+    def get_security_group_references(self, group_id):
+        """Returns the IDs of the other Security Groups referencing the Security Group."""
+        self.security_groups  # builds this part of the index on first use
+        return self._security_group_references.get(group_id, set())
+
+    def get_volume_instance(self, volume_id):
+        """Returns the ID of the Instance the Volume is attached to or None."""
+        self.volumes  # builds this part of the index on first use
+        return self._volume_instances.get(volume_id)
+
+    def remove_image(self, image_id):
+        """Removes a deregistered Image so that its Snapshots are no longer in use."""
+        with self._lock:
+            for image_ids in self._snapshot_images.values():
+                image_ids.discard(image_id)
@@ -1,7 +1,9 @@
+import concurrent.futures
 import sys
 
 import boto3
 
+from src.concurrency import WorkerPool
 from src.helper import Helper
 
 
@@ -25,7 +27,7 @@ class ECRCleanup:
     def run(self):
         self.repositories()
 
-    def repositories(self):
+    def repositories(self, resource_ids=None):
         """Deletes ECR Repositories."""
         self.logging.debug("Started cleanup of ECR Repositories.")
 
@@ -46,66 +48,25 @@ class ECRCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("repositoryName") in resource_ids
+                ]
+
+            # Repositories are cleaned up in parallel while the remaining Repositories are checked
+            pool = WorkerPool("ecr")
+
+            # the actions of each Repository's Images are buffered while the
+            # Repositories are cleaned up in parallel and recorded in listing order
+            image_actions = []
+
             for resource in resources:
                 resource_id = resource.get("repositoryName")
-                resource_date = resource.get("createdAt")
-                resource_age = Helper.get_day_delta(resource_date).days
-                resource_action = None
-
-                # for each repository, we must first delete all the
-                # images before deleting the repository itself
-                self.images(resource_id)
-
-                if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    try:
-                        paginator = self.client_ecr.get_paginator("list_images")
-                        list_images = (
-                            paginator.paginate(repositoryName=resource_id)
-                            .build_full_result()
-                            .get("imageIds")
-                        )
-                    except:
-                        self.logging.error(
-                            f"Could not list all ECR Images for ECR Repository '{resource_id}'."
-                        )
-                        self.logging.error(sys.exc_info()[1])
-                        resource_action = "ERROR"
-                    else:
-                        if len(list_images) == 0:
-                            if resource_age > resource_maximum_age:
-                                try:
-                                    if not self.is_dry_run:
-                                        self.client_ecr.delete_repository(
-                                            repositoryName=resource_id
-                                        )
-                                except:
-                                    self.logging.error(
-                                        f"Could not delete ECR Repository '{resource_id}'."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    self.logging.info(
-                                        f"ECR Repository '{resource_id}' was created {resource_age} days ago "
-                                        "and has been deleted."
-                                    )
-                                    resource_action = "DELETE"
-                            else:
-                                self.logging.debug(
-                                    f"ECR Repository '{resource_id}' was created {resource_age} days ago "
-                                    "(less than TTL setting) and has not been deleted."
-                                )
-                                resource_action = "SKIP - TTL"
-                        else:
-                            self.logging.debug(
-                                f"ECR Repository '{resource_id}' contains ECR Images and has not been deleted."
-                            )
-                            resource_action = "SKIP - IN USE"
-                else:
-                    self.logging.debug(
-                        f"ECR Repository '{resource_id}' has been allowlisted and has not been deleted."
-                    )
-                    resource_action = "SKIP - ALLOWLIST"
+                resource_image_actions = []
+                image_actions.append(resource_image_actions)
 
                 Helper.record_execution_log_action(
                     self.execution_log,
@@ -113,17 +74,96 @@ class ECRCleanup:
                     "ECR",
                     "Repository",
                     resource_id,
-                    resource_action,
+                    pool.submit(
+                        self.repository,
+                        resource,
+                        resource_allowlist,
+                        resource_maximum_age,
+                        resource_image_actions,
+                    ),
                 )
 
+            pool.wait()
+
+            for resource_image_actions in image_actions:
+                for resource_id, resource_action in resource_image_actions:
+                    Helper.record_execution_log_action(
+                        self.execution_log,
+                        self.region,
+                        "ECR",
+                        "Image",
+                        resource_id,
+                        resource_action,
+                    )
+
             self.logging.debug("Finished cleanup of ECR Repositories.")
             return True
         else:
             self.logging.info("Skipping cleanup of ECR Repositories.")
             return True
 
-    def images(self, repository):
-        """Deletes ECR Images for a Repository."""
+    def repository(
+        self, resource, resource_allowlist, resource_maximum_age, image_actions
+    ):
+        """
+        Deletes a Repository's ECR Images and then the Repository once empty.
+        The actions taken on the Images are appended to image_actions.
+        """
+        resource_id = resource.get("repositoryName")
+        resource_date = resource.get("createdAt")
+        resource_age = Helper.get_day_delta(resource_date).days
+
+        is_expired = resource_age > resource_maximum_age
+
+        # for each repository, we must first delete all the
+        # images before deleting the repository itself
+        remaining_images = self.images(resource_id, image_actions)
+
+        if Helper.not_allowlisted(resource_id, resource_allowlist):
+            if remaining_images is None:
+                return "ERROR"
+            elif remaining_images == 0:
+                if is_expired:
+                    return self.delete_repository(resource_id, resource_age)
+                else:
+                    self.logging.debug(
+                        f"ECR Repository '{resource_id}' was created {resource_age} days ago "
+                        "(less than TTL setting) and has not been deleted."
+                    )
+                    return "SKIP - TTL"
+            else:
+                self.logging.debug(
+                    f"ECR Repository '{resource_id}' contains ECR Images and has not been deleted."
+                )
+                return "SKIP - IN USE"
+        else:
+            self.logging.debug(
+                f"ECR Repository '{resource_id}' has been allowlisted and has not been deleted."
+            )
+            return "SKIP - ALLOWLIST"
+
+    def delete_repository(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_ecr.delete_repository(repositoryName=resource_id)
+        except:
+            self.logging.error(f"Could not delete ECR Repository '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"ECR Repository '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
+
+    def images(self, repository, image_actions):
+        """
+        Deletes ECR Images for a Repository in batches. Returns the number of
+        ECR Images left within the Repository or None if they could not be
+        listed. The action taken on each Image is appended to image_actions as
+        an (Image ID, action) pair for the caller to record.
+        """
         self.logging.debug(
             f"Started cleanup of ECR Images for ECR Repository '{repository}'."
         )
@@ -136,20 +176,24 @@ class ECRCleanup:
         )
         allowlisted_resources = Helper.get_allowlist(self.allowlist, "ecr.image")
 
+        # the same listing is used to find out whether the Repository is empty
+        try:
+            paginator = self.client_ecr.get_paginator("describe_images")
+            resources = (
+                paginator.paginate(repositoryName=repository)
+                .build_full_result()
+                .get("imageDetails")
+            )
+        except:
+            self.logging.error(
+                f"Could not list all ECR Images for ECR Repository '{repository}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return None
+
         if is_cleaning_enabled:
-            try:
-                paginator = self.client_ecr.get_paginator("describe_images")
-                resources = (
-                    paginator.paginate(repositoryName=repository)
-                    .build_full_result()
-                    .get("imageDetails")
-                )
-            except:
-                self.logging.error(
-                    f"Could not list all ECR Images for ECR Repository '{repository}'."
-                )
-                self.logging.error(sys.exc_info()[1])
-                return False
+            # expired Images are deleted in batches once all Images have been checked
+            expired_images = {}
 
             for resource in resources:
                 resource_id = resource.get("imageDigest")
@@ -159,24 +203,8 @@ class ECRCleanup:
 
                 if resource_id not in allowlisted_resources:
                     if resource_age > resource_maximum_age:
-                        try:
-                            if not self.is_dry_run:
-                                self.client_ecr.batch_delete_image(
-                                    repositoryName=repository,
-                                    imageIds=[{"imageDigest": resource_id}],
-                                )
-                        except:
-                            self.logging.error(
-                                f"Could not delete ECR Image '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.info(
-                                f"ECR Image '{resource_id}' was pushed {resource_age} days ago "
-                                "and has been deleted."
-                            )
-                            resource_action = "DELETE"
+                        resource_action = concurrent.futures.Future()
+                        expired_images[resource_id] = (resource_action, resource_age)
                     else:
                         self.logging.debug(
                             f"ECR Image '{resource_id}' was pushed {resource_age} days ago "
@@ -189,21 +217,70 @@ class ECRCleanup:
                     )
                     resource_action = "SKIP - ALLOWLIST"
 
-                Helper.record_execution_log_action(
-                    self.execution_log,
-                    self.region,
-                    "ECR",
-                    "Image",
-                    resource_id,
-                    resource_action,
-                )
+                image_actions.append((resource_id, resource_action))
+
+            deleted_images = self.delete_images(repository, expired_images)
 
             self.logging.debug(
                 f"Finished cleanup of ECR Images for ECR Repository '{repository}'."
             )
-            return True
+            return len(resources) - deleted_images
         else:
             self.logging.info(
                 f"Skipping cleanup of ECR Images for ECR Repository '{repository}'."
             )
-            return True
+            return len(resources)
+
+    def delete_images(self, repository, images):
+        """
+        Deletes Images in batches of 100 and maps the failures reported for
+        individual Images back onto their actions. Returns the number of
+        Images deleted.
+        """
+        deleted_images = 0
+
+        for chunk in Helper.chunks(list(images), 100):
+            try:
+                if not self.is_dry_run:
+                    response = self.client_ecr.batch_delete_image(
+                        repositoryName=repository,
+                        imageIds=[
+                            {"imageDigest": resource_id} for resource_id in chunk
+                        ],
+                    )
+                else:
+                    response = {}
+            except:
+                self.logging.error(
+                    f"Could not delete ECR Images {chunk} of ECR Repository '{repository}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+
+                for resource_id in chunk:
+                    images.get(resource_id)[0].set_result("ERROR")
+                continue
+
+            failures = {
+                failure.get("imageId", {}).get("imageDigest"): failure
+                for failure in response.get("failures", [])
+            }
+
+            for resource_id in chunk:
+                resource_action, resource_age = images.get(resource_id)
+
+                if resource_id in failures:
+                    self.logging.error(f"Could not delete ECR Image '{resource_id}'.")
+                    self.logging.error(
+                        f"""{failures.get(resource_id).get("failureCode")}: """
+                        f"""{failures.get(resource_id).get("failureReason")}"""
+                    )
+                    resource_action.set_result("ERROR")
+                else:
+                    self.logging.info(
+                        f"ECR Image '{resource_id}' was pushed {resource_age} days ago "
+                        "and has been deleted."
+                    )
+                    resource_action.set_result("DELETE")
+                    deleted_images += 1
+
+        return deleted_images
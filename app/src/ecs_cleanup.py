@@ -2,6 +2,7 @@ import sys
 
 import boto3
 
+from src.ecs_inventory import ECSInventory
 from src.helper import Helper
 
 
@@ -14,6 +15,7 @@ class ECSCleanup:
         self.region = region
 
         self._client_ecs = None
+        self._inventory = None
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
 
     @property
@@ -22,6 +24,12 @@ class ECSCleanup:
             self._client_ecs = boto3.client("ecs", region_name=self.region)
         return self._client_ecs
 
+    @property
+    def inventory(self):
+        if not self._inventory:
+            self._inventory = ECSInventory(self.client_ecs)
+        return self._inventory
+
     def run(self):
         self.services()
         self.clusters()
@@ -37,25 +45,19 @@ class ECSCleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_ecs.get_paginator("list_clusters")
-                resources = paginator.paginate().build_full_result().get("clusterArns")
+                resources = self.inventory.clusters
             except:
                 self.logging.error("Could not list all ECS Clusters.")
                 self.logging.error(sys.exc_info()[1])
                 return False
 
-            for resource in resources:
-                try:
-                    resource_details = self.client_ecs.describe_clusters(
-                        clusters=[
-                            resource,
-                        ]
-                    ).get("clusters")[0]
-                except:
+            for resource, resource_details in resources:
+                if resource_details is None:
                     self.logging.error(
                         f"Could not get ECS Cluster's '{resource}' details."
                     )
-                    self.logging.error(sys.exc_info()[1])
+                    self.logging.error(self.inventory.failures.get(resource))
+                    resource_id = resource.split("/")[-1]
                     resource_action = "ERROR"
                 else:
                     resource_id = resource_details.get("clusterName")
@@ -136,8 +138,7 @@ class ECSCleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_ecs.get_paginator("list_clusters")
-                clusters = paginator.paginate().build_full_result().get("clusterArns")
+                clusters = self.inventory.cluster_arns
             except:
                 self.logging.error("Could not list all ECS Clusters.")
                 self.logging.error(sys.exc_info()[1])
@@ -145,10 +146,7 @@ class ECSCleanup:
 
             for cluster in clusters:
                 try:
-                    paginator = self.client_ecs.get_paginator("list_services")
-                    resources = paginator.paginate(cluster=cluster).build_full_result()[
-                        "serviceArns"
-                    ]
+                    resources = self.inventory.get_services(cluster)
                 except:
                     self.logging.error(
                         f"Could not list all ECS Services for Cluster '{cluster}'."
@@ -156,19 +154,13 @@ class ECSCleanup:
                     self.logging.error(sys.exc_info()[1])
                     return False
 
-                for resource in resources:
-                    try:
-                        resource_details = self.client_ecs.describe_services(
-                            cluster=cluster,
-                            services=[
-                                resource,
-                            ],
-                        ).get("services")[0]
-                    except:
+                for resource, resource_details in resources:
+                    if resource_details is None:
                         self.logging.error(
                             f"Could not get ECS Service's '{resource}' details."
                         )
-                        self.logging.error(sys.exc_info()[1])
+                        self.logging.error(self.inventory.failures.get(resource))
+                        resource_id = resource.split("/")[-1]
                         resource_action = "ERROR"
                     else:
                         resource_id = resource_details.get("serviceName")
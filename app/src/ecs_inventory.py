@@ -0,0 +1,96 @@
+import sys
+import threading
+
+from src.helper import Helper
+
+
+class ECSInventory:
+    """
+    Run-scoped inventory of the ECS Clusters and Services within a region.
+    Clusters are listed once and the listing is shared by the Cluster and
+    Service cleanups. Clusters are described in batches of 100 and each
+    Cluster's Services in batches of 10, the most each describe call
+    accepts, instead of one describe call per Cluster or Service.
+
+    Listing errors are raised to the consulting cleanup. Clusters and
+    Services that could not be described are returned without details and
+    the reason is kept in failures.
+    """
+
+    def __init__(self, client_ecs):
+        self.client_ecs = client_ecs
+
+        self._cluster_arns = None
+        self._clusters = None
+
+        self.failures = {}
+
+        self._lock = threading.RLock()
+
+    @property
+    def cluster_arns(self):
+        with self._lock:
+            if self._cluster_arns is None:
+                paginator = self.client_ecs.get_paginator("list_clusters")
+                self._cluster_arns = (
+                    paginator.paginate().build_full_result().get("clusterArns")
+                )
+
+            return self._cluster_arns
+
+    @property
+    def clusters(self):
+        """Returns the ARN and details (None if they could not be described) of each Cluster."""
+        with self._lock:
+            if self._clusters is None:
+                details = {}
+
+                for batch in Helper.chunks(self.cluster_arns, 100):
+                    try:
+                        response = self.client_ecs.describe_clusters(clusters=batch)
+                    except:
+                        for cluster_arn in batch:
+                            self.failures[cluster_arn] = str(sys.exc_info()[1])
+                    else:
+                        for cluster in response.get("clusters", []):
+                            details[cluster.get("clusterArn")] = cluster
+
+                        for failure in response.get("failures", []):
+                            self.failures[failure.get("arn")] = failure.get("reason")
+
+                self._clusters = [
+                    (cluster_arn, details.get(cluster_arn))
+                    for cluster_arn in self.cluster_arns
+                ]
+
+            return self._clusters
+
+    def get_services(self, cluster_arn):
+        """Returns the ARN and details (None if they could not be described) of each of the Cluster's Services."""
+        paginator = self.client_ecs.get_paginator("list_services")
+        service_arns = (
+            paginator.paginate(cluster=cluster_arn)
+            .build_full_result()
+            .get("serviceArns")
+        )
+
+        details = {}
+
+        for batch in Helper.chunks(service_arns, 10):
+            try:
+                response = self.client_ecs.describe_services(
+                    cluster=cluster_arn, services=batch
+                )
+            except:
+                with self._lock:
+                    for service_arn in batch:
+                        self.failures[service_arn] = str(sys.exc_info()[1])
+            else:
+                for service in response.get("services", []):
+                    details[service.get("serviceArn")] = service
+
+                with self._lock:
+                    for failure in response.get("failures", []):
+                        self.failures[failure.get("arn")] = failure.get("reason")
+
+        return [(service_arn, details.get(service_arn)) for service_arn in service_arns]
@@ -1,8 +1,10 @@
+import functools
 import sys
 
 import boto3
 
 from src.helper import Helper
+from src.waiter import Waiter
 
 
 class EFSCleanup:
@@ -72,6 +74,13 @@ class EFSCleanup:
                                 for mount_target in resource_mount_targets:
                                     mount_target_id = mount_target.get("MountTargetId")
 
+                                    # Mount Targets deleted by the previous run
+                                    if mount_target.get("LifeCycleState") in (
+                                        "deleting",
+                                        "deleted",
+                                    ):
+                                        continue
+
                                     try:
                                         if not self.is_dry_run:
                                             self.client_efs.delete_mount_target(
@@ -89,23 +98,26 @@ class EFSCleanup:
                                         )
 
                         if resource_action != "ERROR":
-                            try:
-                                if not self.is_dry_run:
-                                    self.client_efs.delete_file_system(
-                                        FileSystemId=resource_id
-                                    )
-                            except:
-                                self.logging.error(
-                                    f"Could not delete EFS File System '{resource_id}'."
+                            if (
+                                resource_number_of_mount_targets > 0
+                                and not self.is_dry_run
+                            ):
+                                # the File System is deleted within this run once
+                                # the Mount Targets being deleted are gone
+                                resource_action = Waiter.wait(
+                                    self.poll_file_systems,
+                                    resource_id,
+                                    functools.partial(
+                                        self.delete_file_system,
+                                        resource_id,
+                                        resource_age,
+                                    ),
+                                    "SKIP - IN USE",
                                 )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
                             else:
-                                self.logging.info(
-                                    f"EFS File System '{resource_id}' was created {resource_age} days ago "
-                                    "and has been deleted."
+                                resource_action = self.delete_file_system(
+                                    resource_id, resource_age
                                 )
-                                resource_action = "DELETE"
                     else:
                         self.logging.debug(
                             f"EFS File System '{resource_id}' was created {resource_age} days ago "
@@ -132,3 +144,30 @@ class EFSCleanup:
         else:
             self.logging.info("Skipping cleanup of EFS File Systems.")
             return True
+
+    def delete_file_system(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_efs.delete_file_system(FileSystemId=resource_id)
+        except:
+            self.logging.error(f"Could not delete EFS File System '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EFS File System '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
+
+    def poll_file_systems(self, resource_ids):
+        """Returns the File Systems that no longer have any Mount Targets."""
+        paginator = self.client_efs.get_paginator("describe_file_systems")
+        resources = paginator.paginate().build_full_result().get("FileSystems")
+
+        return [
+            resource.get("FileSystemId")
+            for resource in resources
+            if resource.get("FileSystemId") in resource_ids
+            and resource.get("NumberOfMountTargets") == 0
+        ]
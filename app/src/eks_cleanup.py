@@ -1,8 +1,10 @@
+import functools
 import sys
 
 import boto3
 
 from src.helper import Helper
+from src.waiter import Waiter
 
 
 class EKSCleanup:
@@ -25,7 +27,7 @@ class EKSCleanup:
     def run(self):
         self.clusters()
 
-    def clusters(self):
+    def clusters(self, resource_ids=None):
         """Deletes EKS Clusters."""
         self.logging.debug("Started cleanup of EKS Clusters.")
 
@@ -46,11 +48,23 @@ class EKSCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource for resource in resources if resource in resource_ids
+                ]
+
             for resource in resources:
+                resource_id = resource
+
                 # for each cluster, we must first delete all the Node Groups
-                # and Fargate Profiles before deleting the Cluster itself
-                self.fargate_profiles(resource)
-                self.node_groups(resource)
+                # and Fargate Profiles before deleting the Cluster itself. They
+                # are listed again by every run so that children that failed to
+                # delete or have been recreated are cleaned up as well
+                deleting_children = (
+                    self.fargate_profiles(resource),
+                    self.node_groups(resource),
+                )
 
                 try:
                     resource_details = self.client_eks.describe_cluster(
@@ -68,6 +82,8 @@ class EKSCleanup:
                     resource_age = Helper.get_day_delta(resource_date).days
                     resource_action = None
 
+                    is_expired = resource_age > resource_maximum_age
+
                     if Helper.not_allowlisted(resource_id, resource_allowlist):
                         paginator = self.client_eks.get_paginator(
                             "list_fargate_profiles"
@@ -89,28 +105,38 @@ class EKSCleanup:
                             len(list_fargate_profiles) == 0
                             and len(list_nodegroups) == 0
                         ):
-                            if resource_age > resource_maximum_age:
-                                try:
-                                    if not self.is_dry_run:
-                                        self.client_eks.delete_cluster(name=resource_id)
-                                except:
-                                    self.logging.error(
-                                        f"Could not delete EKS Cluster '{resource_id}'."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    self.logging.info(
-                                        f"EKS Cluster '{resource_id}' was created {resource_age} days ago "
-                                        "and has been deleted."
-                                    )
-                                    resource_action = "DELETE"
+                            if is_expired:
+                                resource_action = self.delete_cluster(
+                                    resource_id, resource_age
+                                )
                             else:
                                 self.logging.debug(
                                     f"EKS Cluster '{resource_id}' was created {resource_age} days ago "
                                     "(less than TTL setting) and has not been deleted."
                                 )
                                 resource_action = "SKIP - TTL"
+                        elif (
+                            is_expired
+                            and not self.is_dry_run
+                            and self.is_deleting_children(
+                                list_fargate_profiles,
+                                list_nodegroups,
+                                deleting_children,
+                            )
+                        ):
+                            # the Cluster is deleted within this run once the Fargate
+                            # Profiles and Node Groups being deleted are gone
+                            self.logging.debug(
+                                f"EKS Cluster '{resource_id}' is waiting for its EKS Fargate Profiles and EKS Node Groups to be deleted."
+                            )
+                            resource_action = Waiter.wait(
+                                self.poll_clusters,
+                                resource_id,
+                                functools.partial(
+                                    self.delete_cluster, resource_id, resource_age
+                                ),
+                                "SKIP - IN USE",
+                            )
                         else:
                             self.logging.debug(
                                 f"EKS Cluster '{resource_id}' is associated with EKS Fargate Profiles or EKS Node Groups and has not been deleted."
@@ -137,8 +163,55 @@ class EKSCleanup:
             self.logging.info("Skipping cleanup of EKS Clusters.")
             return True
 
+    def delete_cluster(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_eks.delete_cluster(name=resource_id)
+        except:
+            self.logging.error(f"Could not delete EKS Cluster '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"EKS Cluster '{resource_id}' was created {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
+
+    def is_deleting_children(self, fargate_profiles, node_groups, deleting_children):
+        """
+        Checks whether all remaining Fargate Profiles and Node Groups are
+        being deleted, i.e., each of them has been sent for deletion or was
+        already being deleted.
+        """
+        deleting_fargate_profiles, deleting_node_groups = deleting_children
+
+        return set(fargate_profiles).issubset(deleting_fargate_profiles) and set(
+            node_groups
+        ).issubset(deleting_node_groups)
+
+    def poll_clusters(self, resource_ids):
+        """Returns the Clusters that no longer have any Fargate Profiles or Node Groups."""
+        for resource_id in resource_ids:
+            paginator = self.client_eks.get_paginator("list_fargate_profiles")
+            list_fargate_profiles = (
+                paginator.paginate(clusterName=resource_id)
+                .build_full_result()
+                .get("fargateProfileNames")
+            )
+
+            paginator = self.client_eks.get_paginator("list_nodegroups")
+            list_nodegroups = (
+                paginator.paginate(clusterName=resource_id)
+                .build_full_result()
+                .get("nodegroups")
+            )
+
+            if len(list_fargate_profiles) == 0 and len(list_nodegroups) == 0:
+                yield resource_id
+
     def fargate_profiles(self, cluster):
-        """Deletes EKS Fargate Profiles for a Cluster."""
+        """Deletes EKS Fargate Profiles for a Cluster, returns the names of those being deleted."""
         self.logging.debug(
             f"Started cleanup of EKS Fargate Profiles for EKS Cluster {cluster}."
         )
@@ -162,7 +235,9 @@ class EKSCleanup:
                     f"Could not list all EKS Fargate Profiles for EKS Cluster {cluster}."
                 )
                 self.logging.error(sys.exc_info()[1])
-                return False
+                return []
+
+            deleting_resources = []
 
             for resource in resources:
                 try:
@@ -182,7 +257,13 @@ class EKSCleanup:
                     resource_age = Helper.get_day_delta(resource_date).days
                     resource_action = None
 
-                    if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    if resource_details.get("status") == "DELETING":
+                        self.logging.debug(
+                            f"EKS Fargate Profile '{resource_id}' is already being deleted."
+                        )
+                        resource_action = "SKIP - DELETING"
+                        deleting_resources.append(resource_id)
+                    elif Helper.not_allowlisted(resource_id, resource_allowlist):
                         if resource_age > resource_maximum_age:
                             try:
                                 if not self.is_dry_run:
@@ -202,6 +283,7 @@ class EKSCleanup:
                                     "and has been deleted."
                                 )
                                 resource_action = "DELETE"
+                                deleting_resources.append(resource_id)
                         else:
                             self.logging.debug(
                                 f"EKS Fargate Profile '{resource_id}' was created {resource_age} days ago "
@@ -226,15 +308,15 @@ class EKSCleanup:
             self.logging.debug(
                 f"Finished cleanup of EKS Fargate Profiles for EKS Cluster {cluster}."
             )
-            return True
+            return deleting_resources
         else:
             self.logging.info(
                 f"Skipping cleanup of EKS Fargate Profiles for EKS Cluster {cluster}."
             )
-            return True
+            return []
 
     def node_groups(self, cluster):
-        """Deletes EKS Node Groups for a Cluster."""
+        """Deletes EKS Node Groups for a Cluster, returns the names of those being deleted."""
         self.logging.debug(
             f"Started cleanup of EKS Node Groups for EKS Cluster {cluster}."
         )
@@ -258,7 +340,9 @@ class EKSCleanup:
                     f"Could not list all EKS Node Groups for EKS Cluster {cluster}."
                 )
                 self.logging.error(sys.exc_info()[1])
-                return False
+                return []
+
+            deleting_resources = []
 
             for resource in resources:
                 try:
@@ -278,7 +362,13 @@ class EKSCleanup:
                     resource_age = Helper.get_day_delta(resource_date).days
                     resource_action = None
 
-                    if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    if resource_details.get("status") == "DELETING":
+                        self.logging.debug(
+                            f"EKS Node Group '{resource_id}' is already being deleted."
+                        )
+                        resource_action = "SKIP - DELETING"
+                        deleting_resources.append(resource_id)
+                    elif Helper.not_allowlisted(resource_id, resource_allowlist):
                         if resource_age > resource_maximum_age:
                             try:
                                 if not self.is_dry_run:
@@ -297,6 +387,7 @@ class EKSCleanup:
                                     "and has been deleted."
                                 )
                                 resource_action = "DELETE"
+                                deleting_resources.append(resource_id)
                         else:
                             self.logging.debug(
                                 f"EKS Node Group '{resource_id}' was created {resource_age} days ago "
@@ -321,9 +412,9 @@ class EKSCleanup:
             self.logging.debug(
                 f"Finished cleanup of EKS Node Groups for EKS Cluster {cluster}."
             )
-            return True
+            return deleting_resources
         else:
             self.logging.info(
                 f"Skipping cleanup of EKS Node Groups for EKS Cluster {cluster}."
             )
-            return True
+            return []
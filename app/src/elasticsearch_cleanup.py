@@ -3,6 +3,7 @@ import sys
 import boto3
 
 from src.helper import Helper
+from src.inventory import Inventory
 
 
 class ElasticsearchServiceCleanup:
@@ -51,27 +52,41 @@ class ElasticsearchServiceCleanup:
 
             for resource in resources:
                 resource_id = resource.get("DomainName")
+                resource_date = None
+                resource_action = None
 
-                try:
-                    resource_details = (
-                        self.client_elasticsearch.describe_elasticsearch_domain_config(
-                            DomainName=resource_id
-                        ).get("DomainConfig")
+                if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    # domains that were still within their TTL during the previous
+                    # run can be rechecked without describing them again
+                    resource_date = Inventory.get_resource_date(
+                        self.region,
+                        "Elasticsearch Service",
+                        "Domain",
+                        resource_id,
+                        resource_maximum_age,
                     )
-                except:
-                    self.logging.error(
-                        f"Could not get Elasticsearch Service Domain '{resource_id}' details."
-                    )
-                    self.logging.error(sys.exc_info()[1])
-                    resource_action = "ERROR"
-                else:
-                    resource_date = resource_details.get("ElasticsearchVersion").get(
-                        "Status"
-                    )["UpdateDate"]
-                    resource_age = Helper.get_day_delta(resource_date).days
-                    resource_action = None
 
-                    if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    if resource_date is None:
+                        try:
+                            resource_details = self.client_elasticsearch.describe_elasticsearch_domain_config(
+                                DomainName=resource_id
+                            ).get(
+                                "DomainConfig"
+                            )
+                        except:
+                            self.logging.error(
+                                f"Could not get Elasticsearch Service Domain '{resource_id}' details."
+                            )
+                            self.logging.error(sys.exc_info()[1])
+                            resource_action = "ERROR"
+                        else:
+                            resource_date = resource_details.get(
+                                "ElasticsearchVersion"
+                            ).get("Status")["UpdateDate"]
+
+                    if resource_action is None:
+                        resource_age = Helper.get_day_delta(resource_date).days
+
                         if resource_age > resource_maximum_age:
                             try:
                                 if not self.is_dry_run:
@@ -96,11 +111,11 @@ class ElasticsearchServiceCleanup:
                                 "(less than TTL setting) and has not been deleted."
                             )
                             resource_action = "SKIP - TTL"
-                    else:
-                        self.logging.debug(
-                            f"Elasticsearch Service Domain '{resource_id}' has been allowlisted and has not been deleted."
-                        )
-                        resource_action = "SKIP - ALLOWLIST"
+                else:
+                    self.logging.debug(
+                        f"Elasticsearch Service Domain '{resource_id}' has been allowlisted and has not been deleted."
+                    )
+                    resource_action = "SKIP - ALLOWLIST"
 
                 Helper.record_execution_log_action(
                     self.execution_log,
@@ -109,6 +124,7 @@ class ElasticsearchServiceCleanup:
                     "Domain",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
             self.logging.debug("Finished cleanup of Elasticsearch Service Domains.")
@@ -15,6 +15,9 @@ class EMRCleanup:
 
         self._client_emr = None
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
+        self.is_prefiltering = Helper.get_setting(
+            self.settings, "general.prefilter", True
+        )
 
     @property
     def client_emr(self):
@@ -40,7 +43,19 @@ class EMRCleanup:
         if is_cleaning_enabled:
             try:
                 paginator = self.client_emr.get_paginator("list_clusters")
-                resources = paginator.paginate().build_full_result().get("Clusters")
+
+                if self.is_prefiltering:
+                    # only Clusters that can be terminated and are older than the TTL
+                    resources = (
+                        paginator.paginate(
+                            ClusterStates=["RUNNING", "WAITING"],
+                            CreatedBefore=Helper.get_ttl_cutoff(resource_maximum_age),
+                        )
+                        .build_full_result()
+                        .get("Clusters")
+                    )
+                else:
+                    resources = paginator.paginate().build_full_result().get("Clusters")
             except:
                 self.logging.error("Could not list all EMR Clusters.")
                 self.logging.error(sys.exc_info()[1])
@@ -1,10 +1,17 @@
+import concurrent.futures
 import datetime
 import fnmatch
+import functools
+import threading
 
 import dateutil.parser
 
 
 class Helper:
+    # execution log actions that are waiting on a future
+    _pending_actions = []
+    _pending_lock = threading.Lock()
+
     def __init__(self):
         pass
 
@@ -24,6 +31,22 @@ class Helper:
         else:
             return from_datetime - from_datetime
 
+    @staticmethod
+    def get_ttl_cutoff(resource_maximum_age):
+        """
+        Returns the date before which a resource must have been created to be
+        older than its TTL, for AWS APIs that can filter on creation date.
+        """
+        return datetime.datetime.now() - datetime.timedelta(
+            days=resource_maximum_age + 1
+        )
+
+    @staticmethod
+    def chunks(items, size):
+        """Splits a list into consecutive lists of at most size items."""
+        for i in range(0, len(items), size):
+            yield items[i : i + size]
+
     # https://codereview.stackexchange.com/a/253174/234246
     @staticmethod
     def get_setting(settings, path, default=None):
@@ -64,12 +87,53 @@ class Helper:
 
     @staticmethod
     def record_execution_log_action(
-        execution_log, region, service, resource, resource_id, resource_action
+        execution_log,
+        region,
+        service,
+        resource,
+        resource_id,
+        resource_action,
+        resource_date=None,
     ):
-        execution_log["AWS"][region][service][resource].append(
-            {
-                "id": resource_id,
-                "action": resource_action,
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        )
+        action = {
+            "id": resource_id,
+            "action": resource_action,
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        # the resource date is not exported but is kept for the inventory snapshot
+        if resource_date is not None:
+            action["date"] = Helper.convert_to_datetime(resource_date).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+
+        # actions taken by a worker pool are filled in once they complete so that
+        # the execution log keeps the order in which resources were listed
+        if isinstance(resource_action, concurrent.futures.Future):
+            action["action"] = None
+
+            with Helper._pending_lock:
+                Helper._pending_actions.append((action, resource_action))
+
+            resource_action.add_done_callback(
+                functools.partial(Helper.resolve_execution_log_action, action)
+            )
+
+        execution_log["AWS"][region][service][resource].append(action)
+
+    @staticmethod
+    def resolve_execution_log_action(action, future):
+        try:
+            action["action"] = future.result()
+        except:
+            action["action"] = "ERROR"
+
+    @staticmethod
+    def expire_execution_log_actions(resource_action):
+        """Sets the action of every execution log action whose future has not completed."""
+        with Helper._pending_lock:
+            pending_actions, Helper._pending_actions = Helper._pending_actions, []
+
+        for action, future in pending_actions:
+            if not future.done():
+                action["action"] = resource_action
@@ -0,0 +1,145 @@
+import threading
+
+
+class IAMAuthorizationIndex:
+    """
+    Run-scoped index of the account's IAM Users, Roles, Groups and customer
+    managed Policies along with their inline Policies, attached managed
+    Policies, Group memberships, Instance Profiles and Policy Versions.
+
+    The index is loaded with a single paginated GetAccountAuthorizationDetails
+    pass the first time it is consulted, and every relationship is then
+    answered from memory instead of listing it per User, Role or Policy.
+    Cleanups remove the attachments they detach so that later cleanups within
+    the same run do not act on them again. Listing errors are raised to the
+    consulting cleanup.
+    """
+
+    def __init__(self, client_iam):
+        self.client_iam = client_iam
+
+        self._users = None
+        self._roles = None
+        self._groups = None
+        self._policies = None
+
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock:
+            if self._policies is not None:
+                return
+
+            paginator = self.client_iam.get_paginator(
+                "get_account_authorization_details"
+            )
+            details = paginator.paginate(
+                Filter=["User", "Role", "Group", "LocalManagedPolicy"]
+            ).build_full_result()
+
+            self._users = {
+                user.get("UserName"): user for user in details.get("UserDetailList", [])
+            }
+            self._roles = {
+                role.get("RoleName"): role for role in details.get("RoleDetailList", [])
+            }
+            self._groups = {
+                group.get("GroupName"): group
+                for group in details.get("GroupDetailList", [])
+            }
+            self._policies = {
+                policy.get("Arn"): policy for policy in details.get("Policies", [])
+            }
+
+    @property
+    def roles(self):
+        self.load()
+        return list(self._roles.values())
+
+    @property
+    def policies(self):
+        self.load()
+        return list(self._policies.values())
+
+    def get_role_inline_policies(self, role_name):
+        """Returns the names of the Role's inline Policies."""
+        self.load()
+        return [
+            policy.get("PolicyName")
+            for policy in self._roles.get(role_name, {}).get("RolePolicyList", [])
+        ]
+
+    def get_role_attached_policies(self, role_name):
+        """Returns the managed Policies (PolicyName and PolicyArn) attached to the Role."""
+        self.load()
+        with self._lock:
+            return list(
+                self._roles.get(role_name, {}).get("AttachedManagedPolicies", [])
+            )
+
+    def get_role_instance_profiles(self, role_name):
+        """Returns the Instance Profiles the Role belongs to."""
+        self.load()
+        return self._roles.get(role_name, {}).get("InstanceProfileList", [])
+
+    def get_user_inline_policies(self, user_name):
+        """Returns the names of the User's inline Policies."""
+        self.load()
+        return [
+            policy.get("PolicyName")
+            for policy in self._users.get(user_name, {}).get("UserPolicyList", [])
+        ]
+
+    def get_user_attached_policies(self, user_name):
+        """Returns the managed Policies (PolicyName and PolicyArn) attached to the User."""
+        self.load()
+        with self._lock:
+            return list(
+                self._users.get(user_name, {}).get("AttachedManagedPolicies", [])
+            )
+
+    def get_user_groups(self, user_name):
+        """Returns the names of the Groups the User is a member of."""
+        self.load()
+        return self._users.get(user_name, {}).get("GroupList", [])
+
+    def get_policy_entities(self, policy_arn):
+        """Returns the names of the Users, Roles and Groups the Policy is attached to."""
+        self.load()
+        entities = {"User": [], "Role": [], "Group": []}
+
+        with self._lock:
+            for entity_type, entity_details in (
+                ("User", self._users),
+                ("Role", self._roles),
+                ("Group", self._groups),
+            ):
+                for entity_name, entity in entity_details.items():
+                    for policy in entity.get("AttachedManagedPolicies", []):
+                        if policy.get("PolicyArn") == policy_arn:
+                            entities[entity_type].append(entity_name)
+
+        return entities
+
+    def get_policy_versions(self, policy_arn):
+        """Returns the Policy's Versions (VersionId and IsDefaultVersion)."""
+        self.load()
+        return self._policies.get(policy_arn, {}).get("PolicyVersionList", [])
+
+    def remove_policy_attachment(self, policy_arn, entity_type, entity_name):
+        """Removes a managed Policy that has been detached from a User, Role or Group."""
+        entity_details = {
+            "User": self._users,
+            "Role": self._roles,
+            "Group": self._groups,
+        }
+
+        with self._lock:
+            entity = entity_details.get(entity_type, {}).get(entity_name)
+
+            if entity is not None:
+                entity["AttachedManagedPolicies"] = [
+                    policy
+                    for policy in entity.get("AttachedManagedPolicies", [])
+                    if policy.get("PolicyArn") != policy_arn
+                ]
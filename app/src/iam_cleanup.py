@@ -1,10 +1,14 @@
+import concurrent.futures
 import datetime
 import sys
 import time
 
 import boto3
 
+from src.concurrency import WorkerPool
 from src.helper import Helper
+from src.iam_authorization_index import IAMAuthorizationIndex
+from src.iam_credential_report import IAMCredentialReport
 
 
 class IAMCleanup:
@@ -16,6 +20,8 @@ class IAMCleanup:
         self.region = "global"
 
         self._client_iam = None
+        self._authorization_index = None
+        self._credential_report = None
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
 
     @property
@@ -24,6 +30,18 @@ class IAMCleanup:
             self._client_iam = boto3.client("iam")
         return self._client_iam
 
+    @property
+    def authorization_index(self):
+        if not self._authorization_index:
+            self._authorization_index = IAMAuthorizationIndex(self.client_iam)
+        return self._authorization_index
+
+    @property
+    def credential_report(self):
+        if not self._credential_report:
+            self._credential_report = IAMCredentialReport(self.client_iam)
+        return self._credential_report
+
     def run(self):
         self.policies()
         self.roles()
@@ -62,9 +80,11 @@ class IAMCleanup:
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
                     try:
-                        resource_details = self.client_iam.get_access_key_last_used(
-                            AccessKeyId=resource_id
-                        ).get("AccessKeyLastUsed")
+                        resource_last_used = (
+                            self.credential_report.get_access_key_last_used(
+                                user, resource.get("CreateDate")
+                            )
+                        )
                     except:
                         self.logging.error(
                             f"Could not get IAM Access Key's '{resource_id}' details."
@@ -72,9 +92,7 @@ class IAMCleanup:
                         self.logging.error(sys.exc_info()[1])
                         resource_action = "ERROR"
                     else:
-                        resource_date = resource_details.get(
-                            "resource_details", resource.get("CreateDate")
-                        )
+                        resource_date = resource_last_used or resource.get("CreateDate")
                         resource_age = Helper.get_day_delta(resource_date).days
                         resource_action = None
 
@@ -158,10 +176,7 @@ class IAMCleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_iam.get_paginator("list_policies")
-                resources = paginator.paginate(Scope="Local").build_full_result()[
-                    "Policies"
-                ]
+                resources = self.authorization_index.policies
             except:
                 self.logging.error("Could not list all IAM Policies.")
                 self.logging.error(sys.exc_info()[1])
@@ -176,142 +191,70 @@ class IAMCleanup:
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
                     if resource_age > resource_maximum_age:
-                        if resource.get("AttachmentCount") > 0:
-                            # - Detach the policy from all users, groups, and roles that the policy is attached to,
-                            #   using the DetachUserPolicy, DetachGroupPolicy, or DetachRolePolicy API operations.
-                            #   To list all the users, groups, and roles that a policy is attached to, use ListEntitiesForPolicy.
-                            entities_paginator = self.client_iam.get_paginator(
-                                "list_entities_for_policy"
-                            )
+                        # - Detach the policy from all users, groups, and roles that the policy is attached to,
+                        #   using the DetachUserPolicy, DetachGroupPolicy, or DetachRolePolicy API operations.
+                        entities = self.authorization_index.get_policy_entities(
+                            resource_arn
+                        )
 
+                        for entity_type, entity_name in (
+                            [("User", user) for user in entities.get("User")]
+                            + [("Role", role) for role in entities.get("Role")]
+                            + [("Group", group) for group in entities.get("Group")]
+                        ):
                             try:
-                                user_resources = entities_paginator.paginate(
-                                    PolicyArn=resource_arn, EntityFilter="User"
-                                ).build_full_result()
-                            except:
-                                self.logging.error(
-                                    f"Could not list all IAM Users with IAM Policy '{resource_id}' attached."
-                                )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
-                            else:
-                                for user_resource in user_resources.get("PolicyUsers"):
-                                    try:
-                                        if not self.is_dry_run:
-                                            self.client_iam.detach_user_policy(
-                                                UserName=user_resource.get("UserName"),
-                                                PolicyArn=resource_arn,
-                                            )
-                                    except:
-                                        self.logging.error(
-                                            f"""Could not detatch IAM Policy '{resource_id}' from IAM User {user_resource.get("UserName")}."""
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        self.logging.debug(
-                                            f"""IAM Policy '{resource_id}' was detatched from IAM User {user_resource.get("UserName")}."""
+                                if not self.is_dry_run:
+                                    if entity_type == "User":
+                                        self.client_iam.detach_user_policy(
+                                            UserName=entity_name, PolicyArn=resource_arn
                                         )
-
-                            try:
-                                role_resources = entities_paginator.paginate(
-                                    PolicyArn=resource_arn, EntityFilter="Role"
-                                ).build_full_result()
-                            except:
-                                self.logging.error(
-                                    f"Could not list all IAM Roles with IAM Policy '{resource_id}' attached."
-                                )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
-                            else:
-                                for role_resource in role_resources.get("PolicyRoles"):
-                                    try:
-                                        if not self.is_dry_run:
-                                            self.client_iam.detach_role_policy(
-                                                RoleName=role_resource.get("RoleName"),
-                                                PolicyArn=resource_arn,
-                                            )
-                                    except:
-                                        self.logging.error(
-                                            f"""Could not detatch IAM Policy '{resource_id}' from IAM Role {role_resource.get("RoleName")}."""
+                                    elif entity_type == "Role":
+                                        self.client_iam.detach_role_policy(
+                                            RoleName=entity_name, PolicyArn=resource_arn
                                         )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
                                     else:
-                                        self.logging.debug(
-                                            f"""IAM Policy '{resource_id}' was detatched from IAM Role {role_resource.get("RoleName")}."""
+                                        self.client_iam.detach_group_policy(
+                                            GroupName=entity_name,
+                                            PolicyArn=resource_arn,
                                         )
 
-                            try:
-                                group_resources = entities_paginator.paginate(
-                                    PolicyArn=resource_arn, EntityFilter="Group"
-                                ).build_full_result()
+                                    self.authorization_index.remove_policy_attachment(
+                                        resource_arn, entity_type, entity_name
+                                    )
                             except:
                                 self.logging.error(
-                                    f"Could not list all IAM Policies with IAM Group '{resource_id}' attached."
+                                    f"Could not detatch IAM Policy '{resource_id}' from IAM {entity_type} {entity_name}."
                                 )
                                 self.logging.error(sys.exc_info()[1])
                                 resource_action = "ERROR"
                             else:
-                                for group_resource in group_resources.get(
-                                    "PolicyGroups"
-                                ):
-                                    try:
-                                        if not self.is_dry_run:
-                                            self.client_iam.detach_group_policy(
-                                                GroupName=group_resource.get(
-                                                    "GroupName"
-                                                ),
-                                                PolicyArn=resource_arn,
-                                            )
-                                    except:
-                                        self.logging.error(
-                                            f"""Could not detatch IAM Policy '{resource_id}' from IAM Group {group_resource.get("GroupName")}."""
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        self.logging.debug(
-                                            f"""IAM Policy '{resource_id}' was detatched from IAM Group {group_resource.get("GroupName")}."""
-                                        )
+                                self.logging.debug(
+                                    f"IAM Policy '{resource_id}' was detatched from IAM {entity_type} {entity_name}."
+                                )
 
-                        # - Delete all versions of the policy using DeletePolicyVersion. To list the policy's versions, use ListPolicyVersions.
+                        # - Delete all versions of the policy using DeletePolicyVersion.
                         #   You cannot use DeletePolicyVersion to delete the version that is marked as the default version.
                         #   You delete the policy's default version in the next step of the process.
-                        try:
-                            versions_paginator = self.client_iam.get_paginator(
-                                "list_policy_versions"
-                            )
-                            versions_resources = versions_paginator.paginate(
-                                PolicyArn=resource_arn
-                            ).build_full_result()
-                        except:
-                            self.logging.error(
-                                f"Could not list all IAM Policy's '{resource_id}' versions."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            for versions_resource in versions_resources.get("Versions"):
-                                if not versions_resource.get("IsDefaultVersion"):
-                                    try:
-                                        if not self.is_dry_run:
-                                            self.client_iam.delete_policy_version(
-                                                PolicyArn=resource_arn,
-                                                VersionId=versions_resource.get(
-                                                    "VersionId"
-                                                ),
-                                            )
-                                    except:
-                                        self.logging.error(
-                                            f"""Could not delete IAM Policy Version '{versions_resource.get("VersionId")}' for IAM Policy {resource_id}."""
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        self.logging.debug(
-                                            f"""IAM Policy Version '{versions_resource.get("VersionId")}' was deleted for IAM Policy {resource_id}."""
+                        for version in self.authorization_index.get_policy_versions(
+                            resource_arn
+                        ):
+                            if not version.get("IsDefaultVersion"):
+                                try:
+                                    if not self.is_dry_run:
+                                        self.client_iam.delete_policy_version(
+                                            PolicyArn=resource_arn,
+                                            VersionId=version.get("VersionId"),
                                         )
+                                except:
+                                    self.logging.error(
+                                        f"""Could not delete IAM Policy Version '{version.get("VersionId")}' for IAM Policy {resource_id}."""
+                                    )
+                                    self.logging.error(sys.exc_info()[1])
+                                    resource_action = "ERROR"
+                                else:
+                                    self.logging.debug(
+                                        f"""IAM Policy Version '{version.get("VersionId")}' was deleted for IAM Policy {resource_id}."""
+                                    )
 
                         # - Delete the policy (this automatically deletes the policy's default version) using this API.
                         try:
@@ -357,7 +300,11 @@ class IAMCleanup:
             return True
 
     def roles(self):
-        """Deletes IAM Roles."""
+        """
+        Deletes IAM Roles. The last accessed details jobs of all expired Roles
+        are submitted up front and polled together, each Role is evaluated as
+        soon as its job has completed.
+        """
         self.logging.debug("Started cleanup of IAM Roles.")
 
         is_cleaning_enabled = Helper.get_setting(
@@ -370,13 +317,18 @@ class IAMCleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_iam.get_paginator("list_roles")
-                resources = paginator.paginate().build_full_result().get("Roles")
+                resources = self.authorization_index.roles
             except:
                 self.logging.error("Could not list all IAM Roles.")
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # JobId: (Role name, future of the Role's action, polling deadline)
+            jobs = {}
+            job_timeout = Helper.get_setting(
+                self.settings, "general.waiter.timeout", 780
+            )
+
             for resource in resources:
                 resource_id = resource.get("RoleName")
                 resource_arn = resource.get("Arn")
@@ -389,7 +341,7 @@ class IAMCleanup:
                         if resource_age > resource_maximum_age:
                             # check when the role was last accessed
                             try:
-                                gen_last_accessed = self.client_iam.generate_service_last_accessed_details(
+                                job = self.client_iam.generate_service_last_accessed_details(
                                     Arn=resource_arn
                                 )
                             except:
@@ -399,224 +351,12 @@ class IAMCleanup:
                                 self.logging.error(sys.exc_info()[1])
                                 resource_action = "ERROR"
                             else:
-                                try:
-                                    get_last_accessed = self.client_iam.get_service_last_accessed_details(
-                                        JobId=gen_last_accessed.get("JobId")
-                                    )
-                                except:
-                                    self.logging.error(
-                                        f"Could not get IAM Role last accessed details for '{resource_arn}'."
-                                    )
-                                    self.logging.error(sys.exc_info()[1])
-                                    resource_action = "ERROR"
-                                else:
-                                    backoff = 1
-                                    while (
-                                        get_last_accessed.get("JobStatus")
-                                        == "IN_PROGRESS"
-                                    ):
-                                        if backoff <= 16:
-                                            time.sleep(backoff)
-
-                                            try:
-                                                get_last_accessed = self.client_iam.get_service_last_accessed_details(
-                                                    JobId=gen_last_accessed.get("JobId")
-                                                )
-                                            except:
-                                                self.logging.error(
-                                                    f"Could not get IAM Role last accessed details for '{resource_arn}'."
-                                                )
-                                                self.logging.error(sys.exc_info()[1])
-                                                resource_action = "ERROR"
-                                                continue
-                                            else:
-                                                backoff = 2 * backoff
-                                        else:
-                                            self.logging.error(
-                                                f"Could not retrieve IAM Role '{resource_id}' last accessed "
-                                                "details in a reasonable amount of time."
-                                            )
-                                            resource_action = "ERROR"
-                                            continue
-
-                            if get_last_accessed.get("JobStatus") == "COMPLETED":
-                                last_accessed = (
-                                    datetime.datetime.now()
-                                    - datetime.timedelta(days=365)
+                                resource_action = concurrent.futures.Future()
+                                jobs[job.get("JobId")] = (
+                                    resource_id,
+                                    resource_action,
+                                    time.monotonic() + job_timeout,
                                 )
-
-                                for service in get_last_accessed.get(
-                                    "ServicesLastAccessed"
-                                ):
-                                    service_date = service.get(
-                                        "LastAuthenticated", "1900-01-01 00:00:00"
-                                    )
-
-                                    if Helper.convert_to_datetime(
-                                        service_date
-                                    ) > Helper.convert_to_datetime(last_accessed):
-                                        last_accessed = service_date
-
-                                if resource_age > resource_maximum_age:
-                                    # delete all inline policies
-                                    try:
-                                        paginator = self.client_iam.get_paginator(
-                                            "list_role_policies"
-                                        )
-                                        policies = (
-                                            paginator.paginate(RoleName=resource_id)
-                                            .build_full_result()
-                                            .get("PolicyNames")
-                                        )
-                                    except:
-                                        self.logging.error(
-                                            f"Could not retrieve inline IAM Policies for IAM Role '{resource_id}'."
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                        continue
-
-                                    for policy in policies:
-                                        try:
-                                            if not self.is_dry_run:
-                                                self.client_iam.delete_role_policy(
-                                                    RoleName=resource_id,
-                                                    PolicyName=policy,
-                                                )
-                                        except:
-                                            self.logging.error(
-                                                f"Could not delete an inline IAM Policy '{policy}' from IAM Role '{resource_id}'."
-                                            )
-                                            self.logging.error(sys.exc_info()[1])
-                                            resource_action = "ERROR"
-                                        else:
-                                            self.logging.debug(
-                                                f"IAM Policy '{policy}' has been deleted from IAM Role '{resource_id}'."
-                                            )
-
-                                    # detach all managed policies
-                                    try:
-                                        paginator = self.client_iam.get_paginator(
-                                            "list_attached_role_policies"
-                                        )
-                                        policies = (
-                                            paginator.paginate(RoleName=resource_id)
-                                            .build_full_result()
-                                            .get("AttachedPolicies")
-                                        )
-                                    except:
-                                        self.logging.error(
-                                            f"Could not retrieve managed IAM Policies attached to IAM Role '{resource_id}'."
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        for policy in policies:
-                                            try:
-                                                if not self.is_dry_run:
-                                                    self.client_iam.detach_role_policy(
-                                                        RoleName=resource_id,
-                                                        PolicyArn=policy.get(
-                                                            "PolicyArn"
-                                                        ),
-                                                    )
-                                            except:
-                                                self.logging.error(
-                                                    f"Could not detach a managed IAM Policy '{policy.get('PolicyName')}' from IAM Role '{resource_id}'."
-                                                )
-                                                self.logging.error(sys.exc_info()[1])
-                                                resource_action = "ERROR"
-                                            else:
-                                                self.logging.debug(
-                                                    f"IAM Policy '{policy.get('PolicyName')}' has been detached from IAM Role '{resource_id}'."
-                                                )
-
-                                    # delete all instance profiles
-                                    try:
-                                        paginator = self.client_iam.get_paginator(
-                                            "list_instance_profiles_for_role"
-                                        )
-                                        profiles = (
-                                            paginator.paginate(RoleName=resource_id)
-                                            .build_full_result()
-                                            .get("InstanceProfiles")
-                                        )
-                                    except:
-                                        self.logging.error(
-                                            f"Could not retrieve IAM Instance Profiles associated with IAM Role '{resource_id}'."
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        for profile in profiles:
-                                            # remove role from instance profile
-                                            try:
-                                                if not self.is_dry_run:
-                                                    self.client_iam.remove_role_from_instance_profile(
-                                                        InstanceProfileName=profile.get(
-                                                            "InstanceProfileName"
-                                                        ),
-                                                        RoleName=resource_id,
-                                                    )
-                                            except:
-                                                self.logging.error(
-                                                    f"Could not remove IAM Role '{resource_id}' from IAM Instance Profile '{profile.get('InstanceProfileName')}'."
-                                                )
-                                                self.logging.error(sys.exc_info()[1])
-                                                resource_action = "ERROR"
-                                            else:
-                                                self.logging.debug(
-                                                    f"IAM Role '{resource_id}' has been removed from IAM Instance Profile '{profile.get('InstanceProfileName')}'."
-                                                )
-
-                                            # delete instance profile
-                                            try:
-                                                if not self.is_dry_run:
-                                                    self.client_iam.delete_instance_profile(
-                                                        InstanceProfileName=profile.get(
-                                                            "InstanceProfileName"
-                                                        )
-                                                    )
-                                            except:
-                                                self.logging.error(
-                                                    f"Could not delete IAM Instance Profile '{profile.get('InstanceProfileName')}'."
-                                                )
-                                                self.logging.error(sys.exc_info()[1])
-                                                resource_action = "ERROR"
-                                            else:
-                                                self.logging.debug(
-                                                    f"IAM Instance Profile '{profile.get('InstanceProfileName')}' has been delete."
-                                                )
-
-                                    # delete role
-                                    try:
-                                        if not self.is_dry_run:
-                                            self.client_iam.delete_role(
-                                                RoleName=resource_id
-                                            )
-                                    except:
-                                        self.logging.error(
-                                            f"Could not delete IAM Role '{resource_id}'."
-                                        )
-                                        self.logging.error(sys.exc_info()[1])
-                                        resource_action = "ERROR"
-                                    else:
-                                        self.logging.info(
-                                            f"IAM Role '{resource_id}' was created {resource_age} days ago "
-                                            "and has been deleted."
-                                        )
-                                        resource_action = "DELETE"
-                                else:
-                                    self.logging.debug(
-                                        f"IAM Role '{resource_id}' was last accessed {resource_age} days ago "
-                                        "(less than TTL setting) and has not been deleted."
-                                    )
-                                    resource_action = "SKIP - TTL"
-                            else:
-                                self.logging.error(
-                                    f"Could not get IAM Role last accessed details for '{resource_id}'."
-                                )
-                                resource_action = "ERROR"
                         else:
                             self.logging.debug(
                                 f"IAM Role '{resource_id}' was created {resource_age} days ago "
@@ -638,12 +378,183 @@ class IAMCleanup:
                         resource_action,
                     )
 
+            self.poll_role_last_accessed_jobs(jobs, resource_maximum_age)
+
             self.logging.debug("Finished cleanup of IAM Roles.")
             return True
         else:
             self.logging.info("Skipping cleanup of IAM Roles.")
             return True
 
+    def poll_role_last_accessed_jobs(self, jobs, resource_maximum_age):
+        """
+        Polls the Roles' last accessed details jobs in round-robin sweeps
+        until every job has completed. A job is only given up on once it is
+        still in progress when polled after its own deadline, which is set
+        from when it was submitted.
+        """
+        while jobs:
+            for job_id, (resource_id, resource_action, deadline) in list(jobs.items()):
+                try:
+                    last_accessed_details = (
+                        self.client_iam.get_service_last_accessed_details(JobId=job_id)
+                    )
+                except:
+                    self.logging.error(
+                        f"Could not get IAM Role last accessed details for '{resource_id}'."
+                    )
+                    self.logging.error(sys.exc_info()[1])
+                    resource_action.set_result("ERROR")
+                    jobs.pop(job_id)
+                    continue
+
+                if last_accessed_details.get("JobStatus") == "IN_PROGRESS":
+                    if time.monotonic() > deadline:
+                        self.logging.error(
+                            f"Could not retrieve IAM Role '{resource_id}' last accessed "
+                            "details in a reasonable amount of time."
+                        )
+                        resource_action.set_result("ERROR")
+                        jobs.pop(job_id)
+
+                    continue
+
+                jobs.pop(job_id)
+
+                if last_accessed_details.get("JobStatus") == "COMPLETED":
+                    resource_action.set_result(
+                        self.evaluate_role(
+                            resource_id, last_accessed_details, resource_maximum_age
+                        )
+                    )
+                else:
+                    self.logging.error(
+                        f"Could not get IAM Role last accessed details for '{resource_id}'."
+                    )
+                    resource_action.set_result("ERROR")
+
+            if jobs:
+                time.sleep(1)
+
+    def evaluate_role(self, resource_id, last_accessed_details, resource_maximum_age):
+        """Deletes a Role that has not been accessed within the TTL."""
+        last_accessed = datetime.datetime.now() - datetime.timedelta(days=365)
+
+        for service in last_accessed_details.get("ServicesLastAccessed"):
+            service_date = service.get("LastAuthenticated", "1900-01-01 00:00:00")
+
+            if Helper.convert_to_datetime(service_date) > Helper.convert_to_datetime(
+                last_accessed
+            ):
+                last_accessed = service_date
+
+        resource_age = Helper.get_day_delta(last_accessed).days
+
+        if resource_age > resource_maximum_age:
+            return self.delete_role(resource_id, resource_age)
+        else:
+            self.logging.debug(
+                f"IAM Role '{resource_id}' was last accessed {resource_age} days ago "
+                "(less than TTL setting) and has not been deleted."
+            )
+            return "SKIP - TTL"
+
+    def delete_role(self, resource_id, resource_age):
+        """Deletes a Role after removing its policies and instance profiles."""
+        resource_action = None
+
+        # delete all inline policies
+        for policy in self.authorization_index.get_role_inline_policies(resource_id):
+            try:
+                if not self.is_dry_run:
+                    self.client_iam.delete_role_policy(
+                        RoleName=resource_id,
+                        PolicyName=policy,
+                    )
+            except:
+                self.logging.error(
+                    f"Could not delete an inline IAM Policy '{policy}' from IAM Role '{resource_id}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
+                self.logging.debug(
+                    f"IAM Policy '{policy}' has been deleted from IAM Role '{resource_id}'."
+                )
+
+        # detach all managed policies
+        for policy in self.authorization_index.get_role_attached_policies(resource_id):
+            try:
+                if not self.is_dry_run:
+                    self.client_iam.detach_role_policy(
+                        RoleName=resource_id,
+                        PolicyArn=policy.get("PolicyArn"),
+                    )
+            except:
+                self.logging.error(
+                    f"Could not detach a managed IAM Policy '{policy.get('PolicyName')}' from IAM Role '{resource_id}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
+                self.logging.debug(
+                    f"IAM Policy '{policy.get('PolicyName')}' has been detached from IAM Role '{resource_id}'."
+                )
+
+        # delete all instance profiles
+        for profile in self.authorization_index.get_role_instance_profiles(resource_id):
+            # remove role from instance profile
+            try:
+                if not self.is_dry_run:
+                    self.client_iam.remove_role_from_instance_profile(
+                        InstanceProfileName=profile.get("InstanceProfileName"),
+                        RoleName=resource_id,
+                    )
+            except:
+                self.logging.error(
+                    f"Could not remove IAM Role '{resource_id}' from IAM Instance Profile '{profile.get('InstanceProfileName')}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
+                self.logging.debug(
+                    f"IAM Role '{resource_id}' has been removed from IAM Instance Profile '{profile.get('InstanceProfileName')}'."
+                )
+
+            # delete instance profile
+            try:
+                if not self.is_dry_run:
+                    self.client_iam.delete_instance_profile(
+                        InstanceProfileName=profile.get("InstanceProfileName")
+                    )
+            except:
+                self.logging.error(
+                    f"Could not delete IAM Instance Profile '{profile.get('InstanceProfileName')}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                resource_action = "ERROR"
+            else:
+                self.logging.debug(
+                    f"IAM Instance Profile '{profile.get('InstanceProfileName')}' has been delete."
+                )
+
+        # delete role
+        try:
+            if not self.is_dry_run:
+                self.client_iam.delete_role(RoleName=resource_id)
+        except:
+            self.logging.error(f"Could not delete IAM Role '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            resource_action = "ERROR"
+        else:
+            self.logging.info(
+                f"IAM Role '{resource_id}' was last accessed {resource_age} days ago "
+                "and has been deleted."
+            )
+            resource_action = "DELETE"
+
+        return resource_action
+
     def user_policies(self, user):
         """Deletes IAM User Policies."""
         self.logging.debug(
@@ -657,12 +568,7 @@ class IAMCleanup:
 
         if is_cleaning_enabled:
             try:
-                paginator = self.client_iam.get_paginator("list_user_policies")
-                resources = (
-                    paginator.paginate(UserName=user)
-                    .build_full_result()
-                    .get("PolicyNames")
-                )
+                resources = self.authorization_index.get_user_inline_policies(user)
             except:
                 self.logging.error(
                     f"Could not list all IAM User Policies for IAM User '{user}'."
@@ -735,33 +641,71 @@ class IAMCleanup:
     def remove_user_from_group(self, user):
         """Removes IAM User from IAM Group."""
         try:
-            paginator = self.client_iam.get_paginator("list_groups_for_user")
-            resources = (
-                paginator.paginate(UserName=user).build_full_result().get("Groups")
-            )
+            resources = self.authorization_index.get_user_groups(user)
         except:
             self.logging.error(f"Could not list all IAM Groups for IAM User '{user}'.")
             self.logging.error(sys.exc_info()[1])
             return False
 
+        is_removed = True
+
         for resource in resources:
-            resource_id = resource.get("GroupName")
+            resource_id = resource
 
             try:
-                self.client_iam.remove_user_from_group(
-                    GroupName=resource_id, UserName=user
-                )
+                if not self.is_dry_run:
+                    self.client_iam.remove_user_from_group(
+                        GroupName=resource_id, UserName=user
+                    )
             except:
                 self.logging.error(
                     f"Could not remove IAM User '{user}' from IAM Group '{resource_id}'."
                 )
                 self.logging.error(sys.exc_info()[1])
+                is_removed = False
             else:
                 self.logging.debug(
                     f"Removed IAM User '{user}' from IAM Group '{resource_id}'."
                 )
 
-            return True
+        return is_removed
+
+    def detach_user_policies(self, user):
+        """Detaches managed IAM Policies from IAM User."""
+        try:
+            resources = self.authorization_index.get_user_attached_policies(user)
+        except:
+            self.logging.error(
+                f"Could not list all managed IAM Policies attached to IAM User '{user}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return False
+
+        is_detached = True
+
+        for resource in resources:
+            resource_id = resource.get("PolicyName")
+
+            try:
+                if not self.is_dry_run:
+                    self.client_iam.detach_user_policy(
+                        UserName=user, PolicyArn=resource.get("PolicyArn")
+                    )
+                    self.authorization_index.remove_policy_attachment(
+                        resource.get("PolicyArn"), "User", user
+                    )
+            except:
+                self.logging.error(
+                    f"Could not detach managed IAM Policy '{resource_id}' from IAM User '{user}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                is_detached = False
+            else:
+                self.logging.debug(
+                    f"Detached managed IAM Policy '{resource_id}' from IAM User '{user}'."
+                )
+
+        return is_detached
 
     def users(self):
         """
@@ -798,64 +742,89 @@ class IAMCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
-            for resource in resources:
-                resource_id = resource.get("UserName")
-                resource_date = resource.get(
-                    "PasswordLastUsed", resource.get("CreateDate")
-                )
-                resource_age = Helper.get_day_delta(resource_date).days
-                resource_action = None
-
-                if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    if resource_age > resource_maximum_age:
-                        self.access_keys(resource_id)
-                        self.delete_login_profile(resource_id)
-                        self.remove_user_from_group(resource_id)
-                        self.user_policies(resource_id)
-
-                        try:
-                            if not self.is_dry_run:
-                                self.client_iam.delete_user(UserName=resource_id)
-                        except self.client_iam.exceptions.DeleteConflictException:
-                            self.logging.debug(
-                                f"IAM User '{resource_id}' has dependent objects and has not been deleted."
-                            )
-                            resource_action = "SKIP - IN USE"
-                        except:
-                            self.logging.error(
-                                f"Could not delete IAM User '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.info(
-                                f"IAM User '{resource_id}' was last used {resource_age} days ago "
-                                "and has been deleted."
-                            )
-                            resource_action = "DELETE"
-                    else:
-                        self.logging.debug(
-                            f"IAM User '{resource_id}' was last used {resource_age} days ago "
-                            "(less than TTL setting) and has not been deleted."
-                        )
-                        resource_action = "SKIP - TTL"
-                else:
-                    self.logging.debug(
-                        f"IAM User '{resource_id}' has been allowlisted and has not been deleted."
-                    )
-                    resource_action = "SKIP - ALLOWLIST"
+            # Users are torn down in parallel while the remaining Users are checked
+            pool = WorkerPool("iam")
 
+            for resource in resources:
                 Helper.record_execution_log_action(
                     self.execution_log,
                     self.region,
                     "IAM",
                     "User",
-                    resource_id,
-                    resource_action,
+                    resource.get("UserName"),
+                    pool.submit(
+                        self.user, resource, resource_allowlist, resource_maximum_age
+                    ),
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of IAM Users.")
             return True
         else:
             self.logging.info("Skipping cleanup of IAM Users.")
             return True
+
+    def user(self, resource, resource_allowlist, resource_maximum_age):
+        """
+        Deletes an IAM User once its Access Keys, Login Profile, Group
+        memberships and Policies have been removed. Users are torn down in
+        parallel by the IAM worker pool, each User's dependent objects are
+        removed one after another within its task.
+        """
+        resource_id = resource.get("UserName")
+        resource_date = resource.get("PasswordLastUsed", resource.get("CreateDate"))
+        resource_age = Helper.get_day_delta(resource_date).days
+
+        if Helper.not_allowlisted(resource_id, resource_allowlist):
+            if resource_age > resource_maximum_age:
+                for step in (
+                    self.access_keys,
+                    self.delete_login_profile,
+                    self.remove_user_from_group,
+                    self.detach_user_policies,
+                    self.user_policies,
+                ):
+                    # steps report failures by returning False
+                    try:
+                        if step(resource_id) is False:
+                            self.logging.error(
+                                f"Could not remove the dependent objects of IAM User '{resource_id}'."
+                            )
+                            return "ERROR"
+                    except:
+                        self.logging.error(
+                            f"Could not remove the dependent objects of IAM User '{resource_id}'."
+                        )
+                        self.logging.error(sys.exc_info()[1])
+                        return "ERROR"
+
+                try:
+                    if not self.is_dry_run:
+                        self.client_iam.delete_user(UserName=resource_id)
+                except self.client_iam.exceptions.DeleteConflictException:
+                    self.logging.debug(
+                        f"IAM User '{resource_id}' has dependent objects and has not been deleted."
+                    )
+                    return "SKIP - IN USE"
+                except:
+                    self.logging.error(f"Could not delete IAM User '{resource_id}'.")
+                    self.logging.error(sys.exc_info()[1])
+                    return "ERROR"
+                else:
+                    self.logging.info(
+                        f"IAM User '{resource_id}' was last used {resource_age} days ago "
+                        "and has been deleted."
+                    )
+                    return "DELETE"
+            else:
+                self.logging.debug(
+                    f"IAM User '{resource_id}' was last used {resource_age} days ago "
+                    "(less than TTL setting) and has not been deleted."
+                )
+                return "SKIP - TTL"
+        else:
+            self.logging.debug(
+                f"IAM User '{resource_id}' has been allowlisted and has not been deleted."
+            )
+            return "SKIP - ALLOWLIST"
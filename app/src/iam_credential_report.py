@@ -0,0 +1,89 @@
+import csv
+import sys
+import threading
+import time
+
+from src.helper import Helper
+
+
+class IAMCredentialReport:
+    """
+    Run-scoped index of the IAM credential report. The report is generated
+    and downloaded once per run the first time it is consulted and is parsed
+    into the Access Keys of each User along with when they were last used,
+    replacing a GetAccessKeyLastUsed call per Access Key.
+
+    The credential report identifies Access Keys by their slot rather than
+    their ID, so each Access Key is matched to its slot by its creation date.
+    IAM reuses a report for up to four hours, Access Keys created since are
+    not part of it. Generation and download errors are raised to the
+    consulting cleanup, once a report could not be loaded it is not
+    generated again within the same run.
+    """
+
+    def __init__(self, client_iam):
+        self.client_iam = client_iam
+
+        self._access_keys = None
+        self._error = None
+
+        self._lock = threading.RLock()
+
+    @property
+    def access_keys(self):
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+
+            if self._access_keys is None:
+                try:
+                    self._access_keys = self.load()
+                except:
+                    self._error = sys.exc_info()[1]
+                    raise
+
+            return self._access_keys
+
+    def load(self):
+        """Generates and downloads the credential report, returns the Access Keys of each User."""
+        deadline = time.monotonic() + 60
+
+        while self.client_iam.generate_credential_report().get("State") != "COMPLETE":
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    "IAM credential report was not generated in a reasonable amount of time."
+                )
+
+            time.sleep(1)
+
+        content = self.client_iam.get_credential_report().get("Content")
+
+        access_keys = {}
+        for row in csv.DictReader(content.decode("utf-8").splitlines()):
+            for slot in ("access_key_1", "access_key_2"):
+                created = row.get(f"{slot}_last_rotated")
+                last_used = row.get(f"{slot}_last_used_date")
+
+                if created not in (None, "N/A"):
+                    access_keys.setdefault(row.get("user"), []).append(
+                        {
+                            "created": Helper.convert_to_datetime(created),
+                            "last_used": (
+                                Helper.convert_to_datetime(last_used)
+                                if last_used not in (None, "N/A")
+                                else None
+                            ),
+                        }
+                    )
+
+        return access_keys
+
+    def get_access_key_last_used(self, user, create_date):
+        """Returns when the User's Access Key created at the given date was last used or None."""
+        created = Helper.convert_to_datetime(create_date).replace(microsecond=0)
+
+        for access_key in self.access_keys.get(user, []):
+            if access_key.get("created").replace(microsecond=0) == created:
+                return access_key.get("last_used")
+
+        return None
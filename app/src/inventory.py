@@ -0,0 +1,206 @@
+import datetime
+import json
+import os
+import sys
+import tempfile
+
+import boto3
+
+from src.circuit_breaker import CircuitBreaker
+from src.helper import Helper
+
+
+class LocalInventoryStore:
+    """Persists a snapshot (the inventory by default) as a JSON file on the local file system."""
+
+    def __init__(self, logging, settings, name="inventory"):
+        self.logging = logging
+        self.name = name
+        self.path = Helper.get_setting(
+            settings,
+            f"general.{name}.path",
+            os.path.join(tempfile.gettempdir(), f"auto-cleanup-{name}.json"),
+        )
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path) as snapshot_file:
+            return json.loads(snapshot_file.read())
+
+    def write(self, snapshot):
+        with open(self.path, "w") as snapshot_file:
+            snapshot_file.write(json.dumps(snapshot, separators=(",", ":")))
+
+        self.logging.info(
+            f"{self.name.capitalize()} snapshot has been written to '{self.path}'."
+        )
+
+
+class S3InventoryStore:
+    """Persists a snapshot (the inventory by default) as a JSON object within the state S3 Bucket."""
+
+    def __init__(self, logging, settings, name="inventory"):
+        self.logging = logging
+        self.name = name
+        self.bucket = os.environ.get("STATE_BUCKET")
+        self.key = Helper.get_setting(
+            settings, f"general.{name}.key", f"{name}/{name}.json"
+        )
+
+        self._client_s3 = None
+
+    @property
+    def client_s3(self):
+        if not self._client_s3:
+            self._client_s3 = CircuitBreaker.exempt(boto3.client("s3"))
+        return self._client_s3
+
+    def read(self):
+        try:
+            body = self.client_s3.get_object(Bucket=self.bucket, Key=self.key)[
+                "Body"
+            ].read()
+        except self.client_s3.exceptions.NoSuchKey:
+            return {}
+
+        return json.loads(body)
+
+    def write(self, snapshot):
+        self.client_s3.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=json.dumps(snapshot, separators=(",", ":")).encode("utf-8"),
+        )
+
+        self.logging.info(
+            f"{self.name.capitalize()} snapshot has been uploaded to S3 's3://{self.bucket}/{self.key}'."
+        )
+
+
+class Inventory:
+    """
+    Compact snapshot of every resource seen by a run, keyed by region,
+    service, resource type and resource ID. Each entry holds the resource's
+    creation (or last modified) date, the last action taken and when it was
+    last seen.
+
+    The snapshot written by the previous run is loaded when a run starts so
+    that cleanup classes can recheck resources that were still within their
+    TTL without describing them again.
+    """
+
+    version = 1
+    stores = {"local": LocalInventoryStore, "s3": S3InventoryStore}
+
+    _resources = {}
+
+    @classmethod
+    def get_store(cls, logging, settings, name="inventory"):
+        store = Helper.get_setting(settings, "general.inventory.store", "s3")
+        return cls.stores[store](logging, settings, name)
+
+    @classmethod
+    def load(cls, logging, settings):
+        """Loads the inventory snapshot written by the previous run."""
+        cls._resources = {}
+
+        if not Helper.get_setting(settings, "general.inventory.enabled", False):
+            return False
+
+        try:
+            snapshot = cls.get_store(logging, settings).read()
+        except:
+            logging.error("Could not read the inventory snapshot.")
+            logging.error(sys.exc_info()[1])
+            return False
+
+        if snapshot.get("version") == cls.version:
+            cls._resources = snapshot.get("resources", {})
+            logging.debug("Inventory snapshot from the previous run has been loaded.")
+
+        return True
+
+    @classmethod
+    def get(cls, region, service, resource, resource_id):
+        """Returns the previous run's entry for a resource or None."""
+        return (
+            cls._resources.get(region, {})
+            .get(service, {})
+            .get(resource, {})
+            .get(resource_id)
+        )
+
+    @classmethod
+    def get_resource_date(
+        cls, region, service, resource, resource_id, resource_maximum_age
+    ):
+        """
+        Returns the date recorded for a resource by the previous run if,
+        based on that date, the resource is still within its TTL. The date
+        can only move forward when a resource is recreated or modified,
+        therefore a resource that is still young according to the snapshot
+        is at least as young in reality.
+        """
+        entry = cls.get(region, service, resource, resource_id)
+
+        if entry is not None and entry.get("date") is not None:
+            if Helper.get_day_delta(entry.get("date")).days <= resource_maximum_age:
+                return entry.get("date")
+
+        return None
+
+    @classmethod
+    def save(cls, logging, settings, execution_log):
+        """
+        Merges the resources recorded in the execution log into the loaded
+        snapshot and persists the result. Entries that have not been seen
+        within the retention period are dropped.
+        """
+        if not Helper.get_setting(settings, "general.inventory.enabled", False):
+            return False
+
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        retention = Helper.get_setting(settings, "general.inventory.retention", 30)
+        resources = {}
+
+        for region, region_dict in cls._resources.items():
+            for service, service_dict in region_dict.items():
+                for resource, resource_dict in service_dict.items():
+                    for resource_id, entry in resource_dict.items():
+                        if Helper.get_day_delta(entry.get("seen")).days <= retention:
+                            resources.setdefault(region, {}).setdefault(
+                                service, {}
+                            ).setdefault(resource, {})[resource_id] = entry
+
+        for region, region_dict in execution_log.get("AWS", {}).items():
+            for service, service_dict in region_dict.items():
+                for resource, actions in service_dict.items():
+                    for action in actions:
+                        if action.get("id") is None:
+                            continue
+
+                        resource_dict = (
+                            resources.setdefault(region, {})
+                            .setdefault(service, {})
+                            .setdefault(resource, {})
+                        )
+                        previous = resource_dict.get(action.get("id"), {})
+
+                        resource_dict[action.get("id")] = {
+                            "date": action.get("date", previous.get("date")),
+                            "action": action.get("action"),
+                            "seen": now,
+                        }
+
+        try:
+            cls.get_store(logging, settings).write(
+                {"version": cls.version, "resources": resources}
+            )
+        except:
+            logging.error("Could not write the inventory snapshot.")
+            logging.error(sys.exc_info()[1])
+            return False
+
+        return True
@@ -3,6 +3,7 @@ import sys
 import boto3
 
 from src.helper import Helper
+from src.inventory import Inventory
 
 
 class KinesisCleanup:
@@ -25,7 +26,7 @@ class KinesisCleanup:
     def run(self):
         self.streams()
 
-    def streams(self):
+    def streams(self, resource_ids=None):
         """Deletes Kinesis Streams."""
         self.logging.debug("Started cleanup of Kinesis Streams.")
 
@@ -46,26 +47,48 @@ class KinesisCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource for resource in resources if resource in resource_ids
+                ]
+
             for resource in resources:
                 resource_id = resource
+                resource_date = None
+                resource_status = None
                 resource_action = None
 
-                try:
-                    resource_details = self.client_kinesis.describe_stream(
-                        StreamName=resource_id
-                    ).get("StreamDescription")
-                except:
-                    self.logging.error(
-                        f"Could not get Kinesis Stream's '{resource_id}' details."
+                if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    # streams that were still within their TTL during the previous
+                    # run can be rechecked without describing them again
+                    resource_date = Inventory.get_resource_date(
+                        self.region,
+                        "Kinesis",
+                        "Stream",
+                        resource_id,
+                        resource_maximum_age,
                     )
-                    self.logging.error(sys.exc_info()[1])
-                    resource_action = "ERROR"
-                else:
-                    resource_status = resource_details.get("StreamStatus")
-                    resource_date = resource_details.get("StreamCreationTimestamp")
-                    resource_age = Helper.get_day_delta(resource_date).days
 
-                    if Helper.not_allowlisted(resource_id, resource_allowlist):
+                    if resource_date is None:
+                        try:
+                            resource_details = self.client_kinesis.describe_stream(
+                                StreamName=resource_id
+                            ).get("StreamDescription")
+                        except:
+                            self.logging.error(
+                                f"Could not get Kinesis Stream's '{resource_id}' details."
+                            )
+                            self.logging.error(sys.exc_info()[1])
+                            resource_action = "ERROR"
+                        else:
+                            resource_status = resource_details.get("StreamStatus")
+                            resource_date = resource_details.get(
+                                "StreamCreationTimestamp"
+                            )
+
+                    if resource_action is None:
+                        resource_age = Helper.get_day_delta(resource_date).days
 
                         if resource_age > resource_maximum_age:
                             if resource_status == "ACTIVE":
@@ -98,11 +121,11 @@ class KinesisCleanup:
                                 "(less than TTL setting) and has not been deleted."
                             )
                             resource_action = "SKIP - TTL"
-                    else:
-                        self.logging.debug(
-                            f"Kinesis Stream '{resource_id}' has been allowlisted and has not been deleted."
-                        )
-                        resource_action = "SKIP - ALLOWLIST"
+                else:
+                    self.logging.debug(
+                        f"Kinesis Stream '{resource_id}' has been allowlisted and has not been deleted."
+                    )
+                    resource_action = "SKIP - ALLOWLIST"
 
                 Helper.record_execution_log_action(
                     self.execution_log,
@@ -111,6 +134,7 @@ class KinesisCleanup:
                     "Stream",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
             self.logging.debug("Finished cleanup of Kinesis Streams.")
@@ -2,7 +2,9 @@ import sys
 
 import boto3
 
+from src.concurrency import WorkerPool
 from src.helper import Helper
+from src.stack_ownership import StackOwnership
 
 
 class LambdaCleanup:
@@ -25,7 +27,7 @@ class LambdaCleanup:
     def run(self):
         self.functions()
 
-    def functions(self):
+    def functions(self, resource_ids=None):
         """Deletes Lambda Functions."""
         self.logging.debug("Started cleanup of Lambda Functions.")
 
@@ -46,6 +48,17 @@ class LambdaCleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("FunctionName") in resource_ids
+                ]
+
+            # deletions are taken in parallel while the remaining Functions are checked
+            pool = WorkerPool("lambda")
+
             for resource in resources:
                 resource_id = resource.get("FunctionName")
                 resource_date = resource.get("LastModified")
@@ -53,24 +66,19 @@ class LambdaCleanup:
                 resource_action = None
 
                 if Helper.not_allowlisted(resource_id, resource_allowlist):
-                    if resource_age > resource_maximum_age:
-                        try:
-                            if not self.is_dry_run:
-                                self.client_lambda.delete_function(
-                                    FunctionName=resource_id
-                                )
-                        except:
-                            self.logging.error(
-                                f"Could not delete Lambda Function '{resource_id}'."
-                            )
-                            self.logging.error(sys.exc_info()[1])
-                            resource_action = "ERROR"
-                        else:
-                            self.logging.info(
-                                f"Lambda Function '{resource_id}' was last modified {resource_age} days ago "
-                                "and has been deleted."
-                            )
-                            resource_action = "DELETE"
+                    resource_stack = StackOwnership.get_stack(
+                        self.region, "AWS::Lambda::Function", resource_id
+                    )
+
+                    if resource_stack is not None:
+                        self.logging.debug(
+                            f"Lambda Function '{resource_id}' is being deleted by CloudFormation Stack '{resource_stack}'."
+                        )
+                        resource_action = "SKIP - STACK"
+                    elif resource_age > resource_maximum_age:
+                        resource_action = pool.submit(
+                            self.delete_function, resource_id, resource_age
+                        )
                     else:
                         self.logging.debug(
                             f"Lambda Function '{resource_id}' was last modified {resource_age} days ago "
@@ -90,10 +98,28 @@ class LambdaCleanup:
                     "Function",
                     resource_id,
                     resource_action,
+                    resource_date,
                 )
 
+            pool.wait()
+
             self.logging.debug("Finished cleanup of Lambda Functions.")
             return True
         else:
             self.logging.info("Skipping cleanup of Lambda Functions.")
             return True
+
+    def delete_function(self, resource_id, resource_age):
+        try:
+            if not self.is_dry_run:
+                self.client_lambda.delete_function(FunctionName=resource_id)
+        except:
+            self.logging.error(f"Could not delete Lambda Function '{resource_id}'.")
+            self.logging.error(sys.exc_info()[1])
+            return "ERROR"
+        else:
+            self.logging.info(
+                f"Lambda Function '{resource_id}' was last modified {resource_age} days ago "
+                "and has been deleted."
+            )
+            return "DELETE"
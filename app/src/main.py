@@ -14,8 +14,10 @@ from func_timeout import func_set_timeout, FunctionTimedOut
 
 from src.airflow_cleanup import AirflowCleanup
 from src.amplify_cleanup import AmplifyCleanup
+from src.circuit_breaker import CircuitBreaker
 from src.cloudformation_cleanup import CloudFormationCleanup
 from src.cloudwatch_cleanup import CloudWatchCleanup
+from src.concurrency import Concurrency
 from src.dynamodb_cleanup import DynamoDBCleanup
 from src.ec2_cleanup import EC2Cleanup
 from src.ecr_cleanup import ECRCleanup
@@ -30,15 +32,22 @@ from src.emr_cleanup import EMRCleanup
 from src.glue_cleanup import GlueCleanup
 from src.helper import Helper
 from src.iam_cleanup import IAMCleanup
+from src.inventory import Inventory
 from src.kafka_cleanup import KafkaCleanup
 from src.kinesis_cleanup import KinesisCleanup
 from src.kms_cleanup import KMSCleanup
 from src.lambda_cleanup import LambdaCleanup
+from src.plan import Plan
+from src.rate_limiter import RateLimiter
 from src.rds_cleanup import RDSCleanup
 from src.redshift_cleanup import RedshiftCleanup
 from src.s3_cleanup import S3Cleanup
+from src.s3_emptier import S3Emptier
 from src.sagemaker_cleanup import SageMakerCleanup
+from src.stack_ownership import StackOwnership
+from src.teardown import Teardown
 from src.transfer_cleanup import TransferCleanup
+from src.waiter import Waiter
 
 
 class Cleanup:
@@ -56,6 +65,30 @@ class Cleanup:
         self.allowlist = self.get_allowlist()
         self.dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
 
+        # limit the rate of AWS API calls made by all clients created from here on
+        RateLimiter.setup(self.settings)
+
+        # stop calling services that keep failing within a region
+        CircuitBreaker.setup(self.logging, self.settings)
+
+        # adjust the number of parallel workers to the throttling AWS reports back
+        Concurrency.setup(self.settings)
+
+        # complete asynchronous deletions within the same run
+        Waiter.setup(self.logging, self.settings)
+
+        # empty S3 Buckets until the run's deadline
+        S3Emptier.setup(self.logging, self.settings)
+
+        # skip resources that are being deleted by their CloudFormation Stack
+        StackOwnership.setup()
+
+        # load the inventory snapshot written by the previous run
+        Inventory.load(self.logging, self.settings)
+
+        # resume teardowns that did not complete within the previous run
+        Teardown.load(self.logging, self.settings)
+
     @func_set_timeout(840)
     def run_cleanup(self):
         if self.dry_run:
@@ -81,8 +114,9 @@ class Cleanup:
                 threads = []
 
                 # CloudFormation
-                # CloudFormation will run before all other cleanup operations as there is a potential
-                # through the removal of CloudFormation Stacks, many of the other resource will be removed
+                # CloudFormation will run before all other cleanup operations so that the resources of
+                # retained CloudFormation Stacks are allowlisted. Stacks being deleted are waited on in
+                # the background while the other cleanup operations run
                 cloudformation_class = CloudFormationCleanup(
                     self.logging,
                     self.allowlist,
@@ -366,6 +400,24 @@ class Cleanup:
         for thread in threads:
             thread.join()
 
+        # wait for the remaining asynchronous deletions
+        Waiter.join()
+
+        # report the concurrency limits chosen for this run
+        Concurrency.report(self.logging)
+
+        self.logging.info("Auto Cleanup completed.")
+        return True
+
+    @func_set_timeout(840)
+    def apply_plan(self, key):
+        # a reviewed plan is always applied in DESTROY mode
+        self.dry_run = False
+
+        self.logging.info(f"Auto Cleanup started in APPLY mode.")
+
+        Plan(self.logging, self.allowlist, self.execution_log).apply(key)
+
         self.logging.info("Auto Cleanup completed.")
         return True
 
@@ -541,7 +593,7 @@ class Cleanup:
                     return False
 
                 now = datetime.datetime.now()
-                client = boto3.client("s3")
+                client = CircuitBreaker.exempt(boto3.client("s3"))
                 bucket = os.environ.get("EXECUTION_LOG_BUCKET")
                 key = f"""{now.strftime("%Y")}/{now.strftime("%m")}/execution_log_{now.strftime("%Y_%m_%d_%H_%M_%S")}.csv"""
 
@@ -565,8 +617,7 @@ class Cleanup:
             return False
 
 
-def lambda_handler(event, context):
-    # enable logging
+def setup_logging():
     root = logging.getLogger()
 
     if root.handlers:
@@ -582,14 +633,35 @@ def lambda_handler(event, context):
         level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
     )
 
+
+def lambda_handler(event, context):
+    # enable logging
+    setup_logging()
+
     # create instance of class
     cleanup = Cleanup(logging)
 
     try:
-        cleanup.run_cleanup()
+        if event.get("apply"):
+            # apply a plan written by a previous DRY RUN, e.g. {"apply": "plans/plan_2022_01_01_00_00_00.json"}
+            cleanup.apply_plan(event.get("apply"))
+        else:
+            cleanup.run_cleanup()
     except FunctionTimedOut:
         logging.warning(
             "Auto Cleanup execution has exceeded 14 minutes and has been stopped."
         )
 
+    Waiter.expire()
+
+    CircuitBreaker.record_execution_log(cleanup.execution_log)
+
     cleanup.export_execution_log(cleanup.execution_log, context.aws_request_id)
+
+    # DRY RUN decisions are kept as a plan that can be reviewed and applied
+    if cleanup.dry_run:
+        Plan(logging, cleanup.allowlist, cleanup.execution_log).write()
+
+    Inventory.save(logging, cleanup.settings, cleanup.execution_log)
+
+    Teardown.save(logging, cleanup.settings)
@@ -0,0 +1,333 @@
+import datetime
+import hashlib
+import json
+import os
+import sys
+
+import boto3
+
+from src.circuit_breaker import CircuitBreaker
+from src.helper import Helper
+
+
+class Plan:
+    """
+    Machine-readable record of the resources a dry run decided to delete.
+    Each planned resource carries a fingerprint of the state it was in when
+    the decision was made (its creation or last modified date).
+
+    Applying a reviewed plan deletes the planned resources directly, without
+    listing or describing every resource again. Before each deletion the
+    resource is described on its own and its fingerprint compared to the
+    planned one, resources that have since been recreated, modified, put to
+    use or allowlisted are skipped.
+    """
+
+    version = 1
+
+    # resource actions that are included within the plan
+    actions = ("DELETE", "DELETE - NOT CONFIRMED")
+
+    # (execution log service, execution log resource): (boto3 client, allowlist path, describe method, delete method)
+    # describe methods return the resource's date or None if the resource can no longer be deleted
+    appliers = {
+        ("CloudWatch", "Log Group"): (
+            "logs",
+            "cloudwatch.log_group",
+            "describe_log_group",
+            "delete_log_group",
+        ),
+        ("DynamoDB", "Table"): (
+            "dynamodb",
+            "dynamodb.table",
+            "describe_table",
+            "delete_table",
+        ),
+        ("EC2", "Snapshot"): (
+            "ec2",
+            "ec2.snapshot",
+            "describe_snapshot",
+            "delete_snapshot",
+        ),
+        ("EC2", "Volume"): (
+            "ec2",
+            "ec2.volume",
+            "describe_volume",
+            "delete_volume",
+        ),
+        ("Kinesis", "Stream"): (
+            "kinesis",
+            "kinesis.stream",
+            "describe_stream",
+            "delete_stream",
+        ),
+        ("Lambda", "Function"): (
+            "lambda",
+            "lambda.function",
+            "describe_function",
+            "delete_function",
+        ),
+    }
+
+    def __init__(self, logging, allowlist, execution_log):
+        self.logging = logging
+        self.allowlist = allowlist
+        self.execution_log = execution_log
+
+        self._client_s3 = None
+        self._clients = {}
+        self.bucket = os.environ.get("STATE_BUCKET")
+
+    @property
+    def client_s3(self):
+        if not self._client_s3:
+            self._client_s3 = CircuitBreaker.exempt(boto3.client("s3"))
+        return self._client_s3
+
+    def get_client(self, service, region):
+        if (service, region) not in self._clients:
+            self._clients[(service, region)] = boto3.client(service, region_name=region)
+        return self._clients[(service, region)]
+
+    @staticmethod
+    def get_fingerprint(resource_id, resource_date):
+        return hashlib.sha256(f"{resource_id}|{resource_date}".encode()).hexdigest()
+
+    def write(self):
+        """Writes the resources the execution log has marked for deletion as a plan."""
+        now = datetime.datetime.now()
+        resources = []
+
+        for region, region_dict in self.execution_log.get("AWS", {}).items():
+            for service, service_dict in region_dict.items():
+                for resource, actions in service_dict.items():
+                    for action in actions:
+                        if action.get("action") in self.actions:
+                            resources.append(
+                                {
+                                    "region": region,
+                                    "service": service,
+                                    "resource": resource,
+                                    "resource_id": action.get("id"),
+                                    "action": action.get("action"),
+                                    "fingerprint": (
+                                        self.get_fingerprint(
+                                            action.get("id"), action.get("date")
+                                        )
+                                        if action.get("date") is not None
+                                        else None
+                                    ),
+                                }
+                            )
+
+        key = f"""plans/plan_{now.strftime("%Y_%m_%d_%H_%M_%S")}.json"""
+
+        try:
+            self.client_s3.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=json.dumps(
+                    {
+                        "version": self.version,
+                        "created": now.strftime("%Y-%m-%d %H:%M:%S"),
+                        "resources": resources,
+                    },
+                    indent=2,
+                ).encode("utf-8"),
+            )
+        except:
+            self.logging.error(
+                f"Could not upload the plan to S3 's3://{self.bucket}/{key}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return None
+
+        self.logging.info(
+            f"Plan with {len(resources)} resources has been uploaded to S3 's3://{self.bucket}/{key}'."
+        )
+        return key
+
+    def read(self, key):
+        try:
+            body = self.client_s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except:
+            self.logging.error(
+                f"Could not read the plan from S3 's3://{self.bucket}/{key}'."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return None
+
+        plan = json.loads(body)
+
+        if plan.get("version") != self.version:
+            self.logging.error(
+                f"""Plan 's3://{self.bucket}/{key}' has version {plan.get("version")} """
+                "which is not supported."
+            )
+            return None
+
+        return plan
+
+    def apply(self, key):
+        """Deletes the resources of a reviewed plan after checking their preconditions."""
+        plan = self.read(key)
+
+        if plan is None:
+            return False
+
+        self.logging.info(
+            f"""Applying plan 's3://{self.bucket}/{key}' created {plan.get("created")}."""
+        )
+
+        for planned in plan.get("resources", []):
+            region = planned.get("region")
+            service = planned.get("service")
+            resource = planned.get("resource")
+            resource_id = planned.get("resource_id")
+            resource_action = None
+
+            if (service, resource) not in self.appliers:
+                self.logging.warning(
+                    f"{service} {resource} '{resource_id}' cannot be deleted from a plan "
+                    "and has been left for the next DESTROY run."
+                )
+                resource_action = "SKIP - NOT SUPPORTED"
+            elif planned.get("fingerprint") is None:
+                self.logging.warning(
+                    f"{service} {resource} '{resource_id}' was planned without a fingerprint "
+                    "and has been left for the next DESTROY run."
+                )
+                resource_action = "SKIP - NOT SUPPORTED"
+            else:
+                client_name, allowlist_path, describe, delete = self.appliers.get(
+                    (service, resource)
+                )
+                client = self.get_client(client_name, region)
+
+                if not Helper.not_allowlisted(
+                    resource_id, Helper.get_allowlist(self.allowlist, allowlist_path)
+                ):
+                    self.logging.debug(
+                        f"{service} {resource} '{resource_id}' has been allowlisted since "
+                        "the plan was created and has not been deleted."
+                    )
+                    resource_action = "SKIP - ALLOWLIST"
+                else:
+                    try:
+                        resource_date = getattr(self, describe)(client, resource_id)
+                    except:
+                        self.logging.error(
+                            f"Could not get {service} {resource}'s '{resource_id}' details."
+                        )
+                        self.logging.error(sys.exc_info()[1])
+                        resource_action = "ERROR"
+                    else:
+                        if resource_date is None or self.get_fingerprint(
+                            resource_id,
+                            Helper.convert_to_datetime(resource_date).strftime(
+                                "%Y-%m-%d %H:%M:%S"
+                            ),
+                        ) != planned.get("fingerprint"):
+                            self.logging.info(
+                                f"{service} {resource} '{resource_id}' has changed since the plan "
+                                "was created and has not been deleted."
+                            )
+                            resource_action = "SKIP - PLAN OUTDATED"
+                        else:
+                            try:
+                                getattr(self, delete)(client, resource_id)
+                            except:
+                                self.logging.error(
+                                    f"Could not delete {service} {resource} '{resource_id}'."
+                                )
+                                self.logging.error(sys.exc_info()[1])
+                                resource_action = "ERROR"
+                            else:
+                                self.logging.info(
+                                    f"{service} {resource} '{resource_id}' has been deleted as planned."
+                                )
+                                resource_action = planned.get("action")
+
+            Helper.record_execution_log_action(
+                self.execution_log,
+                region,
+                service,
+                resource,
+                resource_id,
+                resource_action,
+            )
+
+        return True
+
+    @staticmethod
+    def describe_log_group(client, resource_id):
+        for log_group in client.describe_log_groups(logGroupNamePrefix=resource_id).get(
+            "logGroups"
+        ):
+            if log_group.get("logGroupName") == resource_id:
+                return datetime.datetime.fromtimestamp(
+                    log_group.get("creationTime") / 1000.0
+                )
+        return None
+
+    @staticmethod
+    def delete_log_group(client, resource_id):
+        client.delete_log_group(logGroupName=resource_id)
+
+    @staticmethod
+    def describe_table(client, resource_id):
+        return client.describe_table(TableName=resource_id)["Table"]["CreationDateTime"]
+
+    @staticmethod
+    def delete_table(client, resource_id):
+        client.delete_table(TableName=resource_id)
+
+    @staticmethod
+    def describe_snapshot(client, resource_id):
+        return client.describe_snapshots(SnapshotIds=[resource_id])["Snapshots"][0][
+            "StartTime"
+        ]
+
+    @staticmethod
+    def delete_snapshot(client, resource_id):
+        client.delete_snapshot(SnapshotId=resource_id)
+
+    @staticmethod
+    def describe_volume(client, resource_id):
+        volume = client.describe_volumes(VolumeIds=[resource_id])["Volumes"][0]
+
+        # volumes that have been attached since cannot be deleted
+        if volume.get("Attachments") != []:
+            return None
+
+        return volume.get("CreateTime")
+
+    @staticmethod
+    def delete_volume(client, resource_id):
+        client.delete_volume(VolumeId=resource_id)
+
+    @staticmethod
+    def describe_stream(client, resource_id):
+        stream = client.describe_stream_summary(StreamName=resource_id)[
+            "StreamDescriptionSummary"
+        ]
+
+        # streams that are not active cannot be deleted
+        if stream.get("StreamStatus") != "ACTIVE":
+            return None
+
+        return stream.get("StreamCreationTimestamp")
+
+    @staticmethod
+    def delete_stream(client, resource_id):
+        client.delete_stream(StreamName=resource_id, EnforceConsumerDeletion=True)
+
+    @staticmethod
+    def describe_function(client, resource_id):
+        return client.get_function_configuration(FunctionName=resource_id)[
+            "LastModified"
+        ]
+
+    @staticmethod
+    def delete_function(client, resource_id):
+        client.delete_function(FunctionName=resource_id)
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import boto3
+
+from src.helper import Helper
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a fixed rate per second. Callers reserve a token
+    and sleep outside of the lock until their token becomes available, so
+    waiting threads are served in the order they arrived.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.timestamp) * self.rate
+            )
+            self.timestamp = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+
+class RateLimiter:
+    """
+    Process-wide rate limiter shared by every cleanup thread, configured by
+    the 'general.rate_limits' setting. An operation with its own rate is
+    given its own token bucket per region, while every other operation of
+    the service shares a single bucket per region with the service's
+    'default' rate. Calls to services without a configured rate are not
+    limited.
+
+    The bucket of a call is resolved through the botocore 'before-call'
+    event and a token is taken through the 'request-created' event, which
+    is emitted for the first attempt and for each of botocore's retries.
+    The limiter is attached to the default boto3 session, therefore it has
+    to be set up before any client is created for it to apply to that
+    client.
+    """
+
+    _buckets = {}
+    _lock = threading.Lock()
+    _rate_limits = {}
+
+    @classmethod
+    def setup(cls, settings):
+        with cls._lock:
+            cls._buckets = {}
+            cls._rate_limits = Helper.get_setting(settings, "general.rate_limits", {})
+
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+
+        boto3.DEFAULT_SESSION.events.register(
+            "before-call", cls.before_call, unique_id="auto-cleanup-rate-limiter"
+        )
+        boto3.DEFAULT_SESSION.events.register(
+            "request-created",
+            cls.request_created,
+            unique_id="auto-cleanup-rate-limiter-request-created",
+        )
+
+    @classmethod
+    def get_rate(cls, service, operation):
+        service_rate_limits = cls._rate_limits.get(service, {})
+        return service_rate_limits.get(operation, service_rate_limits.get("default"))
+
+    @classmethod
+    def get_bucket(cls, service, operation, region):
+        # operations without a rate of their own share the service's default bucket
+        if operation in cls._rate_limits.get(service, {}):
+            key = (service, operation, region)
+        else:
+            key = (service, region)
+
+        with cls._lock:
+            if key not in cls._buckets:
+                rate = cls.get_rate(service, operation)
+                cls._buckets[key] = TokenBucket(rate) if rate else None
+
+            return cls._buckets[key]
+
+    @classmethod
+    def before_call(cls, model, request_signer, context, **kwargs):
+        # the request context is shared by every attempt of the call
+        context["rate_limiter_bucket"] = cls.get_bucket(
+            model.service_model.service_name, model.name, request_signer.region_name
+        )
+
+    @classmethod
+    def request_created(cls, request, **kwargs):
+        bucket = getattr(request, "context", {}).get("rate_limiter_bucket")
+
+        if bucket is not None:
+            bucket.acquire()
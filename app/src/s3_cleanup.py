@@ -1,9 +1,13 @@
+import datetime
 import sys
 import threading
 
 import boto3
 
+from src.concurrency import Concurrency
 from src.helper import Helper
+from src.s3_emptier import S3Emptier
+from src.teardown import Teardown
 
 
 class S3Cleanup:
@@ -15,7 +19,9 @@ class S3Cleanup:
         self.region = "global"
 
         self._client_s3 = None
-        self._resource_s3 = None
+        self._clients = {}
+        self._bucket_regions = {}
+        self._lock = threading.Lock()
         self.is_dry_run = Helper.get_setting(self.settings, "general.dry_run", True)
 
     @property
@@ -24,16 +30,69 @@ class S3Cleanup:
             self._client_s3 = boto3.client("s3")
         return self._client_s3
 
-    @property
-    def resource_s3(self):
-        if not self._resource_s3:
-            self._resource_s3 = boto3.resource("s3")
-        return self._resource_s3
+    def get_client(self, service, region):
+        """Returns the pooled client of a service for a region, creating it on first use."""
+        with self._lock:
+            if (service, region) not in self._clients:
+                self._clients[(service, region)] = boto3.client(
+                    service, region_name=region
+                )
+            return self._clients[(service, region)]
+
+    def get_bucket_region(self, resource_id):
+        """
+        Returns the region a Bucket is located in, resolved once per run. The
+        region is taken from the Bucket's location or, if the location cannot
+        be read, from the 'x-amz-bucket-region' header S3 answers with.
+        """
+        with self._lock:
+            if resource_id in self._bucket_regions:
+                return self._bucket_regions[resource_id]
+
+        try:
+            location = self.client_s3.get_bucket_location(Bucket=resource_id).get(
+                "LocationConstraint"
+            )
+        except:
+            resource_region = (
+                getattr(sys.exc_info()[1], "response", {})
+                .get("ResponseMetadata", {})
+                .get("HTTPHeaders", {})
+                .get("x-amz-bucket-region")
+            )
+        else:
+            # Buckets in us-east-1 have no location constraint and
+            # Buckets created as 'EU' are located in eu-west-1
+            resource_region = {
+                None: "us-east-1",
+                "": "us-east-1",
+                "EU": "eu-west-1",
+            }.get(location, location)
+
+        if resource_region is None:
+            self.logging.warning(
+                f"Could not resolve the region of S3 Bucket '{resource_id}', "
+                "it will be cleaned up through the global endpoint."
+            )
+
+        with self._lock:
+            self._bucket_regions[resource_id] = resource_region
+
+        return resource_region
+
+    def get_bucket_client_s3(self, resource_id):
+        """Returns a client of the Bucket's home region or the global client."""
+        resource_region = self.get_bucket_region(resource_id)
+
+        if resource_region is None:
+            return self.client_s3
+
+        return self.get_client("s3", resource_region)
 
     def run(self):
         self.buckets()
 
-    def buckets(self):
+    def buckets(self, resource_ids=None):
         """
         Deletes Buckets. All Bucket Objects, Versions and Deleted Markers
         are first deleted before the Bucket can be deleted.
@@ -47,7 +106,7 @@ class S3Cleanup:
             self.settings, "services.s3.bucket.ttl", 7
         )
         resource_allowlist = Helper.get_allowlist(self.allowlist, "s3.bucket")
-        semaphore = threading.Semaphore(value=5)
+        semaphore = Concurrency.get("s3", initial=5)
 
         if is_cleaning_enabled:
             try:
@@ -57,6 +116,14 @@ class S3Cleanup:
                 self.logging.error(sys.exc_info()[1])
                 return False
 
+            # scheduled checks only consider the resources that are due
+            if resource_ids is not None:
+                resources = [
+                    resource
+                    for resource in resources
+                    if resource.get("Name") in resource_ids
+                ]
+
             # threads list
             threads = []
 
@@ -87,6 +154,187 @@ class S3Cleanup:
             self.logging.info("Skipping cleanup of S3 Buckets.")
             return True
 
+    def get_bucket_size(self, resource_id):
+        """
+        Returns the Bucket's number of Objects and size in bytes as last
+        reported to CloudWatch, or None for metrics that are not available.
+        """
+        resource_region = self.get_bucket_region(resource_id)
+
+        if resource_region is None:
+            return None, None
+
+        metric_data_queries = []
+        for metric_id, metric_name, storage_type in (
+            ("objects", "NumberOfObjects", "AllStorageTypes"),
+            ("bytes", "BucketSizeBytes", "StandardStorage"),
+        ):
+            metric_data_queries.append(
+                {
+                    "Id": metric_id,
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": "AWS/S3",
+                            "MetricName": metric_name,
+                            "Dimensions": [
+                                {"Name": "BucketName", "Value": resource_id},
+                                {"Name": "StorageType", "Value": storage_type},
+                            ],
+                        },
+                        "Period": 86400,
+                        "Stat": "Average",
+                    },
+                }
+            )
+
+        # S3 storage metrics are reported once a day
+        now = datetime.datetime.now()
+        try:
+            results = (
+                self.get_client("cloudwatch", resource_region)
+                .get_metric_data(
+                    MetricDataQueries=metric_data_queries,
+                    StartTime=now - datetime.timedelta(days=3),
+                    EndTime=now,
+                    ScanBy="TimestampDescending",
+                )
+                .get("MetricDataResults")
+            )
+        except:
+            self.logging.error(
+                f"Could not get the size of S3 Bucket '{resource_id}' from CloudWatch."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return None, None
+
+        values = {
+            result.get("Id"): result.get("Values")[0] if result.get("Values") else None
+            for result in results
+        }
+
+        return values.get("objects"), values.get("bytes")
+
+    def drain_bucket(self, resource_id):
+        """
+        Leaves Buckets holding more Objects than can be deleted within a run
+        to S3 by setting a lifecycle configuration that expires all of their
+        Objects, Versions, Delete Markers and incomplete multipart uploads.
+        Returns True while the Bucket is draining, it is emptied and deleted
+        by a later run once its size has dropped below the threshold.
+        """
+        drain_threshold = Helper.get_setting(
+            self.settings, "general.emptier.drain_threshold", 1000000
+        )
+        resource_objects, resource_bytes = self.get_bucket_size(resource_id)
+
+        if resource_objects is None or resource_objects <= drain_threshold:
+            return False
+
+        details = Teardown.get_details(self.region, "S3", "Bucket", resource_id)
+
+        if details.get("draining"):
+            # keeps the teardown from expiring while S3 drains the Bucket
+            Teardown.set_state(
+                self.region,
+                "S3",
+                "Bucket",
+                resource_id,
+                Teardown.CHILDREN_DELETING,
+                details,
+            )
+            self.logging.info(
+                f"S3 Bucket '{resource_id}' is draining and still holds {resource_objects:.0f} Objects."
+            )
+            return True
+
+        try:
+            if not self.is_dry_run:
+                self.get_bucket_client_s3(
+                    resource_id
+                ).put_bucket_lifecycle_configuration(
+                    Bucket=resource_id,
+                    LifecycleConfiguration={
+                        "Rules": [
+                            {
+                                "ID": "auto-cleanup-drain",
+                                "Filter": {"Prefix": ""},
+                                "Status": "Enabled",
+                                "Expiration": {"Days": 1},
+                                "NoncurrentVersionExpiration": {"NoncurrentDays": 1},
+                                "AbortIncompleteMultipartUpload": {
+                                    "DaysAfterInitiation": 1
+                                },
+                            },
+                            {
+                                "ID": "auto-cleanup-drain-delete-markers",
+                                "Filter": {"Prefix": ""},
+                                "Status": "Enabled",
+                                "Expiration": {"ExpiredObjectDeleteMarker": True},
+                            },
+                        ]
+                    },
+                )
+        except:
+            self.logging.error(
+                f"Could not set the lifecycle configuration of S3 Bucket '{resource_id}', "
+                "it will be emptied instead."
+            )
+            self.logging.error(sys.exc_info()[1])
+            return False
+
+        Teardown.set_state(
+            self.region,
+            "S3",
+            "Bucket",
+            resource_id,
+            Teardown.CHILDREN_DELETING,
+            {**details, "draining": True},
+        )
+
+        self.logging.info(
+            f"S3 Bucket '{resource_id}' holds {resource_objects:.0f} Objects "
+            f"({(resource_bytes or 0) / 1024 ** 3:.1f} GiB) and has been set to expire all of them. "
+            "It will be deleted by a later run once it has drained."
+        )
+        return True
+
+    def empty_bucket(self, resource_id):
+        """
+        Deletes all Objects, Versions and Delete Markers from a Bucket. The
+        number of Objects deleted across runs is kept within the teardown
+        state, returns True once the Bucket is empty.
+        """
+        details = Teardown.get_details(self.region, "S3", "Bucket", resource_id)
+        Teardown.set_state(
+            self.region,
+            "S3",
+            "Bucket",
+            resource_id,
+            Teardown.CHILDREN_DELETING,
+            details,
+        )
+
+        emptier = S3Emptier(self.get_bucket_client_s3(resource_id), resource_id)
+        is_empty = emptier.empty()
+
+        details = {**details, "deleted": details.get("deleted", 0) + emptier.deleted}
+        Teardown.set_state(
+            self.region,
+            "S3",
+            "Bucket",
+            resource_id,
+            Teardown.READY if is_empty else Teardown.CHILDREN_DELETING,
+            details,
+        )
+
+        if is_empty:
+            self.logging.debug(
+                f"""Deleted all {details.get("deleted")} Objects, Versions and Delete Markers """
+                f"from S3 Bucket '{resource_id}'."
+            )
+
+        return is_empty
+
     def delete_bucket(
         self, semaphore, resource, resource_allowlist, resource_maximum_age
     ):
@@ -102,7 +350,9 @@ class S3Cleanup:
                 # delete bucket policy
                 try:
                     if not self.is_dry_run:
-                        self.client_s3.delete_bucket_policy(Bucket=resource_id)
+                        self.get_bucket_client_s3(resource_id).delete_bucket_policy(
+                            Bucket=resource_id
+                        )
                 except:
                     self.logging.error(
                         f"Could not delete Bucket Policy for S3 Bucket '{resource_id}'."
@@ -114,54 +364,42 @@ class S3Cleanup:
                         f"Deleted Bucket Policy for S3 Bucket '{resource_id}'."
                     )
 
-                    bucket_resource = self.resource_s3.Bucket(resource_id)
-
-                    # delete all objects
-                    try:
-                        if not self.is_dry_run:
-                            bucket_resource.objects.delete()
-                    except:
-                        self.logging.error(
-                            f"Could not delete all Objects from S3 Bucket '{resource_id}'."
+                    # leave Buckets too large to empty within a run to S3
+                    if self.drain_bucket(resource_id):
+                        resource_action = "SKIP - DRAINING"
+                    # delete all Objects, Versions and Delete Markers
+                    elif not self.is_dry_run and not self.empty_bucket(resource_id):
+                        self.logging.info(
+                            f"S3 Bucket '{resource_id}' could not be emptied within this run "
+                            "and will be emptied further by the next run."
                         )
-                        self.logging.error(sys.exc_info()[1])
-                        resource_action = "ERROR"
+                        resource_action = "SKIP - EMPTYING"
                     else:
-                        self.logging.debug(
-                            f"Deleted all Objects from S3 Bucket '{resource_id}'."
-                        )
-
-                        # delete all Versions and DeleteMarkers
+                        # delete bucket
                         try:
                             if not self.is_dry_run:
-                                bucket_resource.object_versions.delete()
+                                self.get_bucket_client_s3(resource_id).delete_bucket(
+                                    Bucket=resource_id
+                                )
                         except:
                             self.logging.error(
-                                f"Could not get all Versions and Delete Markers from S3 Bucket '{resource_id}'."
+                                f"Could not delete S3 Bucket '{resource_id}'."
                             )
                             self.logging.error(sys.exc_info()[1])
                             resource_action = "ERROR"
                         else:
-                            self.logging.debug(
-                                f"Deleted all Versions and Delete Markers from S3 Bucket '{resource_id}'."
+                            Teardown.set_state(
+                                self.region,
+                                "S3",
+                                "Bucket",
+                                resource_id,
+                                Teardown.DELETED,
                             )
-
-                            # delete bucket
-                            try:
-                                if not self.is_dry_run:
-                                    self.client_s3.delete_bucket(Bucket=resource_id)
-                            except:
-                                self.logging.error(
-                                    f"Could not delete S3 Bucket '{resource_id}'."
-                                )
-                                self.logging.error(sys.exc_info()[1])
-                                resource_action = "ERROR"
-                            else:
-                                self.logging.info(
-                                    f"S3 Bucket '{resource_id}' was created {resource_age} days ago "
-                                    "and has been deleted."
-                                )
-                                resource_action = "DELETE"
+                            self.logging.info(
+                                f"S3 Bucket '{resource_id}' was created {resource_age} days ago "
+                                "and has been deleted."
+                            )
+                            resource_action = "DELETE"
             else:
                 self.logging.debug(
                     f"S3 Bucket '{resource_id}' was created {resource_age} days ago "
@@ -0,0 +1,169 @@
+import concurrent.futures
+import queue
+import sys
+import threading
+import time
+
+from src.helper import Helper
+
+
+class S3Emptier:
+    """
+    Empties S3 Buckets ahead of their deletion. A producer lists the
+    Bucket's Object Versions and Delete Markers (which includes the Objects
+    of unversioned Buckets) and splits the listing by top level prefix so
+    that each prefix is listed in parallel. Every listed page is handed as a
+    batch of up to 1,000 keys to a pool of workers calling DeleteObjects
+    concurrently.
+
+    Emptying stops once the run's deadline has passed. As deleted keys are
+    no longer listed, the next run resumes with the keys that are left.
+    """
+
+    _logging = None
+    _workers = 10
+    _deadline = None
+
+    @classmethod
+    def setup(cls, logging, settings):
+        cls._logging = logging
+        cls._workers = Helper.get_setting(settings, "general.emptier.workers", 10)
+        cls._deadline = time.monotonic() + Helper.get_setting(
+            settings, "general.emptier.timeout", 720
+        )
+
+    def __init__(self, client_s3, bucket):
+        self.client_s3 = client_s3
+        self.bucket = bucket
+
+        self.deleted = 0
+        self.errors = 0
+        self.is_complete = True
+
+        self._batches = queue.Queue(maxsize=self._workers * 2)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def empty(self):
+        """Deletes every key within the Bucket, returns True once the Bucket is empty."""
+        started = time.monotonic()
+
+        listers = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._workers,
+            thread_name_prefix="auto-cleanup-s3-list",
+        )
+        deleters = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._workers,
+            thread_name_prefix="auto-cleanup-s3-delete",
+        )
+
+        for _ in range(self._workers):
+            deleters.submit(self.delete)
+
+        # keys at the top level are listed here, each top level prefix by its own lister
+        prefixes = []
+        self.list(listers, prefixes)
+        concurrent.futures.wait(prefixes)
+        listers.shutdown(wait=True)
+
+        for _ in range(self._workers):
+            self._batches.put(None)
+
+        deleters.shutdown(wait=True)
+
+        duration = max(time.monotonic() - started, 0.001)
+        self._logging.info(
+            f"Deleted {self.deleted} Objects from S3 Bucket '{self.bucket}' in {duration:.0f} seconds "
+            f"({self.deleted / duration:.0f} Objects/second)."
+        )
+
+        return self.is_complete and self.errors == 0
+
+    def list(self, listers, prefixes, prefix=None):
+        """Lists a prefix' keys page by page and queues each page for deletion."""
+        try:
+            paginator = self.client_s3.get_paginator("list_object_versions")
+
+            if prefix is None:
+                pages = paginator.paginate(Bucket=self.bucket, Delimiter="/")
+            else:
+                pages = paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+
+            for page in pages:
+                for common_prefix in page.get("CommonPrefixes", []):
+                    prefixes.append(
+                        listers.submit(
+                            self.list, listers, prefixes, common_prefix.get("Prefix")
+                        )
+                    )
+
+                batch = [
+                    {"Key": version.get("Key"), "VersionId": version.get("VersionId")}
+                    for version in page.get("Versions", [])
+                    + page.get("DeleteMarkers", [])
+                ]
+
+                if batch and not self.put(batch):
+                    return
+        except:
+            self._logging.error(
+                f"Could not list all Objects from S3 Bucket '{self.bucket}'."
+            )
+            self._logging.error(sys.exc_info()[1])
+            self.stop(None)
+
+    def put(self, batch):
+        """Queues a batch unless emptying has stopped, returns False once it has."""
+        while not self._stopped.is_set():
+            if time.monotonic() > self._deadline:
+                self.stop(
+                    f"S3 Bucket '{self.bucket}' could not be emptied in time, "
+                    "it will be emptied further by the next run."
+                )
+                break
+
+            try:
+                self._batches.put(batch, timeout=1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def stop(self, message):
+        """Stops listing further keys, the message is logged once."""
+        with self._lock:
+            is_stopping = self.is_complete
+            self.is_complete = False
+            self._stopped.set()
+
+        if is_stopping and message is not None:
+            self._logging.info(message)
+
+    def delete(self):
+        while True:
+            batch = self._batches.get()
+
+            if batch is None:
+                return
+
+            try:
+                errors = self.client_s3.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True}
+                ).get("Errors", [])
+            except:
+                self._logging.error(
+                    f"Could not delete {len(batch)} Objects from S3 Bucket '{self.bucket}'."
+                )
+                self._logging.error(sys.exc_info()[1])
+                errors = batch
+            else:
+                for error in errors[:1]:
+                    self._logging.error(
+                        f"""Could not delete Object '{error.get("Key")}' from S3 Bucket '{self.bucket}'. """
+                        f"""{error.get("Code")}: {error.get("Message")}"""
+                    )
+
+            with self._lock:
+                self.deleted += len(batch) - len(errors)
+                self.errors += len(errors)
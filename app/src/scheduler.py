@@ -0,0 +1,441 @@
+import datetime
+import logging
+import os
+import sys
+from collections import defaultdict
+
+import boto3
+import botocore
+import jmespath
+from dynamodb_json import json_util as dynamodb_json
+from func_timeout import func_set_timeout, FunctionTimedOut
+
+from src.circuit_breaker import CircuitBreaker
+from src.cloudformation_cleanup import CloudFormationCleanup
+from src.cloudwatch_cleanup import CloudWatchCleanup
+from src.dynamodb_cleanup import DynamoDBCleanup
+from src.ec2_cleanup import EC2Cleanup
+from src.ecr_cleanup import ECRCleanup
+from src.eks_cleanup import EKSCleanup
+from src.helper import Helper
+from src.kinesis_cleanup import KinesisCleanup
+from src.lambda_cleanup import LambdaCleanup
+from src.main import Cleanup, setup_logging
+from src.s3_cleanup import S3Cleanup
+from src.waiter import Waiter
+
+
+class Scheduler:
+    """
+    Records the expected expiry of newly created resources from CloudTrail
+    resource creation events and dispatches the matching cleanup once a
+    resource is due, instead of waiting for the next full run.
+    """
+
+    # (CloudTrail event source, event name): (service, resource, JMESPath to the resource ID(s))
+    events = {
+        ("cloudformation.amazonaws.com", "CreateStack"): (
+            "cloudformation",
+            "stack",
+            "requestParameters.stackName",
+        ),
+        ("dynamodb.amazonaws.com", "CreateTable"): (
+            "dynamodb",
+            "table",
+            "requestParameters.tableName",
+        ),
+        ("ec2.amazonaws.com", "CreateSnapshot"): (
+            "ec2",
+            "snapshot",
+            "responseElements.snapshotId",
+        ),
+        ("ec2.amazonaws.com", "CreateVolume"): (
+            "ec2",
+            "volume",
+            "responseElements.volumeId",
+        ),
+        ("ec2.amazonaws.com", "RunInstances"): (
+            "ec2",
+            "instance",
+            "responseElements.instancesSet.items[].instanceId",
+        ),
+        ("ecr.amazonaws.com", "CreateRepository"): (
+            "ecr",
+            "repository",
+            "responseElements.repository.repositoryName",
+        ),
+        ("eks.amazonaws.com", "CreateCluster"): (
+            "eks",
+            "cluster",
+            "requestParameters.name",
+        ),
+        ("kinesis.amazonaws.com", "CreateStream"): (
+            "kinesis",
+            "stream",
+            "requestParameters.streamName",
+        ),
+        ("lambda.amazonaws.com", "CreateFunction20150331"): (
+            "lambda",
+            "function",
+            "requestParameters.functionName",
+        ),
+        ("logs.amazonaws.com", "CreateLogGroup"): (
+            "cloudwatch",
+            "log_group",
+            "requestParameters.logGroupName",
+        ),
+        ("s3.amazonaws.com", "CreateBucket"): (
+            "s3",
+            "bucket",
+            "requestParameters.bucketName",
+        ),
+    }
+
+    # (service, resource): (cleanup class, cleanup method, execution log service, execution log resource)
+    cleanups = {
+        ("cloudformation", "stack"): (
+            CloudFormationCleanup,
+            "stacks",
+            "CloudFormation",
+            "Stack",
+        ),
+        ("cloudwatch", "log_group"): (
+            CloudWatchCleanup,
+            "log_groups",
+            "CloudWatch",
+            "Log Group",
+        ),
+        ("dynamodb", "table"): (DynamoDBCleanup, "tables", "DynamoDB", "Table"),
+        ("ec2", "instance"): (EC2Cleanup, "instances", "EC2", "Instance"),
+        ("ec2", "snapshot"): (EC2Cleanup, "snapshots", "EC2", "Snapshot"),
+        ("ec2", "volume"): (EC2Cleanup, "volumes", "EC2", "Volume"),
+        ("ecr", "repository"): (ECRCleanup, "repositories", "ECR", "Repository"),
+        ("eks", "cluster"): (EKSCleanup, "clusters", "EKS", "Cluster"),
+        ("kinesis", "stream"): (KinesisCleanup, "streams", "Kinesis", "Stream"),
+        ("lambda", "function"): (LambdaCleanup, "functions", "Lambda", "Function"),
+        ("s3", "bucket"): (S3Cleanup, "buckets", "S3", "Bucket"),
+    }
+
+    # resource actions after which a scheduled resource no longer needs to be checked
+    handled_actions = ("DELETE", "SKIP - ALLOWLIST", "SKIP - STACK")
+
+    # resources that are not regional
+    global_services = ("s3",)
+
+    def __init__(self, logging):
+        self.logging = logging
+
+        self._client_dynamodb = None
+        self.table = os.environ.get("SCHEDULE_TABLE")
+
+    @property
+    def client_dynamodb(self):
+        if not self._client_dynamodb:
+            self._client_dynamodb = CircuitBreaker.exempt(boto3.client("dynamodb"))
+        return self._client_dynamodb
+
+    def get_services_settings(self):
+        """Reads the services settings which hold each resource's TTL."""
+        try:
+            item = self.client_dynamodb.get_item(
+                TableName=os.environ.get("SETTINGS_TABLE"),
+                Key={"key": {"S": "services"}},
+            ).get("Item")
+        except:
+            self.logging.error(
+                f"""Could not read DynamoDB table '{os.environ.get("SETTINGS_TABLE")}'."""
+            )
+            self.logging.error(sys.exc_info()[1])
+            return None
+
+        if item is None:
+            return {}
+
+        return {"services": dynamodb_json.loads(item, True).get("value")}
+
+    def schedule(self, event):
+        """Records the expected expiry of the resources created by a CloudTrail event."""
+        detail = event.get("detail", {})
+        event_name = detail.get("eventName")
+        event_key = (detail.get("eventSource"), event_name)
+
+        if event_key not in self.events or detail.get("errorCode") is not None:
+            self.logging.debug(
+                f"""Ignoring CloudTrail event '{event_name}' from '{detail.get("eventSource")}'."""
+            )
+            return False
+
+        service, resource, path = self.events.get(event_key)
+        resource_ids = jmespath.search(path, detail)
+
+        if resource_ids is None:
+            self.logging.warning(
+                f"Could not find a resource ID in CloudTrail event '{event_name}'."
+            )
+            return False
+        elif not isinstance(resource_ids, list):
+            resource_ids = [resource_ids]
+
+        settings = self.get_services_settings()
+
+        if settings is None:
+            return False
+
+        resource_maximum_age = Helper.get_setting(
+            settings, f"services.{service}.{resource}.ttl"
+        )
+
+        if resource_maximum_age is None:
+            self.logging.debug(
+                f"Resource '{service}:{resource}' does not have a TTL and will not be scheduled."
+            )
+            return False
+
+        # resources are deleted once their age in days exceeds the TTL
+        resource_due = Helper.convert_to_datetime(
+            detail.get("eventTime")
+        ) + datetime.timedelta(days=int(resource_maximum_age) + 1)
+        resource_region = (
+            "global" if service in self.global_services else detail.get("awsRegion")
+        )
+
+        for resource_id in resource_ids:
+            try:
+                self.client_dynamodb.put_item(
+                    TableName=self.table,
+                    Item={
+                        "resource_id": {"S": f"{service}:{resource}:{resource_id}"},
+                        "region": {"S": resource_region},
+                        "due": {"N": str(int(resource_due.timestamp()))},
+                    },
+                )
+            except:
+                self.logging.error(
+                    f"Could not schedule '{service}:{resource}:{resource_id}' in region '{resource_region}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+            else:
+                self.logging.info(
+                    f"Scheduled '{service}:{resource}:{resource_id}' in region '{resource_region}' "
+                    f"""for {resource_due.strftime("%Y-%m-%d %H:%M:%S")}."""
+                )
+
+        return True
+
+    def get_due_resources(self):
+        """Returns all scheduled resources that have reached their expected expiry."""
+        try:
+            paginator = self.client_dynamodb.get_paginator("scan")
+            items = (
+                paginator.paginate(
+                    TableName=self.table,
+                    FilterExpression="#due <= :now",
+                    ExpressionAttributeNames={"#due": "due"},
+                    ExpressionAttributeValues={
+                        ":now": {"N": str(int(datetime.datetime.now().timestamp()))}
+                    },
+                )
+                .build_full_result()
+                .get("Items")
+            )
+        except:
+            self.logging.error(f"Could not read DynamoDB table '{self.table}'.")
+            self.logging.error(sys.exc_info()[1])
+            return []
+
+        return [dynamodb_json.loads(item, True) for item in items]
+
+    @func_set_timeout(840)
+    def dispatch(self, cleanup):
+        """
+        Rechecks every due resource with its cleanup, limited to the due
+        resources themselves. Due resources that belong to a CloudFormation
+        Stack are allowlisted as they are cleaned up along with their Stack.
+
+        A resource is removed from the schedule once it has been deleted,
+        allowlisted or no longer exists. Resources in skipped regions, or
+        that could not be checked or deleted, are rechecked by the next
+        dispatch. The schedule is left unchanged in DRY RUN mode.
+        """
+        due_resources = defaultdict(lambda: defaultdict(list))
+
+        for item in self.get_due_resources():
+            parsed_resource_id = Helper.parse_resource_id(item.get("resource_id"))
+            due_resources[item.get("region")][
+                (parsed_resource_id["service"], parsed_resource_id["resource_type"])
+            ].append(item)
+
+        # (region, service, resource): IDs of the due resources that have been checked
+        checked_resources = {}
+
+        # global services are dispatched after all regions
+        for region in sorted(
+            due_resources, key=lambda region: (region == "global", region)
+        ):
+            if region != "global" and not Helper.get_setting(
+                cleanup.settings, f"regions.{region}.clean", False
+            ):
+                self.logging.info(f"Skipping region '{region}'.")
+                continue
+
+            self.logging.info(f"Switching to '{region}' region.")
+
+            for service, resource in sorted(due_resources.get(region)):
+                resource_ids = [
+                    Helper.parse_resource_id(item.get("resource_id"))["resource"]
+                    for item in due_resources.get(region).get((service, resource))
+                ]
+
+                if region != "global" and service != "cloudformation":
+                    resource_ids = self.allowlist_stack_resources(
+                        cleanup.allowlist, region, service, resource, resource_ids
+                    )
+
+                cleanup_class, cleanup_method, _, _ = self.cleanups.get(
+                    (service, resource)
+                )
+
+                if region == "global":
+                    cleanup_instance = cleanup_class(
+                        cleanup.logging,
+                        cleanup.allowlist,
+                        cleanup.settings,
+                        cleanup.execution_log,
+                    )
+                else:
+                    cleanup_instance = cleanup_class(
+                        cleanup.logging,
+                        cleanup.allowlist,
+                        cleanup.settings,
+                        cleanup.execution_log,
+                        region,
+                    )
+
+                if getattr(cleanup_instance, cleanup_method)(resource_ids):
+                    checked_resources[(region, service, resource)] = resource_ids
+
+        # wait for the remaining asynchronous deletions
+        Waiter.join()
+
+        # nothing is deleted in DRY RUN mode, the schedule is kept as is
+        if cleanup.dry_run:
+            return True
+
+        for (region, service, resource), resource_ids in checked_resources.items():
+            for item in due_resources.get(region).get((service, resource)):
+                resource_id = Helper.parse_resource_id(item.get("resource_id"))[
+                    "resource"
+                ]
+
+                if resource_id in resource_ids and self.is_handled(
+                    cleanup.execution_log, region, service, resource, resource_id
+                ):
+                    self.delete_item(item)
+
+        return True
+
+    def allowlist_stack_resources(
+        self, allowlist, region, service, resource, resource_ids
+    ):
+        """
+        Adds the due resources that belong to a CloudFormation Stack to the
+        allowlist, they are cleaned up along with their Stack. Returns the
+        resources whose Stack could be looked up.
+        """
+        client_cloudformation = boto3.client("cloudformation", region_name=region)
+        checked_resource_ids = []
+
+        for resource_id in resource_ids:
+            try:
+                stack_resources = client_cloudformation.describe_stack_resources(
+                    PhysicalResourceId=resource_id
+                ).get("StackResources")
+            except botocore.exceptions.ClientError as error:
+                # resources that do not belong to a Stack are rejected as invalid
+                if error.response.get("Error", {}).get("Code") == "ValidationError":
+                    checked_resource_ids.append(resource_id)
+                else:
+                    self.logging.error(
+                        f"Could not get the CloudFormation Stack of '{service}:{resource}:{resource_id}'."
+                    )
+                    self.logging.error(sys.exc_info()[1])
+                continue
+            except:
+                self.logging.error(
+                    f"Could not get the CloudFormation Stack of '{service}:{resource}:{resource_id}'."
+                )
+                self.logging.error(sys.exc_info()[1])
+                continue
+
+            if stack_resources:
+                allowlist[service][resource].add(resource_id)
+
+                self.logging.debug(
+                    f"'{service}:{resource}:{resource_id}' belongs to CloudFormation Stack "
+                    f"""'{stack_resources[0].get("StackName")}' and has been added to the allowlist."""
+                )
+
+            checked_resource_ids.append(resource_id)
+
+        return checked_resource_ids
+
+    def is_handled(self, execution_log, region, service, resource, resource_id):
+        """
+        Returns whether the checked resource has been deleted, allowlisted or
+        no longer exists, i.e., its cleanup did not record it.
+        """
+        _, _, log_service, log_resource = self.cleanups.get((service, resource))
+
+        resource_actions = [
+            action.get("action")
+            for action in execution_log.get("AWS", {})
+            .get(region, {})
+            .get(log_service, {})
+            .get(log_resource, [])
+            if action.get("id") == resource_id
+        ]
+
+        return not resource_actions or resource_actions[-1] in self.handled_actions
+
+    def delete_item(self, item):
+        try:
+            self.client_dynamodb.delete_item(
+                TableName=self.table,
+                Key={
+                    "resource_id": {"S": item.get("resource_id")},
+                    "region": {"S": item.get("region")},
+                },
+            )
+        except:
+            self.logging.error(
+                f"""Could not remove '{item.get("resource_id")}' from DynamoDB table '{self.table}'."""
+            )
+            self.logging.error(sys.exc_info()[1])
+
+
+def event_handler(event, context):
+    setup_logging()
+
+    Scheduler(logging).schedule(event)
+
+
+def dispatch_handler(event, context):
+    setup_logging()
+
+    cleanup = Cleanup(logging)
+
+    try:
+        Scheduler(logging).dispatch(cleanup)
+    except FunctionTimedOut:
+        logging.warning(
+            "Auto Cleanup dispatch has exceeded 14 minutes and has been stopped."
+        )
+
+    Waiter.expire()
+
+    CircuitBreaker.record_execution_log(cleanup.execution_log)
+
+    cleanup.export_execution_log(cleanup.execution_log, context.aws_request_id)
+
+    # the teardown state is only saved by full runs, saving it here could
+    # overwrite the progress of a full run taking place at the same time
@@ -0,0 +1,37 @@
+import threading
+
+
+class StackOwnership:
+    """
+    Process-wide index of the resources owned by CloudFormation Stacks that
+    are being deleted within this run, keyed by region, CloudFormation
+    resource type (e.g., 'AWS::Lambda::Function') and physical resource ID.
+
+    The CloudFormation cleanup fills the index from each Stack's resources
+    before deleting the Stack. Other cleanups consult it to skip resources
+    that are already being torn down by their Stack rather than deleting
+    them a second time.
+    """
+
+    _resources = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def setup(cls):
+        with cls._lock:
+            cls._resources = {}
+
+    @classmethod
+    def add(cls, region, resource_type, resource_id, stack_name):
+        with cls._lock:
+            cls._resources.setdefault(region, {}).setdefault(resource_type, {})[
+                resource_id
+            ] = stack_name
+
+    @classmethod
+    def get_stack(cls, region, resource_type, resource_id):
+        """Returns the name of the Stack being deleted that owns the resource or None."""
+        with cls._lock:
+            return (
+                cls._resources.get(region, {}).get(resource_type, {}).get(resource_id)
+            )
@@ -0,0 +1,143 @@
+import datetime
+import sys
+import threading
+
+from src.helper import Helper
+from src.inventory import Inventory
+
+
+class Teardown:
+    """
+    Teardown state of resources whose children cannot be deleted within a
+    single run (i.e., S3 Buckets and their Objects). Each resource moves
+    through the states
+
+        pending -> children-deleting -> ready -> deleted
+
+    and keeps details of its progress along with its state (e.g., the number
+    of S3 Objects deleted so far). The state is persisted between runs so
+    that a teardown that did not complete within one run resumes where it
+    left off. Resources that have been deleted, or whose teardown has not
+    progressed within the retention period, are dropped when the state is
+    saved.
+
+    Resources whose children report their own deletion status (e.g., EKS
+    Node Groups or EFS Mount Targets) are resumed from that status instead.
+    """
+
+    version = 1
+
+    PENDING = "pending"
+    CHILDREN_DELETING = "children-deleting"
+    READY = "ready"
+    DELETED = "deleted"
+
+    _resources = {}
+    _lock = threading.Lock()
+    _logging = None
+    _enabled = False
+
+    @classmethod
+    def load(cls, logging, settings):
+        """Loads the teardown state written by the previous run."""
+        cls._resources = {}
+        cls._logging = logging
+
+        # teardowns are never started in DRY RUN mode
+        cls._enabled = not Helper.get_setting(settings, "general.dry_run", True)
+
+        if not cls._enabled:
+            return False
+
+        try:
+            snapshot = Inventory.get_store(logging, settings, "teardown").read()
+        except:
+            logging.error("Could not read the teardown state.")
+            logging.error(sys.exc_info()[1])
+            return False
+
+        if snapshot.get("version") == cls.version:
+            cls._resources = snapshot.get("resources", {})
+            logging.debug("Teardown state from the previous run has been loaded.")
+
+        return True
+
+    @classmethod
+    def get_state(cls, region, service, resource, resource_id):
+        """Returns the teardown state of a resource or None if no teardown has started."""
+        with cls._lock:
+            return (
+                cls._resources.get(region, {})
+                .get(service, {})
+                .get(resource, {})
+                .get(resource_id, {})
+                .get("state")
+            )
+
+    @classmethod
+    def get_details(cls, region, service, resource, resource_id):
+        """Returns the progress details recorded along with the resource's state."""
+        with cls._lock:
+            return (
+                cls._resources.get(region, {})
+                .get(service, {})
+                .get(resource, {})
+                .get(resource_id, {})
+                .get("details", {})
+            )
+
+    @classmethod
+    def set_state(cls, region, service, resource, resource_id, state, details=None):
+        if not cls._enabled:
+            return
+
+        with cls._lock:
+            entry = {
+                "state": state,
+                "updated": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+
+            if details is not None:
+                entry["details"] = details
+
+            cls._resources.setdefault(region, {}).setdefault(service, {}).setdefault(
+                resource, {}
+            )[resource_id] = entry
+
+        cls._logging.debug(
+            f"{service} {resource} '{resource_id}' teardown is now '{state}'."
+        )
+
+    @classmethod
+    def save(cls, logging, settings):
+        """Persists the teardowns that are still in progress."""
+        if not cls._enabled:
+            return False
+
+        retention = Helper.get_setting(settings, "general.teardown.retention", 7)
+        resources = {}
+
+        with cls._lock:
+            for region, region_dict in cls._resources.items():
+                for service, service_dict in region_dict.items():
+                    for resource, resource_dict in service_dict.items():
+                        for resource_id, entry in resource_dict.items():
+                            if (
+                                entry.get("state") != cls.DELETED
+                                and Helper.get_day_delta(entry.get("updated")).days
+                                <= retention
+                            ):
+                                resources.setdefault(region, {}).setdefault(
+                                    service, {}
+                                ).setdefault(resource, {})[resource_id] = entry
+
+        try:
+            Inventory.get_store(logging, settings, "teardown").write(
+                {"version": cls.version, "resources": resources}
+            )
+        except:
+            logging.error("Could not write the teardown state.")
+            logging.error(sys.exc_info()[1])
+            return False
+
+        return True
@@ -0,0 +1,138 @@
+import concurrent.futures
+import sys
+import threading
+import time
+
+from src.helper import Helper
+
+
+class Waiter:
+    """
+    Process-wide, non-blocking waiter for deletions that complete
+    asynchronously on AWS's side. Cleanup classes register the resources
+    they are waiting on along with a poll method and a callback that takes
+    the dependent step (e.g., deleting an EKS Cluster once its Node Groups
+    are gone) and receive a future of the resulting resource action.
+
+    A single background thread polls all pending resources at a fixed
+    interval. Resources sharing a poll method are polled together in one
+    batch so that poll methods can use a single listing or multi-ID describe
+    call. Resources still pending when the run ends are resolved with their
+    expired action and are left for the next run.
+    """
+
+    _pending = {}
+    _lock = threading.Lock()
+    _logging = None
+    _thread = None
+    _interval = 10
+    _deadline = None
+
+    @classmethod
+    def setup(cls, logging, settings):
+        with cls._lock:
+            cls._pending = {}
+            cls._logging = logging
+            cls._thread = None
+            cls._interval = Helper.get_setting(settings, "general.waiter.interval", 10)
+            cls._deadline = time.monotonic() + Helper.get_setting(
+                settings, "general.waiter.timeout", 780
+            )
+
+    @classmethod
+    def wait(cls, poll, resource_id, callback, expired_action):
+        """
+        Waits for the resource to be reported as ready by the poll method,
+        which receives every pending resource ID registered with it and
+        returns those that are ready. The callback's resource action, or the
+        expired action if the resource is not ready in time, is set on the
+        returned future.
+        """
+        future = concurrent.futures.Future()
+
+        with cls._lock:
+            cls._pending.setdefault(poll, {})[resource_id] = (
+                callback,
+                expired_action,
+                future,
+            )
+
+            if cls._thread is None:
+                cls._thread = threading.Thread(target=cls.run, daemon=True)
+                cls._thread.start()
+
+        return future
+
+    @classmethod
+    def run(cls):
+        while True:
+            time.sleep(cls._interval)
+
+            with cls._lock:
+                if not cls._pending or time.monotonic() > cls._deadline:
+                    cls._thread = None
+                    return
+
+                pending = {poll: dict(items) for poll, items in cls._pending.items()}
+
+            for poll, items in pending.items():
+                try:
+                    ready = set(poll(list(items)))
+                except:
+                    cls._logging.error("Could not poll pending deletions.")
+                    cls._logging.error(sys.exc_info()[1])
+                    continue
+
+                for resource_id in ready.intersection(items):
+                    with cls._lock:
+                        item = cls._pending.get(poll, {}).pop(resource_id, None)
+
+                        if poll in cls._pending and not cls._pending.get(poll):
+                            cls._pending.pop(poll)
+
+                    # the deletion has expired in the meantime
+                    if item is None:
+                        continue
+
+                    callback, _, future = item
+
+                    try:
+                        future.set_result(callback())
+                    except:
+                        cls._logging.error(
+                            f"Could not complete the deletion of '{resource_id}'."
+                        )
+                        cls._logging.error(sys.exc_info()[1])
+                        future.set_result("ERROR")
+
+    @classmethod
+    def join(cls):
+        """Blocks until all pending deletions have completed or the deadline has passed."""
+        thread = cls._thread
+
+        if thread is not None:
+            thread.join(max(0, cls._deadline - time.monotonic()) + cls._interval)
+
+        cls.expire()
+
+    @classmethod
+    def expire(cls):
+        """
+        Resolves every deletion that is still pending with its expired action.
+        Any other execution log action that has not been resolved by the end
+        of the run, e.g., one cut short by the run's timeout, is recorded as
+        an ERROR.
+        """
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+
+        for items in pending.values():
+            for resource_id, (_, expired_action, future) in items.items():
+                cls._logging.info(
+                    f"Stopped waiting for '{resource_id}', it will be rechecked by the next run."
+                )
+
+                if not future.done():
+                    future.set_result(expired_action)
+
+        Helper.expire_execution_log_actions("ERROR")
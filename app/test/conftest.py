@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from botocore.awsrequest import AWSResponse
+
+
+@pytest.fixture(autouse=True)
+def aws_credentials(monkeypatch):
+    """Mocked AWS Credentials so that no call can reach a real account."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_SECURITY_TOKEN", "testing")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+
+
+class RawResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+@pytest.fixture
+def http_responses():
+    """
+    Answers a JSON protocol client's requests with the given HTTP responses.
+    Unlike botocore's Stubber, which answers on 'before-call', the responses
+    go through botocore's retry handling and its 'needs-retry' event.
+    """
+
+    def stub(client, responses):
+        responses = list(responses)
+
+        def before_send(request, **kwargs):
+            status_code, body = responses.pop(0)
+            return AWSResponse(
+                request.url,
+                status_code,
+                {"Content-Type": "application/x-amz-json-1.1"},
+                RawResponse(json.dumps(body).encode("utf-8")),
+            )
+
+        client.meta.events.register("before-send", before_send)
+        return responses
+
+    return stub
@@ -0,0 +1,100 @@
+import logging
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from src.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class TestCircuitBreaker:
+    def setup_method(self):
+        CircuitBreaker.setup(
+            logging, {"general": {"circuit_breaker": {"threshold": 2}}}
+        )
+
+    def get_client(self):
+        client = boto3.client("ec2")
+        stubber = Stubber(client)
+        stubber.activate()
+        return client, stubber
+
+    def test_open(self):
+        client, stubber = self.get_client()
+
+        for _ in range(2):
+            stubber.add_client_error(
+                "describe_volumes", "ServiceUnavailable", http_status_code=503
+            )
+            with pytest.raises(client.exceptions.ClientError):
+                client.describe_volumes()
+
+        # the stubber answers before the circuit breaker is consulted
+        stubber.deactivate()
+
+        with pytest.raises(CircuitOpenError):
+            client.describe_volumes()
+
+        circuit = CircuitBreaker.get_circuit("EC2", "ap-southeast-2")
+        assert circuit.is_open
+        assert circuit.skipped == 1
+
+    def test_success_resets(self):
+        client, stubber = self.get_client()
+
+        stubber.add_client_error(
+            "describe_volumes", "ServiceUnavailable", http_status_code=503
+        )
+        stubber.add_response("describe_volumes", {"Volumes": []})
+        stubber.add_client_error(
+            "describe_volumes", "ServiceUnavailable", http_status_code=503
+        )
+
+        for _ in range(3):
+            try:
+                client.describe_volumes()
+            except client.exceptions.ClientError:
+                pass
+
+        circuit = CircuitBreaker.get_circuit("EC2", "ap-southeast-2")
+        assert not circuit.is_open
+        assert circuit.errors == 1
+
+    def test_resource_errors(self):
+        client, stubber = self.get_client()
+
+        for error_code in ("DependencyViolation", "UnauthorizedOperation"):
+            for _ in range(2):
+                stubber.add_client_error("delete_volume", error_code)
+                with pytest.raises(client.exceptions.ClientError):
+                    client.delete_volume(VolumeId="vol-0123456789abcdef0")
+
+        assert not CircuitBreaker.get_circuit("EC2", "ap-southeast-2").is_open
+
+    def test_exempt(self):
+        client, stubber = self.get_client()
+        CircuitBreaker.exempt(client)
+
+        for _ in range(3):
+            stubber.add_client_error(
+                "describe_volumes", "ServiceUnavailable", http_status_code=503
+            )
+            with pytest.raises(client.exceptions.ClientError):
+                client.describe_volumes()
+
+        assert CircuitBreaker._circuits == {}
+
+    def test_exempt_other_clients(self):
+        exempt_client, _ = self.get_client()
+        CircuitBreaker.exempt(exempt_client)
+
+        # exempting a client leaves the circuit breaker on every other client
+        client, stubber = self.get_client()
+        for _ in range(2):
+            stubber.add_client_error(
+                "describe_volumes", "ServiceUnavailable", http_status_code=503
+            )
+            with pytest.raises(client.exceptions.ClientError):
+                client.describe_volumes()
+
+        assert CircuitBreaker.get_circuit("EC2", "ap-southeast-2").is_open
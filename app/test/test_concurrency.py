@@ -0,0 +1,86 @@
+import boto3
+from botocore.config import Config
+
+from src.concurrency import Concurrency, ConcurrencyController
+
+THROTTLED = (400, {"__type": "ThrottlingException", "message": "Rate exceeded"})
+SUCCEEDED = (200, {"logGroups": []})
+
+
+class TestConcurrencyController:
+    def test_decrease(self):
+        controller = ConcurrencyController("test", 8, cooldown=60)
+
+        controller.record_throttle()
+        assert controller.limit == 4
+
+        # throttles within the cooldown only cut the limit once
+        controller.record_throttle()
+        assert controller.limit == 4
+        assert controller.throttles == 2
+
+    def test_minimum(self):
+        controller = ConcurrencyController("test", 2, minimum=2, cooldown=0)
+
+        controller.record_throttle()
+        assert controller.limit == 2
+
+    def test_increase(self):
+        controller = ConcurrencyController("test", 2, maximum=3)
+
+        for _ in range(2):
+            controller.record_success()
+        assert controller.limit == 3
+
+        # the limit never exceeds the maximum
+        for _ in range(3):
+            controller.record_success()
+        assert controller.limit == 3
+        assert controller.peak == 3
+
+
+class TestConcurrency:
+    def setup_method(self):
+        Concurrency.setup(
+            {"general": {"concurrency": {"logs": {"initial": 8, "maximum": 8}}}}
+        )
+        self.controller = Concurrency.get("logs")
+        self.client = boto3.client(
+            "logs", config=Config(retries={"total_max_attempts": 1})
+        )
+
+    def test_throttled(self, http_responses):
+        http_responses(self.client, [THROTTLED])
+
+        try:
+            self.client.describe_log_groups()
+        except self.client.exceptions.ClientError:
+            pass
+
+        assert self.controller.limit == 4
+        assert self.controller.throttles == 1
+
+    def test_not_throttled(self, http_responses):
+        http_responses(
+            self.client,
+            [(400, {"__type": "ResourceNotFoundException", "message": "Not found"})],
+        )
+
+        try:
+            self.client.describe_log_groups()
+        except self.client.exceptions.ResourceNotFoundException:
+            pass
+
+        assert self.controller.limit == 8
+        assert self.controller.throttles == 0
+
+    def test_retried(self, http_responses):
+        client = boto3.client("logs", config=Config(retries={"total_max_attempts": 2}))
+        responses = http_responses(client, [THROTTLED, SUCCEEDED])
+
+        client.describe_log_groups()
+
+        # botocore's retry is reported to the controller as well
+        assert responses == []
+        assert self.controller.throttles == 1
+        assert self.controller.successes == 1
@@ -0,0 +1,89 @@
+import datetime
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from src.iam_credential_report import IAMCredentialReport
+
+CONTENT = "\n".join(
+    [
+        "user,access_key_1_last_rotated,access_key_1_last_used_date,"
+        "access_key_2_last_rotated,access_key_2_last_used_date",
+        "alice,2021-01-01T00:00:00+00:00,2021-02-01T00:00:00+00:00,"
+        "2021-03-01T00:00:00+00:00,N/A",
+        "bob,N/A,N/A,2021-01-01T00:00:00+00:00,2021-04-01T00:00:00+00:00",
+    ]
+).encode("utf-8")
+
+
+class TestIAMCredentialReport:
+    def setup_method(self):
+        self.client = boto3.client("iam")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.credential_report = IAMCredentialReport(self.client)
+
+    def teardown_method(self):
+        self.stubber.deactivate()
+
+    def add_report(self):
+        self.stubber.add_response("generate_credential_report", {"State": "STARTED"})
+        self.stubber.add_response("generate_credential_report", {"State": "COMPLETE"})
+        self.stubber.add_response(
+            "get_credential_report",
+            {"Content": CONTENT, "ReportFormat": "text/csv"},
+        )
+
+    def test_slots(self):
+        self.add_report()
+
+        # Access Keys are matched to their slot by their creation date
+        assert self.credential_report.get_access_key_last_used(
+            "alice", datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+        ) == datetime.datetime(2021, 2, 1)
+        # the second Access Key has never been used, fractions of a second are ignored
+        assert (
+            self.credential_report.get_access_key_last_used(
+                "alice",
+                datetime.datetime(2021, 3, 1, 0, 0, 0, 500000, datetime.timezone.utc),
+            )
+            is None
+        )
+        assert self.credential_report.get_access_key_last_used(
+            "bob", datetime.datetime(2021, 1, 1)
+        ) == datetime.datetime(2021, 4, 1)
+
+        # the report is only generated and downloaded once
+        self.stubber.assert_no_pending_responses()
+
+    def test_not_in_report(self):
+        self.add_report()
+
+        # Access Keys created since the report was generated
+        assert (
+            self.credential_report.get_access_key_last_used(
+                "alice", datetime.datetime(2021, 5, 1)
+            )
+            is None
+        )
+        assert (
+            self.credential_report.get_access_key_last_used(
+                "carol", datetime.datetime(2021, 1, 1)
+            )
+            is None
+        )
+
+    def test_error(self):
+        self.stubber.add_client_error(
+            "generate_credential_report", "LimitExceeded", http_status_code=409
+        )
+
+        for _ in range(2):
+            with pytest.raises(self.client.exceptions.LimitExceededException):
+                self.credential_report.get_access_key_last_used(
+                    "alice", datetime.datetime(2021, 1, 1)
+                )
+
+        # a failed report is not generated again within the same run
+        self.stubber.assert_no_pending_responses()
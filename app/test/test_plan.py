@@ -0,0 +1,155 @@
+import datetime
+import io
+import json
+import logging
+from collections import defaultdict
+
+import boto3
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+
+from src.plan import Plan
+
+REGION = "ap-southeast-2"
+CREATED = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def get_execution_log():
+    return defaultdict(
+        lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    )
+
+
+class TestPlan:
+    def setup_method(self):
+        self.client_s3 = boto3.client("s3")
+        self.client_ec2 = boto3.client("ec2", region_name=REGION)
+        self.stubber_s3 = Stubber(self.client_s3)
+        self.stubber_ec2 = Stubber(self.client_ec2)
+        self.stubber_s3.activate()
+        self.stubber_ec2.activate()
+
+    def teardown_method(self):
+        self.stubber_s3.deactivate()
+        self.stubber_ec2.deactivate()
+
+    def get_plan(self, execution_log, allowlist=None):
+        plan = Plan(logging, allowlist or {}, execution_log)
+        plan.bucket = "state"
+        plan._client_s3 = self.client_s3
+        plan._clients[("ec2", REGION)] = self.client_ec2
+        return plan
+
+    def write(self):
+        """Writes a plan of two EC2 Volumes and returns its body."""
+        execution_log = get_execution_log()
+        for resource_id in ("vol-00000000000000001", "vol-00000000000000002"):
+            execution_log["AWS"][REGION]["EC2"]["Volume"].append(
+                {
+                    "id": resource_id,
+                    "action": "DELETE",
+                    "timestamp": "2021-01-04 00:00:00",
+                    "date": "2021-01-01 00:00:00",
+                }
+            )
+
+        bodies = []
+        self.client_s3.meta.events.register(
+            "provide-client-params.s3.PutObject",
+            lambda params, **kwargs: bodies.append(params.get("Body")),
+        )
+        self.stubber_s3.add_response(
+            "put_object", {}, {"Bucket": "state", "Key": ANY, "Body": ANY}
+        )
+
+        assert self.get_plan(execution_log).write().startswith("plans/plan_")
+        return bodies[0]
+
+    def read(self, body):
+        self.stubber_s3.add_response(
+            "get_object",
+            {"Body": StreamingBody(io.BytesIO(body), len(body))},
+            {"Bucket": "state", "Key": "plans/plan.json"},
+        )
+
+    def describe_volume(self, resource_id, create_time, attachments=None):
+        self.stubber_ec2.add_response(
+            "describe_volumes",
+            {
+                "Volumes": [
+                    {
+                        "VolumeId": resource_id,
+                        "CreateTime": create_time,
+                        "Attachments": attachments or [],
+                    }
+                ]
+            },
+            {"VolumeIds": [resource_id]},
+        )
+
+    def test_round_trip(self):
+        self.read(self.write())
+        self.describe_volume("vol-00000000000000001", CREATED)
+        self.stubber_ec2.add_response(
+            "delete_volume", {}, {"VolumeId": "vol-00000000000000001"}
+        )
+        # recreated since the plan was written
+        self.describe_volume(
+            "vol-00000000000000002", CREATED + datetime.timedelta(days=1)
+        )
+
+        execution_log = get_execution_log()
+        assert self.get_plan(execution_log).apply("plans/plan.json")
+
+        actions = execution_log["AWS"][REGION]["EC2"]["Volume"]
+        assert [(action["id"], action["action"]) for action in actions] == [
+            ("vol-00000000000000001", "DELETE"),
+            ("vol-00000000000000002", "SKIP - PLAN OUTDATED"),
+        ]
+        self.stubber_s3.assert_no_pending_responses()
+        self.stubber_ec2.assert_no_pending_responses()
+
+    def test_attached(self):
+        self.read(self.write())
+        for resource_id in ("vol-00000000000000001", "vol-00000000000000002"):
+            self.describe_volume(
+                resource_id,
+                CREATED,
+                [{"InstanceId": "i-00000000000000001", "State": "attached"}],
+            )
+
+        execution_log = get_execution_log()
+        assert self.get_plan(execution_log).apply("plans/plan.json")
+
+        actions = execution_log["AWS"][REGION]["EC2"]["Volume"]
+        assert {action["action"] for action in actions} == {"SKIP - PLAN OUTDATED"}
+        self.stubber_ec2.assert_no_pending_responses()
+
+    def test_allowlisted(self):
+        self.read(self.write())
+        self.describe_volume("vol-00000000000000002", CREATED)
+        self.stubber_ec2.add_response(
+            "delete_volume", {}, {"VolumeId": "vol-00000000000000002"}
+        )
+
+        execution_log = get_execution_log()
+        plan = self.get_plan(
+            execution_log, {"ec2": {"volume": {"vol-00000000000000001"}}}
+        )
+        assert plan.apply("plans/plan.json")
+
+        actions = execution_log["AWS"][REGION]["EC2"]["Volume"]
+        assert [action["action"] for action in actions] == [
+            "SKIP - ALLOWLIST",
+            "DELETE",
+        ]
+        self.stubber_ec2.assert_no_pending_responses()
+
+    def test_unsupported_version(self):
+        body = json.loads(self.write())
+        body["version"] = Plan.version + 1
+        self.read(json.dumps(body).encode("utf-8"))
+
+        execution_log = get_execution_log()
+        assert not self.get_plan(execution_log).apply("plans/plan.json")
+        assert execution_log == {}
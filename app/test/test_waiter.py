@@ -0,0 +1,80 @@
+import concurrent.futures
+import logging
+
+import boto3
+from botocore.stub import Stubber
+
+from src.helper import Helper
+from src.waiter import Waiter
+
+
+def get_execution_log():
+    return {"AWS": {"ap-southeast-2": {"EKS": {"Cluster": []}}}}
+
+
+class TestWaiter:
+    def setup_method(self):
+        self.client = boto3.client("eks")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def teardown_method(self):
+        self.stubber.deactivate()
+
+    def poll(self, resource_ids):
+        ready = []
+        for resource_id in resource_ids:
+            try:
+                self.client.describe_cluster(name=resource_id)
+            except self.client.exceptions.ResourceNotFoundException:
+                ready.append(resource_id)
+        return ready
+
+    def test_ready(self):
+        Waiter.setup(logging, {"general": {"waiter": {"interval": 0.01, "timeout": 5}}})
+        self.stubber.add_client_error(
+            "describe_cluster", "ResourceNotFoundException", http_status_code=404
+        )
+
+        future = Waiter.wait(self.poll, "test", lambda: "DELETE", "SKIP - IN USE")
+        Waiter.join()
+
+        assert future.result() == "DELETE"
+        self.stubber.assert_no_pending_responses()
+
+    def test_expired(self):
+        Waiter.setup(
+            logging, {"general": {"waiter": {"interval": 0.01, "timeout": 0.05}}}
+        )
+        # more responses than the number of polls that fit before the deadline
+        for _ in range(20):
+            self.stubber.add_response(
+                "describe_cluster",
+                {"cluster": {"name": "test", "status": "DELETING"}},
+                {"name": "test"},
+            )
+
+        future = Waiter.wait(self.poll, "test", lambda: "DELETE", "SKIP - IN USE")
+        Waiter.join()
+
+        assert future.result() == "SKIP - IN USE"
+
+    def test_unresolved_execution_log_action(self):
+        Waiter.setup(
+            logging, {"general": {"waiter": {"interval": 0.01, "timeout": 0.05}}}
+        )
+        execution_log = get_execution_log()
+
+        # an action left unresolved, e.g., by a worker cut short by the run's timeout
+        Helper.record_execution_log_action(
+            execution_log,
+            "ap-southeast-2",
+            "EKS",
+            "Cluster",
+            "test",
+            concurrent.futures.Future(),
+        )
+        Waiter.join()
+
+        actions = execution_log["AWS"]["ap-southeast-2"]["EKS"]["Cluster"]
+        assert actions[0]["action"] == "ERROR"